@@ -0,0 +1,450 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import psycopg2
+from psycopg2 import sql
+
+from db_pool import DB_SETTINGS, configure_pool, close_pool, db_connection
+from schema import ensure_schema
+
+
+BENCHMARK_SETTINGS = {
+    "database_prefix": os.environ.get("RBD_BENCH_DB", "rbd_bench"),
+    "baseline": os.environ.get("RBD_BENCH_BASELINE", "benchmark_baseline.json")
+}
+
+BENCHMARK_SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+SEED_VERSION = 1
+SEED_USERS = 1000
+BENCHMARK_USER = "benchmark"
+TABLE_FILL_ROWS = 100_000
+DEFAULT_REPEAT = 20
+WARMUP_RUNS = 2
+REGRESSION_THRESHOLD = 0.2
+# Ennél kisebb eltérést mérési zajnak tekintünk, akármekkora is az arány.
+REGRESSION_NOISE_MS = 1.0
+GUI_TIMEOUT = 120.0
+
+# Minden 1000. cím tartalmazza, így a találatok száma a táblamérettel arányosan nő.
+RARE_TITLE_WORD = "Zephyr"
+
+TITLE_WORDS = (
+    "Tenger", "Erdő", "Város", "Hajnal", "Árnyék", "Kert", "Folyó", "Csillag", "Tükör", "Ösvény",
+    "Vihar", "Hegy", "Híd", "Tél", "Nyár", "Kapu", "Fény", "Kő", "Szél", "Álom"
+)
+
+BOOKS_DDL = """
+    CREATE TABLE books2 (
+        isbn text PRIMARY KEY,
+        title text,
+        authors text[],
+        page_num integer,
+        price integer,
+        available integer
+    )
+"""
+
+USERS_DDL = """
+    CREATE TABLE user_credentials (
+        user_name text PRIMARY KEY,
+        password text,
+        email text,
+        date_of_birth date,
+        phone_number text,
+        write_permission boolean,
+        edit_permission boolean,
+        delete_permission boolean
+    )
+"""
+
+# Determinisztikus adatok: ugyanaz a méret mindig ugyanazt a táblát adja, így a futások összevethetők.
+SEED_BOOKS = """
+    INSERT INTO books2 (isbn, title, authors, page_num, price, available)
+    SELECT lpad(i::text, 13, '0'),
+           (%(words)s::text[])[1 + (i * 7) %% 20] || ' ' || (%(words)s::text[])[1 + (i * 13) %% 20]
+               || CASE WHEN i %% 1000 = 0 THEN ' ' || %(rare)s ELSE '' END || ' ' || i,
+           CASE WHEN i %% 3 = 0
+                THEN ARRAY['Author ' || (i %% 5000), 'Author ' || ((i * 31) %% 5000)]
+                ELSE ARRAY['Author ' || (i %% 5000)] END,
+           50 + (i * 7919) %% 950,
+           500 + (i * 104729) %% 9500,
+           (i * 31) %% 20
+    FROM generate_series(1::bigint, %(rows)s) AS i
+"""
+
+SEED_USERS_QUERY = """
+    INSERT INTO user_credentials (user_name, password, email, date_of_birth, phone_number,
+                                  write_permission, edit_permission, delete_permission)
+    SELECT 'user' || i, 'password' || i, 'user' || i || '@example.com', DATE '1970-01-01' + i %% 15000,
+           '+3630' || lpad(i::text, 7, '0'), true, i %% 2 = 0, i %% 10 = 0
+    FROM generate_series(1, %(users)s) AS i
+    UNION ALL
+    SELECT %(user)s, %(user)s, NULL, NULL, NULL, true, true, true
+"""
+
+
+def parse_size(value):
+    value = value.strip().lower()
+    if value in BENCHMARK_SIZES:
+        return value, BENCHMARK_SIZES[value]
+    try:
+        rows = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Érvénytelen méret: {value}")
+    if rows < 1:
+        raise argparse.ArgumentTypeError(f"Érvénytelen méret: {value}")
+    return str(rows), rows
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxon kilobájtban, macOS-en bájtban adja vissza.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(run, repeat, warmup=WARMUP_RUNS):
+    for _ in range(warmup):
+        run()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "runs": repeat,
+        "p50_ms": percentile(samples, 0.5),
+        "p95_ms": percentile(samples, 0.95),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def database_name(label):
+    return f"{BENCHMARK_SETTINGS['database_prefix']}_{label}"
+
+
+def create_database(name):
+    connection = psycopg2.connect(**DB_SETTINGS)
+    try:
+        connection.autocommit = True
+        cursor = connection.cursor()
+        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+        if cursor.fetchone() is None:
+            cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name)))
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def seed_database(rows, verbose=False):
+    with db_connection() as connection:
+        if connection is None:
+            raise psycopg2.OperationalError("Nem sikerült csatlakozni a benchmark adatbázishoz.")
+        cursor = connection.cursor()
+        try:
+            cursor.execute("CREATE TABLE IF NOT EXISTS benchmark_seed (rows bigint, seed_version integer)")
+            cursor.execute("SELECT rows, seed_version FROM benchmark_seed")
+            if cursor.fetchone() == (rows, SEED_VERSION):
+                connection.commit()
+                return False
+
+            if verbose:
+                print(f"Tesztadatok létrehozása: {rows} könyv...", file=sys.stderr)
+            cursor.execute(
+                "DROP TABLE IF EXISTS books2, user_credentials, books2_stats, books2_changes, schema_migrations CASCADE"
+            )
+            cursor.execute(BOOKS_DDL)
+            cursor.execute(USERS_DDL)
+            cursor.execute(SEED_BOOKS, {"words": list(TITLE_WORDS), "rare": RARE_TITLE_WORD, "rows": rows})
+            cursor.execute(SEED_USERS_QUERY, {"users": SEED_USERS, "user": BENCHMARK_USER})
+            cursor.execute("DELETE FROM benchmark_seed")
+            connection.commit()
+        finally:
+            cursor.close()
+
+        # A VACUUM nem futhat tranzakcióban.
+        connection.autocommit = True
+        try:
+            cursor = connection.cursor()
+            cursor.execute("VACUUM ANALYZE books2")
+            cursor.execute("VACUUM ANALYZE user_credentials")
+            cursor.close()
+        finally:
+            connection.autocommit = False
+
+    # Az alkalmazás saját migrációi hozzák létre az indexeket, összesítő táblát és triggereket.
+    if not ensure_schema(verbose=verbose, wait=True):
+        raise psycopg2.OperationalError("A benchmark adatbázis sémájának létrehozása nem sikerült.")
+
+    with db_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("INSERT INTO benchmark_seed (rows, seed_version) VALUES (%s, %s)", (rows, SEED_VERSION))
+        connection.commit()
+        cursor.close()
+    return True
+
+
+def query_cases(rows):
+    from book_service import list_books_by_search, get_books_statistics, get_price_chart_data
+    from book_queries import list_books_page
+
+    return [
+        ("search_title_rare", lambda cursor: list_books_by_search(cursor, RARE_TITLE_WORD, "title")),
+        ("search_authors", lambda cursor: list_books_by_search(cursor, "Author 4242", "authors")),
+        ("search_isbn", lambda cursor: list_books_by_search(cursor, str(rows // 2).zfill(13)[:-2], "isbn")),
+        ("search_page_num", lambda cursor: list_books_by_search(cursor, "512", "page_num")),
+        ("search_price_range", lambda cursor: list_books_by_search(
+            cursor, RARE_TITLE_WORD, "title", {"price": (1000, 2000), "available": (1, None)}
+        )),
+        ("page_first_by_title", lambda cursor: list_books_page(cursor, "", "title", sort_column="title")),
+        ("page_range_by_price", lambda cursor: list_books_page(
+            cursor, "", "title", sort_column="price", ranges={"price": (1000, 2000), "available": (1, None)}
+        )),
+        ("books_statistics", get_books_statistics),
+        ("price_chart_data", get_price_chart_data)
+    ]
+
+
+def run_query_benchmarks(rows, repeat):
+    results = {}
+    with db_connection() as connection:
+        if connection is None:
+            raise psycopg2.OperationalError("Nem sikerült csatlakozni a benchmark adatbázishoz.")
+        cursor = connection.cursor()
+        try:
+            for name, case in query_cases(rows):
+                def run():
+                    case(cursor)
+                    connection.rollback()
+                results[name] = measure(run, repeat)
+        finally:
+            cursor.close()
+    return results
+
+
+def run_gui_benchmarks(rows, repeat):
+    from PySide6.QtCore import QEventLoop, QObject, QTimer, Slot
+    from PySide6.QtWidgets import QApplication
+    from main import MainWindow
+    from book_service import get_price_chart_data
+    from book_queries import BOOK_SELECT, PAGE_SIZE
+    from book_stats import statistics_cache, price_chart_cache
+    from result_cache import result_cache
+
+    class BenchmarkWindow(MainWindow):
+        def show_login_dialog(self):
+            self.logged_in_username = BENCHMARK_USER
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = BenchmarkWindow()
+    window.show()
+    app.processEvents()
+
+    class QueryWaiter(QObject):
+        # QObject fogadó: a végrehajtó jelei így a felület szálán, a MainWindow kezelője után érkeznek meg.
+        def __init__(self):
+            super().__init__()
+            self.loop = None
+            self.channel = None
+            self.outcome = []
+
+        @Slot(str, int, object)
+        def on_finished(self, channel, request_id, result):
+            self.done(channel, None)
+
+        @Slot(str, int, str)
+        def on_failed(self, channel, request_id, error):
+            self.done(channel, error)
+
+        def done(self, channel, error):
+            if channel == self.channel and self.loop is not None:
+                self.outcome.append(error)
+                self.loop.quit()
+
+    waiter = QueryWaiter()
+    window.query_executor.finished.connect(waiter.on_finished)
+    window.query_executor.failed.connect(waiter.on_failed)
+
+    def wait_for(channel):
+        waiter.loop = QEventLoop()
+        waiter.channel = channel
+        waiter.outcome = []
+        timer = QTimer()
+        timer.setSingleShot(True)
+        timer.timeout.connect(waiter.loop.quit)
+        timer.start(int(GUI_TIMEOUT * 1000))
+        try:
+            waiter.loop.exec()
+        finally:
+            timer.stop()
+            waiter.loop = None
+
+        if not waiter.outcome:
+            raise TimeoutError(f"A(z) {channel} lekérdezés nem fejeződött be {GUI_TIMEOUT} másodpercen belül.")
+        if waiter.outcome[0] is not None:
+            raise RuntimeError(waiter.outcome[0])
+
+    def refresh(page_size):
+        def run():
+            # Gyorsítótár nélkül mérünk, így minden futás az adatbázisig ér.
+            result_cache.clear()
+            window.page_size_input.setValue(page_size)
+            window.refresh_books(use_cache=False)
+            wait_for("search")
+            app.processEvents()
+        return run
+
+    with db_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(sql.SQL("{} ORDER BY isbn LIMIT %s").format(BOOK_SELECT), (TABLE_FILL_ROWS,))
+        table_books = cursor.fetchall()
+        prices, avg_price, max_price = get_price_chart_data(cursor)
+        connection.rollback()
+        cursor.close()
+
+    def fill_table():
+        window.fill_book_table(table_books)
+        window.book_table.viewport().repaint()
+
+    def price_chart():
+        chart_view = window.create_price_chart(prices, avg_price, max_price)
+        chart_view.resize(800, 400)
+        chart_view.grab()
+        chart_view.deleteLater()
+
+    def dashboard():
+        statistics_cache.invalidate()
+        price_chart_cache.invalidate()
+        window.show_dashboard()
+        wait_for("dashboard")
+        app.processEvents()
+
+    results = {}
+    try:
+        window.show_query_page()
+        window.search_input.setText(RARE_TITLE_WORD)
+        window.search_timer.stop()
+        results["refresh_books_paged"] = measure(refresh(PAGE_SIZE), repeat)
+        results["refresh_books_stream"] = measure(refresh(0), repeat)
+        window.search_input.setText("")
+        window.search_timer.stop()
+        results["table_fill"] = measure(fill_table, repeat)
+        results["create_price_chart"] = measure(price_chart, repeat)
+        results["dashboard"] = measure(dashboard, repeat)
+    finally:
+        window.close_book_stream()
+        window.stop_change_feed()
+        window.query_executor.shutdown()
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+    return results
+
+
+def load_baseline(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("results", {})
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results):
+    partial_path = f"{path}.part"
+    with open(partial_path, "w", encoding="utf-8") as f:
+        json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(partial_path, path)
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            old, new = previous[metric], result[metric]
+            if new - old > REGRESSION_NOISE_MS and new > old * (1 + threshold):
+                regressions.append((key, metric, old, new))
+    return regressions
+
+
+def print_results(results, baseline):
+    print(f"{'mérés':<34}{'p50 ms':>10}{'p95 ms':>10}{'RSS MB':>9}{'p50 vs alap':>13}")
+    for key, result in results.items():
+        rss = result["peak_rss_mb"]
+        line = f"{key:<34}{result['p50_ms']:10.2f}{result['p95_ms']:10.2f}{rss if rss is not None else 0:9.0f}"
+        previous = (baseline or {}).get(key)
+        if previous and previous["p50_ms"]:
+            line += f"{(result['p50_ms'] / previous['p50_ms'] - 1) * 100:+12.0f}%"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teljesítménymérés generált adatokkal feltöltött PostgreSQL adatbázison.")
+    parser.add_argument("--sizes", type=lambda value: [parse_size(size) for size in value.split(",")],
+                        default=[parse_size(size) for size in BENCHMARK_SIZES],
+                        help="táblaméretek vesszővel elválasztva (alapértelmezés: 10k,100k,1m,10m)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="ismétlések száma mérésenként")
+    parser.add_argument("--baseline", default=BENCHMARK_SETTINGS["baseline"], help="az alapmérés fájlja")
+    parser.add_argument("--save-baseline", action="store_true", help="az eredmények mentése új alapmérésként")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="megengedett lassulás az alapméréshez képest (0.2 = 20%%)")
+    parser.add_argument("--skip-gui", action="store_true", help="a felületi (Qt) mérések kihagyása")
+    args = parser.parse_args(argv)
+
+    # A felületi méréseknek nincs szükségük kijelzőre.
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    results = {}
+    try:
+        for label, rows in args.sizes:
+            name = database_name(label)
+            create_database(name)
+            configure_pool(database=name)
+            seed_database(rows, verbose=True)
+
+            print(f"Mérés: {rows} könyv ({name})...", file=sys.stderr)
+            size_results = run_query_benchmarks(rows, args.repeat)
+            if not args.skip_gui:
+                size_results.update(run_gui_benchmarks(rows, args.repeat))
+            results.update({f"{label}/{case}": result for case, result in size_results.items()})
+    except (OSError, ValueError, RuntimeError, psycopg2.Error) as e:
+        print(f"Hiba a teljesítménymérés során: {e}", file=sys.stderr)
+        return 1
+    finally:
+        close_pool()
+
+    baseline = load_baseline(args.baseline)
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Alapmérés mentve: {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"Nincs alapmérés ({args.baseline}); mentés: python benchmark.py --save-baseline")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for key, metric, old, new in regressions:
+        print(f"Lassulás: {key} {metric} {old:.2f} ms -> {new:.2f} ms")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,646 @@
+import argparse
+import asyncio
+import base64
+import binascii
+import collections
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import psycopg2
+from psycopg2.errors import UniqueViolation
+
+from book_bulk import PermissionDenied, check_permission
+from book_queries import DEFAULT_SORT_COLUMN, PAGE_SIZE, SEARCH_FIELDS, SORT_COLUMNS, list_books_page, parse_range
+from book_service import add_book, check_login, delete_book, find_book, load_dashboard_data, update_book
+from book_stats import statistics_cache, price_chart_cache
+from change_feed import CHANGE_FEED_SETTINGS, ChangeFeed
+from db_pool import configure_pool, close_pool, get_pool, POOL_SETTINGS
+from query_registry import query_registry
+
+
+# HTTP/JSON felület a webes és mobil kliensekhez: a kliensek a közös poolon osztoznak, nem nyitnak saját kapcsolatot.
+# Az eseményhurok csak a HTTP-t kezeli; a psycopg2 hívások a pool méretével azonos számú munkaszálon futnak.
+
+API_SETTINGS = {
+    "host": os.environ.get("RBD_API_HOST", "127.0.0.1"),
+    "port": int(os.environ.get("RBD_API_PORT", 8080)),
+    "max_page_size": int(os.environ.get("RBD_API_MAX_PAGE_SIZE", 500)),
+    "cache_entries": int(os.environ.get("RBD_API_CACHE_ENTRIES", 1000))
+}
+
+MAX_BODY_SIZE = 1024 * 1024
+MAX_HEADERS = 100
+# Végpontonként ennyi legutóbbi válaszidőből számoljuk a percentiliseket.
+LATENCY_SAMPLES = 2000
+KEEP_ALIVE_TIMEOUT = 30.0
+
+STATUS_REASONS = {
+    200: "OK", 201: "Created", 204: "No Content", 304: "Not Modified", 400: "Bad Request",
+    401: "Unauthorized", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+    413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable"
+}
+
+
+class HttpError(ValueError):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        self.method = method
+        self.target = target
+        self.headers = headers
+        self.body = body
+        parts = urlsplit(target)
+        self.path = parts.path
+        self.query = parse_qs(parts.query, keep_blank_values=True)
+
+    def param(self, name, default=None):
+        values = self.query.get(name)
+        return values[-1] if values else default
+
+    def json(self):
+        try:
+            data = json.loads(self.body or b"null")
+        except ValueError:
+            raise HttpError(400, "Érvénytelen JSON törzs.")
+        if not isinstance(data, dict):
+            raise HttpError(400, "A kérés törzse JSON objektum kell legyen.")
+        return data
+
+    def keep_alive(self):
+        return self.headers.get("connection", "").lower() != "close"
+
+
+def book_to_json(book):
+    return dict(zip(SEARCH_FIELDS, book))
+
+
+def encode_page_key(key):
+    # Átlátszatlan lapozási kulcs: a kliens csak visszaküldi, nem kell ismernie a rendezés felépítését.
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_page_key(token):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, binascii.Error):
+        raise HttpError(400, f"Érvénytelen lapozási kulcs: {token!r}")
+    if not isinstance(key, list) or not key:
+        raise HttpError(400, f"Érvénytelen lapozási kulcs: {token!r}")
+    return tuple(key)
+
+
+def _int_param(request, name, default, low, high):
+    value = request.param(name)
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise HttpError(400, f"Érvénytelen szám: {name}={value!r}")
+    if number < low or number > high:
+        raise HttpError(400, f"Tartományon kívüli érték: {name}={number} ({low}-{high})")
+    return number
+
+
+BOOK_ARGUMENTS = ("isbn", "title", "authors", "page_num", "price", "available")
+
+
+def _book_arguments(data):
+    # Az add_book és update_book paramétersorrendje.
+    missing = [field for field in BOOK_ARGUMENTS if field not in data]
+    if missing:
+        raise HttpError(400, f"Hiányzó mezők: {', '.join(missing)}")
+    return [data[field] for field in BOOK_ARGUMENTS]
+
+
+def _authenticate(cursor, request):
+    challenge = {"WWW-Authenticate": 'Basic realm="rbd"'}
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "basic":
+        raise HttpError(401, "Bejelentkezés szükséges.", challenge)
+    try:
+        username, _, password = base64.b64decode(credentials).decode("utf-8").partition(":")
+    except (ValueError, binascii.Error):
+        raise HttpError(401, "Érvénytelen hitelesítési adatok.", challenge)
+    if not check_login(cursor, username, password):
+        raise HttpError(401, "Hibás felhasználónév vagy jelszó!", challenge)
+    return username
+
+
+def list_books(cursor, request, params):
+    field = request.param("field", "title")
+    if field not in SEARCH_FIELDS:
+        raise HttpError(400, f"Ismeretlen keresési mező: {field}")
+    sort_column = request.param("sort", DEFAULT_SORT_COLUMN)
+    if sort_column not in SORT_COLUMNS:
+        raise HttpError(400, f"Ismeretlen rendezési oszlop: {sort_column}")
+
+    ranges = dict(parse_range(text) for text in request.query.get("range", []))
+    after, before = request.param("after"), request.param("before")
+    page = list_books_page(
+        cursor, request.param("search", ""), field,
+        page_size=_int_param(request, "limit", PAGE_SIZE, 1, API_SETTINGS["max_page_size"]),
+        sort_column=sort_column,
+        after=decode_page_key(after) if after else None,
+        before=decode_page_key(before) if before else None,
+        ranges=ranges,
+        descending=request.param("desc", "0") in ("1", "true")
+    )
+    return 200, {
+        "books": [book_to_json(book) for book in page.books],
+        "next": encode_page_key(page.last_key()) if page.has_next and page.books else None,
+        "previous": encode_page_key(page.first_key()) if page.has_previous and page.books else None
+    }
+
+
+def get_book(cursor, request, params):
+    book = find_book(cursor, params["isbn"])
+    if book is None:
+        raise HttpError(404, f"Nincs ilyen könyv: {params['isbn']}")
+    return 200, book_to_json(book)
+
+
+def get_stats(cursor, request, params):
+    book_count, page_count, _, avg_price, max_price = load_dashboard_data(cursor)
+    return 200, {"book_count": book_count, "page_count": page_count, "avg_price": avg_price, "max_price": max_price}
+
+
+def create_book(cursor, request, params):
+    username = _authenticate(cursor, request)
+    check_permission(cursor, username, "write_permission")
+    isbn, title, authors, page_num, price, available = add_book(cursor, *_book_arguments(request.json()))
+    return 201, book_to_json((isbn, authors, title, page_num, price, available))
+
+
+def modify_book(cursor, request, params):
+    username = _authenticate(cursor, request)
+    check_permission(cursor, username, "edit_permission")
+    data = dict(request.json(), isbn=params["isbn"])
+    if not update_book(cursor, *_book_arguments(data)):
+        raise HttpError(404, f"Nincs ilyen könyv: {params['isbn']}")
+    return get_book(cursor, request, params)
+
+
+def remove_book(cursor, request, params):
+    username = _authenticate(cursor, request)
+    if not delete_book(cursor, username, params["isbn"]):
+        raise HttpError(404, f"Nincs ilyen könyv: {params['isbn']}")
+    return 204, None
+
+
+class Route:
+    def __init__(self, method, pattern, handler, cacheable=False):
+        self.method = method
+        self.pattern = pattern
+        self.regex = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", pattern) + "$")
+        self.handler = handler
+        self.cacheable = cacheable
+        self.name = f"{method} {pattern}"
+
+
+ROUTES = (
+    Route("GET", "/books", list_books, cacheable=True),
+    Route("GET", "/books/{isbn}", get_book, cacheable=True),
+    Route("GET", "/stats", get_stats, cacheable=True),
+    Route("POST", "/books", create_book),
+    Route("PUT", "/books/{isbn}", modify_book),
+    Route("DELETE", "/books/{isbn}", remove_book)
+)
+
+
+class ResponseCache:
+    # A GET válaszok URL szerint, a books2 változásértesítéseiig (change_feed.py) érvényesek.
+    # Értesítések nélkül nem tudnánk, mikor avul el egy válasz, ezért ilyenkor nem tárolunk semmit.
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key) if self.enabled else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry, generation):
+        with self._lock:
+            # Ha a lekérdezés közben változás érkezett, az eredmény már elavult lehet.
+            if not self.enabled or generation != self._generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def status(self):
+        with self._lock:
+            return {"enabled": self.enabled, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, name, status, elapsed):
+        with self._lock:
+            endpoint = self._endpoints.get(name)
+            if endpoint is None:
+                endpoint = self._endpoints[name] = {
+                    "count": 0, "statuses": collections.Counter(), "total": 0.0, "max": 0.0,
+                    "samples": collections.deque(maxlen=LATENCY_SAMPLES)
+                }
+            endpoint["count"] += 1
+            endpoint["statuses"][status] += 1
+            endpoint["total"] += elapsed
+            endpoint["max"] = max(endpoint["max"], elapsed)
+            endpoint["samples"].append(elapsed)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for name, endpoint in self._endpoints.items():
+                samples = sorted(endpoint["samples"])
+
+                def percentile(fraction):
+                    return round(samples[min(int(fraction * len(samples)), len(samples) - 1)] * 1000, 3)
+
+                result[name] = {
+                    "count": endpoint["count"],
+                    "statuses": {str(status): count for status, count in sorted(endpoint["statuses"].items())},
+                    "avg_ms": round(endpoint["total"] / endpoint["count"] * 1000, 3),
+                    "p50_ms": percentile(0.50),
+                    "p95_ms": percentile(0.95),
+                    "p99_ms": percentile(0.99),
+                    "max_ms": round(endpoint["max"] * 1000, 3)
+                }
+            return result
+
+
+def _etag(body):
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def _etag_matches(header, etag):
+    return any(candidate.strip() in (etag, "W/" + etag, "*") for candidate in header.split(","))
+
+
+class BookApi:
+    def __init__(self, workers=None, cache_entries=None, change_feed=None):
+        self.workers = workers or get_pool().maxconn
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="book-api")
+        self.cache = ResponseCache(cache_entries or API_SETTINGS["cache_entries"])
+        self.metrics = EndpointMetrics()
+        self._loading = {}
+        self.not_modified = 0
+        self.started_at = time.time()
+
+        enabled = CHANGE_FEED_SETTINGS["enabled"] if change_feed is None else change_feed
+        self.change_feed = ChangeFeed(self.on_changes) if enabled else None
+
+    def start(self):
+        if self.change_feed is not None:
+            self.change_feed.start()
+
+    def stop(self):
+        if self.change_feed is not None:
+            self.change_feed.stop()
+        self.executor.shutdown(wait=True)
+
+    def on_changes(self, changes):
+        # A figyelő szálon fut; a következő GET már a friss adatot olvassa.
+        self.cache.invalidate()
+        statistics_cache.invalidate()
+        price_chart_cache.invalidate()
+
+    def _update_cache_state(self):
+        enabled = self.change_feed is not None and self.change_feed.state == "listening"
+        if self.cache.enabled and not enabled:
+            # A kapcsolat kiesése alatti változásokról nem kapunk értesítést.
+            self.cache.invalidate()
+        self.cache.enabled = enabled
+
+    def route(self, request):
+        allowed = []
+        for route in ROUTES:
+            match = route.regex.match(request.path)
+            if match is None:
+                continue
+            if route.method == request.method:
+                return route, {name: unquote(value) for name, value in match.groupdict().items()}
+            allowed.append(route.method)
+        if allowed:
+            raise HttpError(405, f"Nem támogatott metódus: {request.method}", {"Allow": ", ".join(allowed)})
+        raise HttpError(404, f"Ismeretlen végpont: {request.path}")
+
+    def _call(self, route, request, params):
+        with get_pool().connection() as connection:
+            cursor = connection.cursor()
+            try:
+                return route.handler(cursor, request, params)
+            finally:
+                cursor.close()
+
+    async def handle(self, request):
+        # Válasz: (státusz, fejlécek, törzs) és a mérésekhez a végpont neve.
+        started = time.perf_counter()
+        name = "other"
+        try:
+            if request.method == "GET" and request.path == "/metrics":
+                name = "GET /metrics"
+                status, headers, body = 200, {"Cache-Control": "no-store"}, self._json(self.status())
+            else:
+                route, params = self.route(request)
+                name = route.name
+                status, headers, body = await self._dispatch(route, request, params)
+        except HttpError as e:
+            status, headers, body = e.status, e.headers, self._json({"error": str(e)})
+        except PermissionDenied as e:
+            status, headers, body = 403, {}, self._json({"error": str(e)})
+        except UniqueViolation:
+            status, headers, body = 409, {}, self._json({"error": "Ilyen ISBN-nel már van könyv."})
+        except ValueError as e:
+            status, headers, body = 400, {}, self._json({"error": str(e)})
+        except psycopg2.OperationalError as e:
+            status, headers, body = 503, {"Retry-After": "1"}, self._json({"error": str(e).strip()})
+        except psycopg2.Error as e:
+            print(f"Hiba az API kérés feldolgozása során: {e}")
+            status, headers, body = 500, {}, self._json({"error": str(e).strip()})
+
+        self.metrics.record(name, status, time.perf_counter() - started)
+        return status, headers, body
+
+    async def _dispatch(self, route, request, params):
+        if not route.cacheable:
+            status, payload = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._call, route, request, params
+            )
+            # A saját módosítás azonnal látszódjon, ne csak a változásértesítés megérkezése után.
+            self.on_changes(None)
+            return status, {}, None if payload is None else self._json(payload)
+
+        # A válaszokat a kliensnek újra kell ellenőriznie (If-None-Match), de egyező ETag esetén nem kap törzset.
+        headers = {"Cache-Control": "no-cache"}
+        self._update_cache_state()
+        entry = self.cache.get(request.target)
+        if entry is None:
+            # Az azonos URL-re egyszerre érkező kérések egyetlen lekérdezésen osztoznak. A kulcsban szerepel a
+            # cache generációja, így egy közbejött módosítás után induló kérés nem kaphat régebbi eredményt.
+            key = (request.target, self.cache.generation)
+            task = self._loading.get(key)
+            if task is None:
+                task = self._loading[key] = asyncio.ensure_future(self._load(route, request, params, key[1]))
+                task.add_done_callback(lambda _: self._loading.pop(key, None))
+            entry = await asyncio.shield(task)
+
+        etag, body = entry
+        headers["ETag"] = etag
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            self.not_modified += 1
+            return 304, headers, None
+        return 200, headers, body
+
+    async def _load(self, route, request, params, generation):
+        _, payload = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._call, route, request, params
+        )
+        body = self._json(payload)
+        entry = (_etag(body), body)
+        self.cache.put(request.target, entry, generation)
+        return entry
+
+    def _json(self, payload):
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def status(self):
+        return {
+            "uptime": round(time.time() - self.started_at, 1),
+            "workers": self.workers,
+            "endpoints": self.metrics.snapshot(),
+            "cache": dict(self.cache.status(), not_modified=self.not_modified),
+            "pool": get_pool().statistics(),
+            "prepared": query_registry.status(),
+            "change_feed": self.change_feed.status() if self.change_feed is not None else None
+        }
+
+
+async def _read_line(reader, status, message):
+    # A serve() olvasási korlátjánál hosszabb sor esetén a readline ValueError-t dob.
+    try:
+        return await reader.readline()
+    except ValueError:
+        raise HttpError(status, message)
+
+
+async def _read_request(reader):
+    line = await _read_line(reader, 400, "Túl hosszú kérés.")
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Érvénytelen kérés.")
+
+    headers = {}
+    while True:
+        line = await _read_line(reader, 431, "Túl hosszú fejléc.")
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HttpError(431, "Túl sok fejléc.")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    # Csak nemnegatív decimális szám fogadható el (az int() a "-1" és "1_0" alakot is elfogadná).
+    length = headers.get("content-length", "0")
+    if not (length.isascii() and length.isdigit()):
+        raise HttpError(400, "Érvénytelen Content-Length.")
+    length = int(length)
+    if length > MAX_BODY_SIZE:
+        raise HttpError(413, "Túl nagy kérés.")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target, headers, body)
+
+
+def _write_response(writer, status, headers, body, keep_alive):
+    lines = [f"HTTP/1.1 {status} {STATUS_REASONS.get(status, '')}"]
+    headers = dict(headers)
+    if body is not None:
+        headers["Content-Type"] = "application/json; charset=utf-8"
+    if status != 304:
+        headers["Content-Length"] = str(len(body or b""))
+    headers["Connection"] = "keep-alive" if keep_alive else "close"
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+
+
+def make_connection_handler(api):
+    async def handle_connection(reader, writer):
+        # HTTP/1.1 keep-alive: egy kapcsolaton több kérés is érkezhet egymás után.
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except HttpError as e:
+                    _write_response(writer, e.status, {}, api._json({"error": str(e)}), keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                status, headers, body = await api.handle(request)
+                keep_alive = request.keep_alive()
+                _write_response(writer, status, headers, body, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # Leállításkor a nyitott kapcsolatok kezelőit megszakítjuk; ez nem hiba.
+            pass
+        finally:
+            writer.close()
+
+    return handle_connection
+
+
+async def serve(api, host, port, ready=None):
+    server = await asyncio.start_server(make_connection_handler(api), host, port, limit=64 * 1024)
+    print(f"Az API elérhető: http://{host}:{port}/ (munkaszálak: {api.workers})")
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+async def _load_worker(host, port, target, deadline, requests, latencies, statuses, conditional):
+    reader, writer = await asyncio.open_connection(host, port)
+    etag = None
+    try:
+        while requests[0] > 0 and time.monotonic() < deadline:
+            requests[0] -= 1
+            headers = f"GET {target} HTTP/1.1\r\nHost: {host}\r\n"
+            if conditional and etag:
+                headers += f"If-None-Match: {etag}\r\n"
+            started = time.perf_counter()
+            writer.write((headers + "\r\n").encode("latin-1"))
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+                elif name.lower() == "etag":
+                    etag = value.strip()
+            if length:
+                await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def load_test(host, port, targets, requests, concurrency, duration, conditional):
+    latencies = []
+    statuses = collections.Counter()
+    remaining = [requests]
+    deadline = time.monotonic() + duration if duration else float("inf")
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _load_worker(host, port, targets[i % len(targets)], deadline, remaining, latencies, statuses, conditional)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Kérések: {len(latencies)}, idő: {elapsed:.2f} s, {len(latencies) / elapsed:.0f} kérés/s")
+    if latencies:
+        for label, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            print(f"{label}: {latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000:.2f} ms")
+        print(f"max: {latencies[-1] * 1000:.2f} ms")
+    print("Státuszok: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    return 0 if statuses and all(status < 500 for status in statuses) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="A könyvkatalógus HTTP/JSON felülete.")
+    parser.add_argument("--host", default=API_SETTINGS["host"], help="figyelt cím")
+    parser.add_argument("--port", type=int, default=API_SETTINGS["port"], help="figyelt port")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="adatbázis-kapcsolatok és munkaszálak száma (0: RBD_POOL_MAX)")
+    parser.add_argument("--load-test", action="store_true",
+                        help="terheléses teszt egy már futó API ellen a --host és --port címen")
+    parser.add_argument("--path", action="append", default=[], dest="paths",
+                        help="terheléses teszt: lekért útvonal, többször is megadható (alapértelmezés: /books)")
+    parser.add_argument("--requests", type=int, default=5000, help="terheléses teszt: kérések száma")
+    parser.add_argument("--concurrency", type=int, default=32, help="terheléses teszt: párhuzamos kapcsolatok")
+    parser.add_argument("--duration", type=float, default=0, help="terheléses teszt: legfeljebb ennyi másodperc")
+    parser.add_argument("--conditional", action="store_true",
+                        help="terheléses teszt: If-None-Match a legutóbbi ETag-gel")
+    args = parser.parse_args(argv)
+
+    if args.load_test:
+        try:
+            return asyncio.run(load_test(
+                args.host, args.port, args.paths or ["/books"], args.requests, args.concurrency, args.duration,
+                args.conditional
+            ))
+        except OSError as e:
+            print(f"Hiba a terheléses teszt során: {e}")
+            return 1
+
+    if args.workers:
+        configure_pool(maxconn=args.workers, minconn=min(POOL_SETTINGS["minconn"], args.workers))
+    api = BookApi()
+    api.start()
+    try:
+        asyncio.run(serve(api, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Hiba az API indítása során: {e}")
+        return 1
+    finally:
+        api.stop()
+        close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
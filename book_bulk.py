@@ -0,0 +1,103 @@
+from psycopg2 import sql
+
+from book_queries import BOOK_LIMITS, NUMERIC_FIELDS
+from query_registry import query_registry
+
+
+BULK_UPDATE_FIELDS = NUMERIC_FIELDS
+PERMISSIONS = ("write_permission", "edit_permission", "delete_permission")
+
+
+class PermissionDenied(ValueError):
+    pass
+
+
+def normalize_isbns(isbns):
+    # Az ismétlődő ISBN-eket kiszűrjük, a sorrend megmarad.
+    isbns = [isbn for isbn in dict.fromkeys(str(isbn or "").strip() for isbn in isbns) if isbn]
+    if not isbns:
+        raise ValueError("Nincs kiválasztott könyv.")
+    return isbns
+
+
+def normalize_changes(changes):
+    if not changes:
+        raise ValueError("Nincs megadva módosítandó mező.")
+
+    normalized = {}
+    for field, value in changes.items():
+        if field not in BULK_UPDATE_FIELDS:
+            raise ValueError(f"Tömegesen nem módosítható mező: {field}")
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Érvénytelen szám: {field}={value!r}")
+        low, high = BOOK_LIMITS[field]
+        if number < low or number > high:
+            raise ValueError(f"Tartományon kívüli érték: {field}={number} ({low}-{high})")
+        normalized[field] = number
+    return normalized
+
+
+def check_permission(cursor, username, permission):
+    if permission not in PERMISSIONS:
+        raise ValueError(f"Ismeretlen jogosultság: {permission}")
+    query = sql.SQL("SELECT COALESCE(bool_or({}), false) FROM user_credentials WHERE user_name = %s").format(
+        sql.Identifier(permission)
+    )
+    query_registry.execute(cursor, query, (username,))
+    if not cursor.fetchone()[0]:
+        raise PermissionDenied(f"A(z) {username} felhasználónak nincs {permission} jogosultsága.")
+
+
+def _run_with_permission(cursor, username, permission, statement, params):
+    # A jogosultság ellenőrzése és a módosítás egyetlen utasítás: egy kör az adatbázishoz,
+    # és a két lépés között a jogosultság sem változhat meg.
+    if permission not in PERMISSIONS:
+        raise ValueError(f"Ismeretlen jogosultság: {permission}")
+
+    query = sql.SQL("""
+        WITH allowed AS (
+            SELECT COALESCE(bool_or({permission}), false) AS allowed
+            FROM user_credentials
+            WHERE user_name = %(username)s
+        ), changed AS (
+            {statement}
+            AND (SELECT allowed FROM allowed)
+            RETURNING 1
+        )
+        SELECT (SELECT allowed FROM allowed), (SELECT COUNT(*) FROM changed)
+    """).format(permission=sql.Identifier(permission), statement=statement)
+
+    connection = cursor.connection
+    try:
+        query_registry.execute(cursor, query, dict(params, username=username))
+        allowed, count = cursor.fetchone()
+        if not allowed:
+            raise PermissionDenied(f"A(z) {username} felhasználónak nincs {permission} jogosultsága.")
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return count
+
+
+def delete_books(cursor, username, isbns):
+    statement = sql.SQL("DELETE FROM books2 WHERE isbn = ANY(%(isbns)s::text[])")
+    return _run_with_permission(cursor, username, "delete_permission", statement, {"isbns": normalize_isbns(isbns)})
+
+
+def update_books(cursor, username, isbns, changes):
+    changes = normalize_changes(changes)
+    assignments = sql.SQL(", ").join(
+        sql.SQL("{} = {}").format(sql.Identifier(field), sql.Placeholder(field)) for field in changes
+    )
+    # Csak a ténylegesen változó sorokat írjuk, így a változásnapló és a statisztika sem kap felesleges bejegyzést.
+    differs = sql.SQL(" OR ").join(
+        sql.SQL("{} IS DISTINCT FROM {}").format(sql.Identifier(field), sql.Placeholder(field)) for field in changes
+    )
+    statement = sql.SQL("UPDATE books2 SET {} WHERE isbn = ANY(%(isbns)s::text[]) AND ({})").format(
+        assignments, differs
+    )
+    params = dict(changes, isbns=normalize_isbns(isbns))
+    return _run_with_permission(cursor, username, "edit_permission", statement, params)
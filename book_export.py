@@ -0,0 +1,216 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import psycopg2
+from psycopg2 import sql
+
+from book_queries import (
+    build_conditions, build_order_by, parse_range, DEFAULT_SORT_COLUMN, SEARCH_FIELDS, SORT_COLUMNS
+)
+from db_pool import db_connection
+
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+EXPORT_FIELDS = ("isbn", "title", "authors", "page_num", "price", "available")
+EXPORT_BATCH_SIZE = 5000
+PROGRESS_BYTES = 1 << 20
+
+_export_ids = itertools.count(1)
+
+
+class ExportResult:
+    def __init__(self, path, file_format):
+        self.path = path
+        self.file_format = file_format
+        self.rows = 0
+        self.bytes_written = 0
+        self.elapsed = 0.0
+
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def detect_export_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if extension in (".parquet", ".pq"):
+        return "parquet"
+    return "csv"
+
+
+def build_export_query(search_term, search_field, sort_column=DEFAULT_SORT_COLUMN, authors_as_text=False,
+                       ranges=None, descending=False):
+    # A CSV-ben a szerzők ", " elválasztással szerepelnek, így a fájl a book_import.py-vel visszatölthető.
+    authors = sql.SQL("array_to_string(authors, ', ') AS authors" if authors_as_text else "authors")
+    query = sql.SQL("SELECT isbn, title, {}, page_num, price, available FROM books2").format(authors)
+
+    conditions, params = build_conditions(search_term, search_field, ranges)
+    if conditions:
+        query = sql.SQL("{} WHERE {}").format(query, sql.SQL(" AND ").join(conditions))
+    return sql.SQL("{} {}").format(query, build_order_by(sort_column, descending)), tuple(params)
+
+
+class _CountingWriter:
+    # A copy_expert ebbe írja az adatot darabonként; a sorok számát az újsorokból becsüljük,
+    # a pontos értéket a COPY végén a rowcount adja.
+    def __init__(self, file, result, progress):
+        self._file = file
+        self._result = result
+        self._progress = progress
+        self._lines = 0
+        self._reported = 0
+
+    def write(self, data):
+        self._file.write(data)
+        self._result.bytes_written += len(data)
+        self._lines += data.count(b"\n")
+        if self._progress is not None and self._result.bytes_written - self._reported >= PROGRESS_BYTES:
+            self._reported = self._result.bytes_written
+            self._progress(max(self._lines - 1, 0), self._result.bytes_written)
+
+
+def _export_csv(cursor, file, query, params, result, progress):
+    copy_query = sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER)").format(query)
+    # A COPY nem fogad paramétereket, ezért a mogrify illeszti be őket biztonságosan.
+    cursor.copy_expert(cursor.mogrify(copy_query, params), _CountingWriter(file, result, progress))
+    result.rows = cursor.rowcount
+
+
+def _batches(cursor, query, params):
+    # Nevesített (szerveroldali) kurzor: egyszerre csak EXPORT_BATCH_SIZE sor van a memóriában.
+    stream = cursor.connection.cursor(name=f"book_export_{next(_export_ids)}")
+    stream.itersize = EXPORT_BATCH_SIZE
+    try:
+        stream.execute(query, params)
+        while True:
+            rows = stream.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            yield rows
+    finally:
+        stream.close()
+
+
+def _export_jsonl(cursor, file, query, params, result, progress):
+    for rows in _batches(cursor, query, params):
+        data = "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n" for row in rows
+        ).encode("utf-8")
+        file.write(data)
+        result.rows += len(rows)
+        result.bytes_written += len(data)
+        if progress is not None:
+            progress(result.rows, result.bytes_written)
+
+
+def _export_parquet(cursor, file, query, params, result, progress):
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("A Parquet exporthoz a pyarrow csomag szükséges (pip install pyarrow).")
+
+    schema = pyarrow.schema([
+        ("isbn", pyarrow.string()),
+        ("title", pyarrow.string()),
+        ("authors", pyarrow.list_(pyarrow.string())),
+        ("page_num", pyarrow.int32()),
+        ("price", pyarrow.int32()),
+        ("available", pyarrow.int32())
+    ])
+
+    # Minden adag külön sorcsoport lesz, így a fájl a teljes tábla betöltése nélkül készül el.
+    with pyarrow.parquet.ParquetWriter(file, schema) as writer:
+        for rows in _batches(cursor, query, params):
+            columns = list(zip(*rows))
+            writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            result.rows += len(rows)
+            result.bytes_written = file.tell()
+            if progress is not None:
+                progress(result.rows, result.bytes_written)
+
+
+EXPORTERS = {
+    "csv": _export_csv,
+    "jsonl": _export_jsonl,
+    "parquet": _export_parquet
+}
+
+
+def export_books(cursor, path, search_term="", search_field="title", file_format=None,
+                 sort_column=DEFAULT_SORT_COLUMN, progress=None, ranges=None, descending=False):
+    file_format = file_format or detect_export_format(path)
+    if file_format not in EXPORTERS:
+        raise ValueError(f"Ismeretlen fájlformátum: {file_format}")
+
+    query, params = build_export_query(
+        search_term, search_field, sort_column, authors_as_text=file_format == "csv", ranges=ranges,
+        descending=descending
+    )
+    result = ExportResult(path, file_format)
+    started = time.perf_counter()
+
+    # Ideiglenes fájlba írunk, így megszakítás vagy hiba esetén nem marad félkész export a célhelyen.
+    partial_path = f"{path}.part"
+    try:
+        with open(partial_path, "wb") as file:
+            EXPORTERS[file_format](cursor, file, query, params, result, progress)
+        cursor.connection.commit()
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    result.elapsed = time.perf_counter() - started
+    if progress is not None:
+        progress(result.rows, result.bytes_written)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Könyvek exportálása CSV, JSONL vagy Parquet fájlba.")
+    parser.add_argument("path", help="a létrehozandó fájl")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="fájlformátum (alapértelmezés: kiterjesztés alapján)")
+    parser.add_argument("--field", choices=SEARCH_FIELDS, default="title", help="keresési mező")
+    parser.add_argument("--search", default="", help="keresett kifejezés (üres: minden könyv)")
+    parser.add_argument("--range", action="append", default=[], type=parse_range, dest="ranges",
+                        help="számszűrő mező:min:max alakban, többször is megadható (pl. price::3000)")
+    parser.add_argument("--sort", choices=SORT_COLUMNS, default=DEFAULT_SORT_COLUMN, help="rendezési oszlop")
+    parser.add_argument("--desc", action="store_true", help="csökkenő sorrend")
+    args = parser.parse_args(argv)
+
+    def report(rows, bytes_written):
+        print(f"\r{rows} sor, {bytes_written / (1 << 20):.1f} MB", end="", file=sys.stderr)
+
+    try:
+        with db_connection() as connection:
+            if connection is None:
+                return 1
+            cursor = connection.cursor()
+            try:
+                result = export_books(
+                    cursor, args.path, args.search, args.field, args.format, args.sort, report, dict(args.ranges),
+                    args.desc
+                )
+            finally:
+                cursor.close()
+    except (OSError, ValueError, psycopg2.Error) as e:
+        print(f"\nHiba az exportálás során: {e}", file=sys.stderr)
+        return 1
+
+    print(file=sys.stderr)
+    print(f"Exportálva: {result.rows} sor -> {result.path} ({result.rows_per_second():.0f} sor/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+import psycopg2
+
+from book_queries import normalize_book
+from db_pool import db_connection
+
+
+IMPORT_FIELDS = ("isbn", "title", "authors", "page_num", "price", "available")
+PROGRESS_EVERY = 5000
+COPY_READ_SIZE = 1 << 16
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_valid = 0
+        self.rejected = 0
+        self.inserted = 0
+        self.updated = 0
+        self.rejected_path = None
+        self.elapsed = 0.0
+
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    return "csv"
+
+
+def read_records(file, file_format):
+    if file_format == "jsonl":
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, {"raw": line.rstrip("\n")}, f"Hibás JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, {"raw": line.rstrip("\n")}, "A sor nem JSON objektum."
+                continue
+            yield line_number, record, None
+    elif file_format == "csv":
+        reader = csv.DictReader(file)
+        missing = [field for field in IMPORT_FIELDS if field not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Hiányzó CSV oszlop(ok): {', '.join(missing)}")
+        for record in reader:
+            yield reader.line_num, record, None
+    else:
+        raise ValueError(f"Ismeretlen fájlformátum: {file_format}")
+
+
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+ARRAY_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"'})
+
+
+def _copy_text(value):
+    return value.translate(COPY_ESCAPES)
+
+
+def _array_literal(values):
+    return "{" + ",".join(f'"{value.translate(ARRAY_ESCAPES)}"' for value in values) + "}"
+
+
+class _CopyReader(io.RawIOBase):
+    # Fájlszerű objektum a copy_expert számára: a sorokat menet közben állítja elő,
+    # így a teljes import soha nincs egyszerre a memóriában.
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        pieces = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            try:
+                line = next(self._lines).encode("utf-8")
+            except StopIteration:
+                break
+            pieces.append(line)
+            length += len(line)
+
+        data = b"".join(pieces)
+        if size < 0:
+            size = len(data)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _copy_lines(records, result, rejected_writer, progress, total_bytes, file):
+    for line_number, record, error in records:
+        result.rows_read += 1
+
+        if error is None:
+            get = record.get
+            try:
+                book = normalize_book(
+                    get("isbn"), get("title"), get("authors"), get("page_num"), get("price"), get("available")
+                )
+            except ValueError as e:
+                error = str(e)
+
+        if error is not None:
+            result.rejected += 1
+            rejected_writer(line_number, record, error)
+        else:
+            result.rows_valid += 1
+            isbn, title, authors, page_num, price, available = book
+            yield "\t".join((
+                str(line_number),
+                _copy_text(isbn),
+                _copy_text(title),
+                _copy_text(_array_literal(authors)),
+                str(page_num),
+                str(price),
+                str(available)
+            )) + "\n"
+
+        if progress is not None and result.rows_read % PROGRESS_EVERY == 0:
+            progress(result.rows_read, result.rejected, _position(file), total_bytes)
+
+
+def _position(file):
+    try:
+        return file.buffer.tell()
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
+def _has_unique_isbn(cursor):
+    cursor.execute("""
+        SELECT EXISTS (
+            SELECT 1
+            FROM pg_index AS i
+            JOIN pg_attribute AS a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+            WHERE i.indrelid = 'books2'::regclass AND i.indisunique AND i.indnatts = 1 AND a.attname = 'isbn'
+        )
+    """)
+    return cursor.fetchone()[0]
+
+
+def _upsert_staged_books(cursor):
+    # Ha egy ISBN többször szerepel a fájlban, a legutolsó sora érvényes.
+    latest = """
+        SELECT DISTINCT ON (isbn) isbn, title, authors, page_num, price, available
+        FROM books2_import
+        ORDER BY isbn, line_number DESC
+    """
+
+    if _has_unique_isbn(cursor):
+        cursor.execute(f"""
+            WITH upserted AS (
+                INSERT INTO books2 (isbn, title, authors, page_num, price, available)
+                {latest}
+                ON CONFLICT (isbn) DO UPDATE
+                SET title = EXCLUDED.title, authors = EXCLUDED.authors, page_num = EXCLUDED.page_num,
+                    price = EXCLUDED.price, available = EXCLUDED.available
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM upserted
+        """)
+        inserted, updated = cursor.fetchone()
+        return inserted, updated
+
+    # Egyedi index nélkül az ON CONFLICT nem használható, ezért külön frissítünk és szúrunk be.
+    cursor.execute(f"CREATE TEMP TABLE books2_import_latest ON COMMIT DROP AS {latest}")
+    cursor.execute("""
+        UPDATE books2 AS b
+        SET title = i.title, authors = i.authors, page_num = i.page_num,
+            price = i.price, available = i.available
+        FROM books2_import_latest AS i
+        WHERE b.isbn = i.isbn
+    """)
+    updated = cursor.rowcount
+    cursor.execute("""
+        INSERT INTO books2 (isbn, title, authors, page_num, price, available)
+        SELECT i.isbn, i.title, i.authors, i.page_num, i.price, i.available
+        FROM books2_import_latest AS i
+        WHERE NOT EXISTS (SELECT 1 FROM books2 AS b WHERE b.isbn = i.isbn)
+    """)
+    return cursor.rowcount, updated
+
+
+def import_books(path, file_format=None, rejected_path=None, progress=None):
+    file_format = file_format or detect_format(path)
+    rejected_path = rejected_path or f"{path}.rejected.jsonl"
+    total_bytes = os.path.getsize(path)
+    result = ImportResult()
+    started = time.perf_counter()
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as file, \
+            open(rejected_path, "w", encoding="utf-8") as rejected_file:
+
+        def write_rejected(line_number, record, error):
+            rejected_file.write(json.dumps(
+                {"line": line_number, "error": error, "record": record}, ensure_ascii=False
+            ) + "\n")
+
+        with db_connection() as connection:
+            if connection is None:
+                raise psycopg2.OperationalError("Nem sikerült csatlakozni az adatbázishoz.")
+
+            cursor = connection.cursor()
+            try:
+                cursor.execute("""
+                    CREATE TEMP TABLE books2_import (
+                        line_number integer,
+                        isbn text,
+                        title text,
+                        authors text[],
+                        page_num integer,
+                        price integer,
+                        available integer
+                    ) ON COMMIT DROP
+                """)
+
+                lines = _copy_lines(
+                    read_records(file, file_format), result, write_rejected, progress, total_bytes, file
+                )
+                cursor.copy_expert(
+                    "COPY books2_import (line_number, isbn, title, authors, page_num, price, available) FROM STDIN",
+                    _CopyReader(lines),
+                    size=COPY_READ_SIZE
+                )
+
+                result.inserted, result.updated = _upsert_staged_books(cursor)
+                connection.commit()
+            finally:
+                cursor.close()
+
+    if result.rejected:
+        result.rejected_path = rejected_path
+    else:
+        os.remove(rejected_path)
+
+    result.elapsed = time.perf_counter() - started
+    if progress is not None:
+        progress(result.rows_read, result.rejected, total_bytes, total_bytes)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Könyvek tömeges importálása CSV vagy JSONL fájlból.")
+    parser.add_argument("path", help="a betöltendő CSV vagy JSONL fájl")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="fájlformátum (alapértelmezés: kiterjesztés alapján)")
+    parser.add_argument("--rejected", help="az elutasított sorok fájlja (alapértelmezés: <fájl>.rejected.jsonl)")
+    args = parser.parse_args(argv)
+
+    def report(rows, rejected, position, total):
+        percent = 100 * position / total if total else 100
+        print(f"\r{rows} sor feldolgozva, {rejected} elutasítva ({percent:.0f}%)", end="", file=sys.stderr)
+
+    try:
+        result = import_books(args.path, args.format, args.rejected, report)
+    except (OSError, ValueError, psycopg2.Error) as e:
+        print(f"\nHiba az importálás során: {e}", file=sys.stderr)
+        return 1
+
+    print(file=sys.stderr)
+    print(f"Beolvasva: {result.rows_read}, új: {result.inserted}, frissítve: {result.updated}, "
+          f"elutasítva: {result.rejected} ({result.rows_per_second():.0f} sor/s)")
+    if result.rejected_path:
+        print(f"Elutasított sorok: {result.rejected_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
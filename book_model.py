@@ -0,0 +1,168 @@
+from array import array
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, Signal
+
+
+BOOK_COLUMNS = ("isbn", "authors", "title", "page_num", "price", "available")
+NUMERIC_COLUMNS = {"page_num", "price", "available"}
+
+
+def _build_column(values, numeric):
+    # A számoszlopok tömbben 8 bájt/sor helyet foglalnak Python int objektumok helyett.
+    if numeric:
+        try:
+            return array("q", values)
+        except (TypeError, OverflowError):
+            pass
+    return list(values)
+
+
+def _extend_column(column, values):
+    if isinstance(column, array):
+        # Először külön tömbbe alakítjuk az új értékeket: ha valamelyik nem fér el (pl. NULL vagy túl nagy szám),
+        # az oszlop érintetlen marad, és listára váltunk, mint a _build_column.
+        try:
+            values = array(column.typecode, values)
+        except (TypeError, OverflowError):
+            return list(column) + list(values)
+    column.extend(values)
+    return column
+
+
+class BookTableModel(QAbstractTableModel):
+    more_requested = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = [[] for _ in BOOK_COLUMNS]
+        self._row_count = 0
+        self._headers = list(BOOK_COLUMNS)
+        self._has_more = False
+        self._fetching = False
+        self._rows_by_isbn = None
+
+    def set_books(self, books, has_more=False):
+        self.beginResetModel()
+        if books:
+            self._columns = [
+                _build_column(values, name in NUMERIC_COLUMNS)
+                for name, values in zip(BOOK_COLUMNS, zip(*books))
+            ]
+            self._row_count = len(self._columns[0])
+        else:
+            self._columns = [[] for _ in BOOK_COLUMNS]
+            self._row_count = 0
+        self._has_more = has_more
+        self._fetching = False
+        self._rows_by_isbn = None
+        self.endResetModel()
+
+    def append_books(self, books, has_more=False):
+        self._fetching = False
+        self._has_more = has_more
+        if not books:
+            return
+
+        first = self._row_count
+        self.beginInsertRows(QModelIndex(), first, first + len(books) - 1)
+        self._columns = [
+            _extend_column(column, values)
+            for column, values in zip(self._columns, zip(*books))
+        ]
+        if self._rows_by_isbn is not None:
+            # A hozzáfűzés nem tolja el a meglévő sorokat, így az index bővíthető.
+            self._rows_by_isbn.update((book[0], first + offset) for offset, book in enumerate(books))
+        self._row_count += len(books)
+        self.endInsertRows()
+
+    def has_more(self):
+        return self._has_more
+
+    def find_row(self, isbn):
+        # Az isbn -> sor index csak az első kereséskor készül el, és a sorok eltolódásakor érvénytelenné válik.
+        if self._rows_by_isbn is None:
+            self._rows_by_isbn = {value: row for row, value in enumerate(self._columns[0])}
+        return self._rows_by_isbn.get(isbn)
+
+    def book_values(self, row):
+        return tuple(column[row] for column in self._columns)
+
+    def _writable_column(self, index, value):
+        # A számtömbbe csak egész kerülhet; más érték (pl. NULL) esetén listára váltunk, mint a _build_column.
+        column = self._columns[index]
+        if isinstance(column, array) and not isinstance(value, int):
+            column = self._columns[index] = list(column)
+        return column
+
+    def replace_book(self, row, book):
+        for index, value in enumerate(book):
+            self._writable_column(index, value)[row] = value
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(BOOK_COLUMNS) - 1))
+
+    def insert_book(self, row, book):
+        self.beginInsertRows(QModelIndex(), row, row)
+        for index, value in enumerate(book):
+            self._writable_column(index, value).insert(row, value)
+        self._row_count += 1
+        self._rows_by_isbn = None
+        self.endInsertRows()
+
+    def remove_book(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        for column in self._columns:
+            del column[row]
+        self._row_count -= 1
+        self._rows_by_isbn = None
+        self.endRemoveRows()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._has_more and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        # A következő adag betöltését a háttérszál végzi, az eredmény az append_books-ba érkezik.
+        self._fetching = True
+        self.more_requested.emit()
+
+    def clear(self):
+        self.set_books([])
+
+    def set_headers(self, headers):
+        self._headers = list(headers)
+        self.headerDataChanged.emit(Qt.Horizontal, 0, len(self._headers) - 1)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(BOOK_COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+
+        value = self._columns[index.column()][index.row()]
+        if value is None:
+            return ""
+        if isinstance(value, list):
+            return ', '.join(value)
+        return str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._headers[section]
+        return str(section + 1)
+
+    def book_at(self, row):
+        isbn, authors, title, page_num, price, available = (column[row] for column in self._columns)
+        authors_str = ', '.join(authors) if isinstance(authors, list) else authors
+        return isbn, authors_str, title, page_num, price, available
@@ -0,0 +1,385 @@
+import threading
+
+import psycopg2
+from psycopg2 import sql
+
+from db_pool import get_pool
+from query_registry import query_registry
+
+
+BOOK_SELECT = sql.SQL("SELECT isbn, authors, title, page_num, price, available FROM books2")
+
+SEARCH_FIELDS = ("isbn", "authors", "title", "page_num", "price", "available")
+NUMERIC_FIELDS = ("page_num", "price", "available")
+BOOK_COLUMN_INDEX = {field: index for index, field in enumerate(SEARCH_FIELDS)}
+
+SORT_COLUMNS = ("isbn", "title", "page_num", "price", "available")
+DEFAULT_SORT_COLUMN = "isbn"
+
+# Új adat (felvétel, import, tömeges módosítás) elfogadható tartománya.
+BOOK_LIMITS = {
+    "page_num": (1, 10000),
+    "price": (1, 1000000),
+    "available": (0, 1000)
+}
+
+# A books2 oszlopai korlát nélküli integer típusúak, a már tárolt könyvek módosításakor ezt követjük.
+# A legkisebb int4 értéket a catalogue_index.NULL_NUMBER foglalja.
+COLUMN_LIMITS = {field: (-2 ** 31 + 1, 2 ** 31 - 1) for field in BOOK_LIMITS}
+
+STREAM_BATCH_SIZE = 500
+PAGE_SIZE = 100
+
+
+def normalize_book(isbn, title, authors, page_num, price, available, limits=BOOK_LIMITS, allow_null=False):
+    if isinstance(authors, str):
+        authors = authors.split(', ') if authors else []
+    elif not isinstance(authors, (list, tuple)):
+        authors = []
+
+    isbn = str(isbn or "").strip()
+    title = str(title or "").strip()
+    authors = [str(author) for author in authors if author]
+
+    if not isbn or not title or not authors:
+        raise ValueError("Hiányzó ISBN, cím vagy szerző.")
+
+    numbers = {}
+    for name, value in (("page_num", page_num), ("price", price), ("available", available)):
+        if value is None and allow_null:
+            numbers[name] = None
+            continue
+        # A JSON-ból érkező törtet nem csonkoljuk; a végtelen (pl. Decimal) int()-je OverflowError.
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(f"Érvénytelen szám: {name}={value!r}")
+        try:
+            number = int(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"Érvénytelen szám: {name}={value!r}")
+
+        low, high = limits[name]
+        if number < low or number > high:
+            raise ValueError(f"Tartományon kívüli érték: {name}={number} ({low}-{high})")
+        numbers[name] = number
+
+    return isbn, title, authors, numbers["page_num"], numbers["price"], numbers["available"]
+
+
+def build_search_condition(search_term, search_field):
+    if search_field not in SEARCH_FIELDS:
+        raise ValueError(f"Érvénytelen keresési mező: {search_field}")
+
+    if search_field in NUMERIC_FIELDS:
+        if search_term.strip() == "":
+            return None, ()
+        return sql.SQL("{} = %s").format(sql.Identifier(search_field)), (search_term,)
+
+    if search_field == "authors":
+        # A books_authors_text() IMMUTABLE függvény (schema.py), így a trigram kifejezésindex használható.
+        return sql.SQL("books_authors_text(authors) ILIKE %s"), (f"%{search_term}%",)
+
+    return sql.SQL("{} ILIKE %s").format(sql.Identifier(search_field)), (f"%{search_term}%",)
+
+
+def normalize_ranges(ranges):
+    # {mező: (min, max)} -> rendezett, hashelhető alak; a None határ nyitott intervallumot jelent.
+    # A már normalizált alakot (mező, min, max) hármasok sorozatát is elfogadja.
+    if isinstance(ranges, dict):
+        items = [(field, low, high) for field, (low, high) in ranges.items()]
+    else:
+        items = list(ranges or ())
+
+    normalized = []
+    for field, low, high in sorted(items, key=lambda item: item[0]):
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f"Érvénytelen szűrőmező: {field}")
+        low = int(low) if low is not None else None
+        high = int(high) if high is not None else None
+        if low is not None and high is not None and low > high:
+            raise ValueError(f"Üres tartomány: {field} {low}-{high}")
+        if low is not None or high is not None:
+            normalized.append((field, low, high))
+    return tuple(normalized)
+
+
+def parse_range(text):
+    # Parancssori alak: mező:min:max, ahol a határ elhagyható (pl. price::3000 vagy available:1:).
+    try:
+        field, low, high = text.split(":")
+        return field, (int(low) if low else None, int(high) if high else None)
+    except ValueError:
+        raise ValueError(f"Érvénytelen tartomány: {text!r} (mező:min:max)")
+
+
+def build_range_conditions(ranges):
+    conditions = []
+    params = []
+    for field, low, high in normalize_ranges(ranges):
+        if low is not None and high is not None:
+            conditions.append(sql.SQL("{} BETWEEN %s AND %s").format(sql.Identifier(field)))
+            params.extend((low, high))
+        elif low is not None:
+            conditions.append(sql.SQL("{} >= %s").format(sql.Identifier(field)))
+            params.append(low)
+        else:
+            conditions.append(sql.SQL("{} <= %s").format(sql.Identifier(field)))
+            params.append(high)
+    return conditions, params
+
+
+def build_conditions(search_term, search_field, ranges=None):
+    # A keresési feltétel és a tartományszűrők ÉS kapcsolatban, egyetlen paraméterezett WHERE-ben.
+    condition, params = build_search_condition(search_term, search_field)
+    conditions = [condition] if condition is not None else []
+    range_conditions, range_params = build_range_conditions(ranges)
+    return conditions + range_conditions, list(params) + range_params
+
+
+def books_in_ranges(books, ranges):
+    ranges = normalize_ranges(ranges)
+    if not ranges:
+        return books
+    checks = [(BOOK_COLUMN_INDEX[field], low, high) for field, low, high in ranges]
+    return [
+        book for book in books
+        if all((low is None or book[index] >= low) and (high is None or book[index] <= high)
+               for index, low, high in checks)
+    ]
+
+
+def build_order_by(sort_column=DEFAULT_SORT_COLUMN, descending=False):
+    if sort_column not in SORT_COLUMNS:
+        raise ValueError(f"Érvénytelen rendezési oszlop: {sort_column}")
+
+    direction = sql.SQL("DESC" if descending else "ASC")
+    if sort_column == "isbn":
+        return sql.SQL("ORDER BY isbn {}").format(direction)
+    return sql.SQL("ORDER BY {} {}, isbn {}").format(sql.Identifier(sort_column), direction, direction)
+
+
+def _compose_query(conditions, params, order_by, limit=None):
+    query = BOOK_SELECT
+    if conditions:
+        query = sql.SQL("{} WHERE {}").format(query, sql.SQL(" AND ").join(conditions))
+    query = sql.SQL("{} {}").format(query, order_by)
+    if limit is not None:
+        # A lapméret is paraméter, így minden lapméret ugyanazt az előkészített utasítást használja (query_registry.py).
+        query = sql.SQL("{} LIMIT %s").format(query)
+        params = list(params) + [limit]
+    return query, tuple(params)
+
+
+def build_search_query(search_term, search_field, sort_column=DEFAULT_SORT_COLUMN, ranges=None, descending=False):
+    conditions, params = build_conditions(search_term, search_field, ranges)
+    return _compose_query(conditions, params, build_order_by(sort_column, descending))
+
+
+def sort_key(book, sort_column=DEFAULT_SORT_COLUMN):
+    isbn = book[0]
+    if sort_column == "isbn":
+        return (isbn,)
+    return (book[BOOK_COLUMN_INDEX[sort_column]], isbn)
+
+
+def sort_books(books, sort_column=DEFAULT_SORT_COLUMN, descending=False):
+    # Memóriában lévő találatok rendezése ugyanarra a (mező, isbn) kulcsra, amit az adatbázis is használ.
+    if sort_column not in SORT_COLUMNS:
+        raise ValueError(f"Érvénytelen rendezési oszlop: {sort_column}")
+    index = BOOK_COLUMN_INDEX[sort_column]
+    if sort_column == "isbn":
+        return sorted(books, key=lambda book: book[0], reverse=descending)
+    if sort_column in NUMERIC_FIELDS:
+        # NULL az adatbázishoz hasonlóan növekvő sorrendben a végére, csökkenőben az elejére kerül.
+        return sorted(
+            books, key=lambda book: (book[index] is None, book[index] or 0, book[0]), reverse=descending
+        )
+    return sorted(books, key=lambda book: (book[index] is None, book[index] or "", book[0]), reverse=descending)
+
+
+def build_page_query(search_term, search_field, page_size, sort_column=DEFAULT_SORT_COLUMN, after=None, before=None,
+                     ranges=None, descending=False):
+    if page_size < 1:
+        raise ValueError(f"Érvénytelen oldalméret: {page_size}")
+    if after is not None and before is not None:
+        raise ValueError("Az after és before kulcs egyszerre nem adható meg.")
+
+    conditions, params = build_conditions(search_term, search_field, ranges)
+
+    key = after if after is not None else before
+    # Visszafelé lapozáskor, illetve csökkenő rendezésnél a kisebb kulcsok felé haladunk; a kettő együtt kioltja egymást.
+    backwards = (before is not None) != descending
+    order_by = build_order_by(sort_column, descending=backwards)
+    # Egy plusz sort kérünk le, így további lekérdezés nélkül kiderül, van-e még oldal.
+    limit = page_size + 1
+    if key is None:
+        return _compose_query(conditions, params, order_by, limit=limit)
+
+    # Keyset (seek) lapozás: a legutóbb látott kulcstól indexen lépünk tovább OFFSET helyett.
+    operator = sql.SQL("<" if backwards else ">")
+    if sort_column == "isbn":
+        return _compose_query(conditions + [sql.SQL("isbn {} %s").format(operator)], params + list(key), order_by,
+                              limit=limit)
+
+    # A NULL értékek növekvő sorrendben a végén, csökkenőben az elején állnak (az ORDER BY alapértelmezése), a
+    # sorösszehasonlítás viszont NULL-ra nem igaz; ezeket a sorokat külön feltétel adja vissza.
+    column = sql.Identifier(sort_column)
+    value, isbn = key
+    if value is None:
+        seeks = [(sql.SQL("{} IS NULL AND isbn {} %s").format(column, operator), [isbn])]
+        if backwards:
+            seeks.append((sql.SQL("{} IS NOT NULL").format(column), []))
+    else:
+        seeks = [(sql.SQL("({}, isbn) {} (%s, %s)").format(column, operator), [value, isbn])]
+        if not backwards:
+            seeks.append((sql.SQL("{} IS NULL").format(column), []))
+
+    parts = [
+        _compose_query(conditions + [seek], params + seek_params, order_by, limit=limit)
+        for seek, seek_params in seeks
+    ]
+    if len(parts) == 1:
+        return parts[0]
+    # VAGY-kapcsolatban a sorösszehasonlítás már nem indexfeltétel, és a lekérdezés a tábla elejétől szűrne;
+    # két, indexen rendezett részlekérdezést fűzünk össze.
+    query = sql.SQL("SELECT isbn, authors, title, page_num, price, available FROM ({}) AS page {} LIMIT %s").format(
+        sql.SQL(" UNION ALL ").join(sql.SQL("({})").format(query) for query, _ in parts), order_by
+    )
+    return query, tuple(param for _, part_params in parts for param in part_params) + (limit,)
+
+
+class BookPage:
+    def __init__(self, books, has_next, has_previous, sort_column=DEFAULT_SORT_COLUMN):
+        self.books = books
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.sort_column = sort_column
+
+    def first_key(self):
+        return sort_key(self.books[0], self.sort_column) if self.books else None
+
+    def last_key(self):
+        return sort_key(self.books[-1], self.sort_column) if self.books else None
+
+
+def list_books_page(cursor, search_term, search_field, page_size=PAGE_SIZE, sort_column=DEFAULT_SORT_COLUMN,
+                    after=None, before=None, ranges=None, descending=False):
+    query, params = build_page_query(
+        search_term, search_field, page_size, sort_column, after, before, ranges, descending
+    )
+    query_registry.execute(cursor, query, params)
+    books = cursor.fetchall()
+
+    has_more = len(books) > page_size
+    books = books[:page_size]
+
+    if before is not None:
+        books.reverse()
+        return BookPage(books, has_next=True, has_previous=has_more, sort_column=sort_column)
+
+    return BookPage(books, has_next=has_more, has_previous=after is not None, sort_column=sort_column)
+
+
+def page_from_books(books, page_size=PAGE_SIZE, sort_column=DEFAULT_SORT_COLUMN, after=None, before=None):
+    # Ugyanaz a lapozás, mint a list_books_page-ben, de egy már memóriában lévő, rendezett találati listán.
+    # A kulcsot egyezés alapján keressük, mert a Python és az adatbázis rendezése eltérhet.
+    def position(key):
+        key = tuple(key)
+        return next((index for index, book in enumerate(books) if sort_key(book, sort_column) == key), None)
+
+    if after is not None:
+        start = position(after)
+        start = start + 1 if start is not None else 0
+        page = books[start:start + page_size]
+        return BookPage(page, has_next=start + page_size < len(books), has_previous=True, sort_column=sort_column)
+
+    if before is not None:
+        end = position(before)
+        end = end if end is not None else len(books)
+        start = max(end - page_size, 0)
+        return BookPage(books[start:end], has_next=True, has_previous=start > 0, sort_column=sort_column)
+
+    return BookPage(books[:page_size], has_next=len(books) > page_size, has_previous=False, sort_column=sort_column)
+
+
+class BookStream:
+    # A találatokat batch_size soros keyset lapokban olvassuk (mint a list_books_page), minden adagot egy rövid
+    # időre kölcsönzött kapcsolaton: görgetés közben nem marad lefoglalt kapcsolat és nyitott tranzakció.
+    def __init__(self, search_term, search_field, batch_size=STREAM_BATCH_SIZE, collect_limit=None, ranges=None,
+                 sort_column=DEFAULT_SORT_COLUMN, descending=False):
+        self.search_term = search_term
+        self.search_field = search_field
+        self.ranges = ranges
+        self.sort_column = sort_column
+        self.descending = descending
+        self.batch_size = batch_size
+        # Legfeljebb collect_limit sorig a teljes találatot is megtartjuk (pl. az eredmény-gyorsítótárnak).
+        self.collect_limit = collect_limit
+        self.collected = [] if collect_limit is not None else None
+
+        self.connection = None
+        self.last_key = None
+        self.exhausted = False
+        self.closed = False
+        self.rows_fetched = 0
+
+        self._lock = threading.Lock()
+        # Külön zár védi a kapcsolatot, hogy a cancel() ne várjon a futó lekérdezésre,
+        # de ne szakíthasson meg egy már visszaadott, más által használt kapcsolatot.
+        self._connection_lock = threading.Lock()
+
+    def open(self):
+        return self.fetch_batch()
+
+    def fetch_batch(self):
+        with self._lock:
+            if self.closed or self.exhausted:
+                return []
+
+            page = self._fetch_page()
+            rows = page.books
+            self.rows_fetched += len(rows)
+            if self.collected is not None:
+                if self.rows_fetched > self.collect_limit:
+                    self.collected = None
+                else:
+                    self.collected.extend(rows)
+            self.last_key = page.last_key()
+            self.exhausted = not page.has_next
+            return rows
+
+    def _fetch_page(self):
+        pool = get_pool()
+        connection = pool.getconn()
+        with self._connection_lock:
+            self.connection = connection
+        try:
+            cursor = connection.cursor()
+            try:
+                page = list_books_page(
+                    cursor, self.search_term, self.search_field, self.batch_size, self.sort_column,
+                    after=self.last_key, ranges=self.ranges, descending=self.descending
+                )
+            finally:
+                cursor.close()
+            connection.commit()
+            return page
+        finally:
+            with self._connection_lock:
+                self.connection = None
+            pool.putconn(connection, close=bool(connection.closed))
+
+    def has_more(self):
+        return not self.exhausted and not self.closed
+
+    def cancel(self):
+        with self._connection_lock:
+            if self.connection is None or self.connection.closed:
+                return
+            try:
+                self.connection.cancel()
+            except psycopg2.Error as e:
+                print(f"Hiba a lekérdezés megszakítása során: {e}")
+
+    def close(self):
+        with self._lock:
+            self.closed = True
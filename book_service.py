@@ -0,0 +1,141 @@
+import psycopg2
+from psycopg2 import sql
+from psycopg2.errors import QueryCanceled, UndefinedTable
+
+from book_bulk import delete_books
+from book_queries import BOOK_SELECT, COLUMN_LIMITS, build_search_query, normalize_book
+from book_stats import statistics_cache, price_chart_cache
+from catalogue_index import catalogue_index
+from local_mirror import local_mirror
+from query_registry import query_registry
+
+
+# A könyvkezelés adatbázis-műveletei grafikus felület nélkül; a main.py és az rbd.py is ezeket használja.
+
+PRICE_CHART_BARS = 100
+
+
+def check_login(cursor, username, password):
+    query = sql.SQL("""
+        SELECT 1 FROM user_credentials
+        WHERE user_name = %s AND password = %s
+    """)
+    query_registry.execute(cursor, query, (username, password))
+    return cursor.fetchone() is not None
+
+
+def get_books_statistics(cursor):
+    try:
+        try:
+            # A books2_stats összesítő táblát triggerek tartják naprakészen (schema.py), így nem kell teljes táblát olvasni.
+            query_registry.execute(cursor, "SELECT book_count, page_sum FROM books2_stats WHERE id = 1")
+            result = cursor.fetchone()
+        except UndefinedTable:
+            cursor.connection.rollback()
+            result = None
+
+        if result is None:
+            query = "SELECT COUNT(*), SUM(page_num) FROM books2"
+            query_registry.execute(cursor, query)
+            result = cursor.fetchone()
+        if result:
+            return result[0], result[1]
+        return 0, 0
+    except QueryCanceled:
+        raise
+    except psycopg2.Error as e:
+        print(f"Hiba a statisztikák lekérdezése során: {e}")
+        return 0, 0
+
+
+def list_books_by_search(cursor, search_term, search_field, ranges=None):
+    # Kioszk módban a betöltött helyi katalógus válaszol, ha a kifejezés helyben kereshető.
+    if catalogue_index.is_ready():
+        books = catalogue_index.search(search_term, search_field, ranges)
+        if books is not None:
+            return books
+    # A helyi tükörből (local_mirror.py) lassú kapcsolaton és kapcsolat nélkül is olvashatunk.
+    if local_mirror.can_answer(search_term, search_field):
+        return local_mirror.search_books(search_term, search_field, ranges)
+
+    try:
+        query, params = build_search_query(search_term, search_field, ranges=ranges)
+        query_registry.execute(cursor, query, params)
+
+        books = cursor.fetchall()
+        return books
+
+    except QueryCanceled:
+        raise
+    except psycopg2.Error as e:
+        print(f"Hiba a könyvek lekérdezése során: {e}")
+        return []
+
+
+def find_book(cursor, isbn):
+    query_registry.execute(cursor, sql.SQL("{} WHERE isbn = %s").format(BOOK_SELECT), (isbn,))
+    return cursor.fetchone()
+
+
+def get_price_chart_data(cursor, bars=PRICE_CHART_BARS):
+    # Csökkenő árak szerinti kvantilisek: a régi, könyvenkénti oszlopdiagram alakja,
+    # de fix számú oszloppal, és az összesítést a szerver végzi.
+    fractions = [i / (bars - 1) for i in range(bars)]
+    query_registry.execute(cursor, """
+        SELECT COUNT(price), AVG(price), MAX(price),
+               percentile_disc(%s::float8[]) WITHIN GROUP (ORDER BY price DESC)
+        FROM books2
+    """, (fractions,))
+    price_count, avg_price, max_price, quantiles = cursor.fetchone()
+
+    if not price_count:
+        return [], 0, 0
+
+    if price_count < bars:
+        quantiles = [quantiles[round(i * (bars - 1) / max(price_count - 1, 1))] for i in range(price_count)]
+
+    return quantiles, float(avg_price), max_price
+
+
+def get_price_summary(cursor):
+    query_registry.execute(cursor, "SELECT AVG(price), MAX(price) FROM books2")
+    avg_price, max_price = cursor.fetchone()
+    if avg_price is None:
+        return 0, 0
+    return float(avg_price), max_price
+
+
+def load_dashboard_data(cursor):
+    book_count, page_count = statistics_cache.get(cursor, get_books_statistics)
+    prices, avg_price, max_price = price_chart_cache.get(cursor, get_price_chart_data)
+    return book_count, page_count, prices, avg_price, max_price
+
+
+def add_book(cursor, isbn, title, authors, page_num, price, available):
+    insert_data = normalize_book(isbn, title, authors, page_num, price, available)
+    query = sql.SQL("""
+        INSERT INTO books2 (isbn, title, authors, page_num, price, available)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """)
+    query_registry.execute(cursor, query, insert_data)
+    cursor.connection.commit()
+    return insert_data
+
+
+def update_book(cursor, isbn, title, authors, page_num, price, available):
+    isbn, title, authors, page_num, price, available = normalize_book(
+        isbn, title, authors, page_num, price, available, limits=COLUMN_LIMITS, allow_null=True
+    )
+    query = sql.SQL("""
+        UPDATE books2
+        SET title = %s, authors = %s, page_num = %s, price = %s, available = %s
+        WHERE isbn = %s
+    """)
+    query_registry.execute(cursor, query, (title, authors, page_num, price, available, isbn))
+    cursor.connection.commit()
+    return cursor.rowcount > 0
+
+
+def delete_book(cursor, username, isbn):
+    # A jogosultság hiányát a book_bulk.PermissionDenied kivétel jelzi.
+    return delete_books(cursor, username, [isbn]) > 0
@@ -0,0 +1,49 @@
+import threading
+import time
+
+
+STATS_CACHE_TTL = 30.0
+
+
+class StatisticsCache:
+    def __init__(self, ttl=STATS_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cursor, loader):
+        with self._lock:
+            if self._value is not None and time.monotonic() - self._loaded_at < self.ttl:
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            generation = self._generation
+
+        value = loader(cursor)
+
+        with self._lock:
+            # Ha betöltés közben érvénytelenítették, az eredményt nem tároljuk el.
+            if generation == self._generation:
+                self._value = value
+                self._loaded_at = time.monotonic()
+        return value
+
+    def set(self, value):
+        # Kívülről ismert friss érték (pl. változásértesítésből); a folyamatban lévő betöltés nem írja felül.
+        with self._lock:
+            self._value = value
+            self._loaded_at = time.monotonic()
+            self._generation += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._generation += 1
+
+
+statistics_cache = StatisticsCache()
+price_chart_cache = StatisticsCache()
@@ -0,0 +1,567 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+import psycopg2
+from psycopg2 import extensions
+
+from book_queries import DEFAULT_SORT_COLUMN, NUMERIC_FIELDS, SEARCH_FIELDS, normalize_ranges, sort_books
+from db_pool import db_connection
+from result_cache import LIKE_SPECIAL_CHARACTERS
+
+
+KIOSK_SETTINGS = {
+    "enabled": os.environ.get("RBD_KIOSK", "0") == "1",
+    "memory_budget": int(os.environ.get("RBD_KIOSK_MEMORY_MB", 512)) << 20,
+    "refresh_interval": float(os.environ.get("RBD_KIOSK_REFRESH", 10))
+}
+
+LOAD_BATCH_SIZE = 10000
+# Ennél több változás esetén olcsóbb a teljes újratöltés, mint a sorok egyenkénti javítása.
+DELTA_RELOAD_THRESHOLD = 20000
+# Ha a törölt/elavult bejegyzések aránya ennél nagyobb, a következő frissítés újraépíti az indexet.
+GARBAGE_RATIO = 0.25
+# Ha a jelöltek aránya ennél nagyobb, rendezés helyett az isbn sorrendű tömbön megyünk végig.
+DENSE_CANDIDATE_RATIO = 0.125
+
+TEXT_FIELDS = ("isbn", "title", "authors")
+
+# Becsült méretek (bájt) a memóriakerethez.
+ROW_OVERHEAD = 300
+TRIGRAM_KEY_SIZE = 120
+POSTING_SIZE = 4
+
+BOOK_SELECT_ALL = "SELECT isbn, authors, title, page_num, price, available FROM books2"
+
+# A számtömb nem tárolhat NULL-t; ezt az értéket az alkalmazás nem írja (COLUMN_LIMITS),
+# és a 32 bites "l" tömbbe is belefér.
+NULL_NUMBER = -2 ** 31
+
+
+class CatalogueBudgetExceeded(MemoryError):
+    pass
+
+
+class CatalogueResult:
+    # A háttérszálon futó keresés eredménye; books None, ha a kérdésre a helyi katalógus nem tud válaszolni.
+    def __init__(self, books):
+        self.books = books
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _text_values(book):
+    return {"isbn": book[0], "title": book[2], "authors": book[1]}
+
+
+def _stored_number(value):
+    return NULL_NUMBER if value is None else value
+
+
+def _loaded_number(value):
+    return None if value == NULL_NUMBER else value
+
+
+def _search_text(field, value):
+    if field == "authors":
+        return ', '.join(value or ()).lower()
+    return (value or "").lower()
+
+
+class _CatalogueData:
+    # Oszloponkénti tárolás: a szövegek listában, a számok tömbben; a törölt sorokat az alive jelzi.
+    def __init__(self, memory_budget):
+        self.memory_budget = memory_budget
+        self.isbns = []
+        self.authors = []
+        self.titles = []
+        self.numbers = {field: array("l") for field in NUMERIC_FIELDS}
+        self.alive = bytearray()
+        self.row_of = {}
+        self.live_rows = 0
+        self.garbage = 0
+
+        # Trigram -> sorszámok; a találatokat mindig a tényleges szövegen ellenőrizzük,
+        # így a módosított sorok régi bejegyzései nem adnak hamis találatot.
+        self.postings = {field: {} for field in TEXT_FIELDS}
+        self.posting_count = 0
+
+        # Rendezett tömbök: a sorszámok (érték, isbn) szerint, illetve a kulcsok isbn szerint.
+        self.sorted_rows = {}
+        self.sorted_values = {}
+        self.isbn_keys = []
+        self.isbn_rows = array("i")
+
+        self.text_bytes = 0
+
+    def estimated_bytes(self):
+        trigram_keys = sum(len(postings) for postings in self.postings.values())
+        rows = len(self.isbns)
+        return (
+            self.text_bytes + rows * ROW_OVERHEAD + trigram_keys * TRIGRAM_KEY_SIZE
+            + self.posting_count * POSTING_SIZE
+        )
+
+    def check_budget(self):
+        if self.estimated_bytes() > self.memory_budget:
+            raise CatalogueBudgetExceeded(
+                f"A helyi katalógus túllépte a memóriakeretet ({self.memory_budget >> 20} MB)."
+            )
+
+    def _index_text(self, row, book, previous=None):
+        values = _text_values(book)
+        old_values = _text_values(previous) if previous is not None else None
+        for field in TEXT_FIELDS:
+            trigrams = _trigrams(_search_text(field, values[field]))
+            if old_values is not None:
+                trigrams -= _trigrams(_search_text(field, old_values[field]))
+            postings = self.postings[field]
+            for trigram in trigrams:
+                posting = postings.get(trigram)
+                if posting is None:
+                    posting = postings[trigram] = array("i")
+                posting.append(row)
+            self.posting_count += len(trigrams)
+
+    def _text_size(self, book):
+        return len(book[0]) + len(book[2] or "") + sum(len(author) + 57 for author in book[1] or ())
+
+    def append(self, book):
+        row = len(self.isbns)
+        isbn, authors, title, page_num, price, available = book
+        self.isbns.append(isbn)
+        # Csak szöveget tartalmazó tuple: a szemétgyűjtő az első vizsgálat után nem követi tovább, így a
+        # több százezer sor nem lassítja a teljes gyűjtéseket.
+        self.authors.append(tuple(authors or ()))
+        self.titles.append(title)
+        self.numbers["page_num"].append(_stored_number(page_num))
+        self.numbers["price"].append(_stored_number(price))
+        self.numbers["available"].append(_stored_number(available))
+        self.alive.append(1)
+        self.row_of[isbn] = row
+        self.live_rows += 1
+        self.text_bytes += self._text_size(book)
+        self._index_text(row, book)
+        return row
+
+    def book(self, row):
+        return (
+            self.isbns[row], list(self.authors[row]), self.titles[row],
+            _loaded_number(self.numbers["page_num"][row]), _loaded_number(self.numbers["price"][row]),
+            _loaded_number(self.numbers["available"][row])
+        )
+
+    def build_sorted(self):
+        rows = [row for row in range(len(self.isbns)) if self.alive[row]]
+        rows.sort(key=self.isbns.__getitem__)
+        self.isbn_keys = [self.isbns[row] for row in rows]
+        self.isbn_rows = array("i", rows)
+
+        for field in NUMERIC_FIELDS:
+            values = self.numbers[field]
+            # A rows már isbn szerint rendezett, a stabil rendezés így (érték, isbn) sorrendet ad.
+            ordered = sorted(rows, key=values.__getitem__)
+            self.sorted_rows[field] = array("i", ordered)
+            self.sorted_values[field] = array("l", (values[row] for row in ordered))
+
+    def _sorted_position(self, field, row):
+        values = self.sorted_values[field]
+        rows = self.sorted_rows[field]
+        value = self.numbers[field][row]
+        low = bisect_left(values, value)
+        high = bisect_right(values, value)
+        isbn = self.isbns[row]
+        group = [self.isbns[rows[i]] for i in range(low, high)]
+        return low + bisect_left(group, isbn)
+
+    def _unlink_sorted(self, row):
+        position = bisect_left(self.isbn_keys, self.isbns[row])
+        del self.isbn_keys[position]
+        del self.isbn_rows[position]
+        for field in NUMERIC_FIELDS:
+            position = self._sorted_position(field, row)
+            del self.sorted_rows[field][position]
+            del self.sorted_values[field][position]
+
+    def _link_sorted(self, row):
+        position = bisect_left(self.isbn_keys, self.isbns[row])
+        self.isbn_keys.insert(position, self.isbns[row])
+        self.isbn_rows.insert(position, row)
+        for field in NUMERIC_FIELDS:
+            position = self._sorted_position(field, row)
+            self.sorted_rows[field].insert(position, row)
+            self.sorted_values[field].insert(position, self.numbers[field][row])
+
+    def upsert(self, book):
+        row = self.row_of.get(book[0])
+        if row is None:
+            row = self.append(book)
+            self._link_sorted(row)
+            return
+
+        previous = self.book(row)
+        self._unlink_sorted(row)
+        self.authors[row] = tuple(book[1] or ())
+        self.titles[row] = book[2]
+        self.numbers["page_num"][row] = _stored_number(book[3])
+        self.numbers["price"][row] = _stored_number(book[4])
+        self.numbers["available"][row] = _stored_number(book[5])
+        self.text_bytes += self._text_size(book) - self._text_size(previous)
+        self._index_text(row, book, previous)
+        self._link_sorted(row)
+        self.garbage += 1
+
+    def delete(self, isbn):
+        row = self.row_of.pop(isbn, None)
+        if row is None:
+            return
+        self._unlink_sorted(row)
+        self.alive[row] = 0
+        self.live_rows -= 1
+        self.garbage += 1
+
+    def needs_rebuild(self):
+        return self.garbage > GARBAGE_RATIO * max(self.live_rows, 1)
+
+    def range_rows(self, field, low, high):
+        values = self.sorted_values[field]
+        # A NULL értékek a tömb elején vannak, és az SQL-hez hasonlóan egyetlen tartományba sem esnek bele.
+        start = bisect_left(values, low) if low is not None else bisect_right(values, NULL_NUMBER)
+        end = bisect_right(values, high) if high is not None else len(values)
+        rows = list(self.sorted_rows[field][start:end])
+        rows.sort(key=self.isbns.__getitem__)
+        return rows
+
+    def search_rows(self, search_field, search_term):
+        if search_field in NUMERIC_FIELDS:
+            term = search_term.strip()
+            if not term:
+                return list(self.isbn_rows)
+            value = int(term)
+            values = self.sorted_values[search_field]
+            rows = self.sorted_rows[search_field]
+            return list(rows[bisect_left(values, value):bisect_right(values, value)])
+
+        needle = search_term.lower()
+        if not needle:
+            return list(self.isbn_rows)
+
+        # Egy-két karakteres kifejezésre nincs trigram; ilyenkor végignézzük az élő sorokat.
+        candidates = self.isbn_rows
+        ordered = True
+        if len(needle) >= 3:
+            postings = self.postings[search_field]
+            smallest = None
+            for trigram in _trigrams(needle):
+                posting = postings.get(trigram)
+                if posting is None:
+                    return []
+                if smallest is None or len(posting) < len(smallest):
+                    smallest = posting
+
+            if len(smallest) < DENSE_CANDIDATE_RATIO * len(self.isbn_rows):
+                candidates = set(smallest)
+                ordered = False
+            else:
+                marked = bytearray(len(self.isbns))
+                for row in smallest:
+                    marked[row] = 1
+                candidates = [row for row in self.isbn_rows if marked[row]]
+
+        values = {"isbn": self.isbns, "title": self.titles, "authors": self.authors}[search_field]
+        if search_field == "authors":
+            matches = [row for row in candidates if self.alive[row] and needle in ', '.join(values[row]).lower()]
+        else:
+            matches = [row for row in candidates if self.alive[row] and needle in (values[row] or "").lower()]
+        if not ordered:
+            matches.sort(key=self.isbns.__getitem__)
+        return matches
+
+
+class CatalogueIndex:
+    def __init__(self, memory_budget=None, refresh_interval=None):
+        self.memory_budget = memory_budget or KIOSK_SETTINGS["memory_budget"]
+        self.refresh_interval = refresh_interval or KIOSK_SETTINGS["refresh_interval"]
+
+        self._lock = threading.Lock()
+        self._data = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+        # A saját módosítások száma, illetve ebből mennyit tartalmaz már a legutóbb befejezett frissítés. Külön zár
+        # védi: a felület szála mentéskor nem várhat egy háttérben futó keresésre vagy frissítésre.
+        self._writes_lock = threading.Lock()
+        self._local_writes = 0
+        self._covered_writes = 0
+
+        self.state = "stopped"
+        self.last_error = None
+        self.synced_at = None
+        self.synced_xmin = None
+        self.loads = 0
+        self.refreshes = 0
+        self.load_time = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.state = "loading"
+        self._thread = threading.Thread(target=self._run, name="catalogue-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.state = "stopped"
+
+    def refresh_now(self):
+        self._wake.set()
+
+    def note_local_write(self):
+        # Saját módosítás után a frissítés aszinkron, ezért addig nem válaszolunk, amíg egy később indult
+        # frissítés nem tartalmazza a változást; addig a keresés az adatbázishoz fordul.
+        with self._writes_lock:
+            self._local_writes += 1
+        self._wake.set()
+
+    def _pending_writes(self):
+        with self._writes_lock:
+            return self._local_writes
+
+    def _cover_writes(self, writes):
+        with self._writes_lock:
+            self._covered_writes = max(self._covered_writes, writes)
+
+    def is_ready(self):
+        return self._data is not None
+
+    def staleness(self):
+        # Az adatok legalább ennyi másodperce egyeztek utoljára az adatbázissal.
+        if self.synced_at is None:
+            return None
+        return time.monotonic() - self.synced_at
+
+    def status(self):
+        data = self._data
+        return {
+            "state": self.state,
+            "rows": data.live_rows if data is not None else 0,
+            "bytes": data.estimated_bytes() if data is not None else 0,
+            "staleness": self.staleness(),
+            "loads": self.loads,
+            "refreshes": self.refreshes,
+            "load_time": self.load_time,
+            "last_error": self.last_error
+        }
+
+    def search(self, search_term, search_field, ranges=None):
+        # None: a kérdés helyben nem válaszolható meg, az adatbázishoz kell fordulni.
+        if search_field not in SEARCH_FIELDS:
+            raise ValueError(f"Érvénytelen keresési mező: {search_field}")
+        if search_field not in NUMERIC_FIELDS and any(c in search_term for c in LIKE_SPECIAL_CHARACTERS):
+            return None
+        if search_field in NUMERIC_FIELDS and search_term.strip() and not search_term.strip().isdigit():
+            return None
+
+        ranges = normalize_ranges(ranges)
+        with self._writes_lock:
+            if self._covered_writes < self._local_writes:
+                return None
+        # A frissítés a helyben módosított adatot ugyanezen zár alatt írja.
+        with self._lock:
+            data = self._data
+            if data is None:
+                return None
+            if ranges and not search_term.strip():
+                # Keresőkifejezés nélkül az első szűrő rendezett tömbjéből indulunk a teljes tábla helyett.
+                field, low, high = ranges[0]
+                rows = data.range_rows(field, low, high)
+            else:
+                rows = data.search_rows(search_field, search_term)
+            for field, low, high in ranges:
+                values = data.numbers[field]
+                rows = [
+                    row for row in rows
+                    if values[row] != NULL_NUMBER
+                    and (low is None or values[row] >= low) and (high is None or values[row] <= high)
+                ]
+            return [data.book(row) for row in rows]
+
+    def search_sorted(self, search_term, search_field, ranges=None, sort_column=DEFAULT_SORT_COLUMN,
+                      descending=False):
+        books = self.search(search_term, search_field, ranges)
+        return CatalogueResult(None if books is None else sort_books(books, sort_column, descending))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._data is None or self._data.needs_rebuild():
+                    self.reload()
+                else:
+                    self.refresh()
+                self.last_error = None
+            except CatalogueBudgetExceeded as e:
+                print(f"Hiba a helyi katalógus betöltése során: {e}")
+                with self._lock:
+                    self._data = None
+                self.state = "over_budget"
+                self.last_error = str(e)
+                return
+            except Exception as e:
+                # Bármilyen hiba (adatbázis, váratlan adat) esetén a szál életben marad, és később újrapróbálja;
+                # a keresések addig az adatbázishoz fordulnak, vagy a meglévő, elavult adatot használják.
+                print(f"Hiba a helyi katalógus frissítése során: {e}")
+                self.last_error = str(e)
+                self.state = "stale" if self._data is not None else "failed"
+
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+
+    def _snapshot_xmin(self, cursor):
+        cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+        return cursor.fetchone()[0]
+
+    def reload(self):
+        started = time.perf_counter()
+        writes = self._pending_writes()
+        data = _CatalogueData(self.memory_budget)
+
+        with db_connection() as connection:
+            if connection is None:
+                raise psycopg2.OperationalError("Nem sikerült csatlakozni az adatbázishoz.")
+            # Egyetlen pillanatkép: a betöltött sorok és a naplópozíció ugyanarra az állapotra vonatkozik.
+            connection.set_isolation_level(extensions.ISOLATION_LEVEL_REPEATABLE_READ)
+            try:
+                cursor = connection.cursor()
+                xmin = self._snapshot_xmin(cursor)
+                cursor.close()
+
+                stream = connection.cursor(name="catalogue_index_load")
+                stream.itersize = LOAD_BATCH_SIZE
+                stream.execute(BOOK_SELECT_ALL)
+                while not self._stop.is_set():
+                    rows = stream.fetchmany(LOAD_BATCH_SIZE)
+                    if not rows:
+                        break
+                    for book in rows:
+                        data.append(book)
+                    data.check_budget()
+                stream.close()
+                connection.commit()
+            finally:
+                connection.set_isolation_level(extensions.ISOLATION_LEVEL_DEFAULT)
+
+        if self._stop.is_set():
+            return
+
+        data.build_sorted()
+        data.check_budget()
+        with self._lock:
+            old_data, self._data = self._data, data
+        del old_data
+        self._cover_writes(writes)
+        self.synced_xmin = xmin
+        self.synced_at = time.monotonic()
+        self.loads += 1
+        self.load_time = time.perf_counter() - started
+        self.state = "ready"
+
+    def refresh(self):
+        writes = self._pending_writes()
+        with db_connection() as connection:
+            if connection is None:
+                raise psycopg2.OperationalError("Nem sikerült csatlakozni az adatbázishoz.")
+            connection.set_isolation_level(extensions.ISOLATION_LEVEL_REPEATABLE_READ)
+            try:
+                cursor = connection.cursor()
+                xmin = self._snapshot_xmin(cursor)
+                # A pillanatkép xmin értékétől visszafelé is olvasunk, így a korábban még futó,
+                # azóta lezárt tranzakciók változásai sem maradnak ki (az ismételt alkalmazás ártalmatlan).
+                cursor.execute(
+                    "SELECT DISTINCT isbn, operation = 'T' FROM books2_changes WHERE txid >= %s",
+                    (self.synced_xmin,)
+                )
+                changes = cursor.fetchall()
+
+                truncated = any(truncate for _, truncate in changes)
+                if truncated or len(changes) > DELTA_RELOAD_THRESHOLD:
+                    cursor.close()
+                    connection.commit()
+                    reload = True
+                else:
+                    reload = False
+                    isbns = list({isbn for isbn, _ in changes})
+                    books = []
+                    if isbns:
+                        cursor.execute(BOOK_SELECT_ALL + " WHERE isbn = ANY(%s)", (isbns,))
+                        books = cursor.fetchall()
+                    cursor.close()
+                    connection.commit()
+            finally:
+                connection.set_isolation_level(extensions.ISOLATION_LEVEL_DEFAULT)
+
+        if reload:
+            self.reload()
+            return
+
+        if isbns:
+            found = {book[0] for book in books}
+            with self._lock:
+                data = self._data
+                for book in books:
+                    data.upsert(book)
+                for isbn in isbns:
+                    if isbn not in found:
+                        data.delete(isbn)
+            data.check_budget()
+
+        self._cover_writes(writes)
+        self.synced_xmin = xmin
+        self.synced_at = time.monotonic()
+        self.refreshes += 1
+        self.state = "ready"
+
+
+catalogue_index = CatalogueIndex()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="A helyi katalógus betöltése és egy keresés időmérése.")
+    parser.add_argument("--field", choices=SEARCH_FIELDS, default="title", help="keresési mező")
+    parser.add_argument("--search", help="keresett kifejezés")
+    args = parser.parse_args(argv)
+
+    index = CatalogueIndex()
+    try:
+        index.reload()
+    except (psycopg2.Error, CatalogueBudgetExceeded) as e:
+        print(f"Hiba a helyi katalógus betöltése során: {e}", file=sys.stderr)
+        return 1
+
+    status = index.status()
+    print(f"Betöltve: {status['rows']} könyv, kb. {status['bytes'] >> 20} MB, {status['load_time']:.2f} s")
+
+    if args.search is not None:
+        started = time.perf_counter()
+        books = index.search(args.search, args.field)
+        elapsed = (time.perf_counter() - started) * 1000
+        if books is None:
+            print("A kifejezés helyben nem kereshető.")
+        else:
+            print(f"{len(books)} találat, {elapsed:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import select
+import sys
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions, sql
+
+from db_pool import get_pool
+
+
+CHANGE_FEED_SETTINGS = {
+    "enabled": os.environ.get("RBD_CHANGE_FEED", "1") == "1",
+    "reconnect_interval": float(os.environ.get("RBD_CHANGE_FEED_RECONNECT", 5))
+}
+
+# A books2 triggerei ezen a csatornán küldik az értesítéseket (schema.py, 7. migráció).
+CHANGE_CHANNEL = "books2_changes"
+OPERATIONS = ("I", "U", "D", "R")
+POLL_INTERVAL = 1.0
+# Az egyszerre érkező értesítéseket ennyi ideig gyűjtjük, hogy a felület egy lépésben frissüljön.
+BATCH_WINDOW = 0.05
+
+
+class BookChange:
+    def __init__(self, operation, isbn=None, book=None, book_count=None, page_sum=None):
+        self.operation = operation
+        self.isbn = isbn
+        self.book = book
+        self.book_count = book_count
+        self.page_sum = page_sum
+
+    @classmethod
+    def from_payload(cls, payload):
+        try:
+            data = json.loads(payload)
+            operation = data["op"]
+        except (ValueError, TypeError, KeyError):
+            raise ValueError(f"Érvénytelen értesítés: {payload!r}")
+        if operation not in OPERATIONS:
+            raise ValueError(f"Ismeretlen művelet az értesítésben: {operation!r}")
+
+        book = data.get("book")
+        if book is not None:
+            # A JSON tömb sorrendje megegyezik a BOOK_COLUMNS sorrendjével.
+            book = tuple(book)
+        return cls(operation, data.get("isbn"), book, data.get("count"), data.get("pages"))
+
+    def is_reload(self):
+        # Újratöltés: sok sort érintő utasítás, TRUNCATE vagy kimaradt értesítések.
+        return self.operation == "R"
+
+    def __repr__(self):
+        return f"BookChange({self.operation!r}, {self.isbn!r})"
+
+
+class ChangeFeed:
+    def __init__(self, callback, reconnect_interval=None):
+        # A callback a figyelő szálon fut, BookChange listát kap.
+        self.callback = callback
+        self.reconnect_interval = reconnect_interval or CHANGE_FEED_SETTINGS["reconnect_interval"]
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._connection = None
+
+        self.state = "stopped"
+        self.last_error = None
+        self.received = 0
+        self.batches = 0
+        self.connects = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.state = "connecting"
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.state = "stopped"
+
+    def status(self):
+        return {
+            "state": self.state,
+            "received": self.received,
+            "batches": self.batches,
+            "connects": self.connects,
+            "last_error": self.last_error
+        }
+
+    def _connect(self):
+        # Saját, tartósan nyitott kapcsolat: a LISTEN a kapcsolathoz kötődik, így nem foglal helyet a poolban.
+        connection = psycopg2.connect(**get_pool().connect_kwargs)
+        connection.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        cursor = connection.cursor()
+        cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(CHANGE_CHANNEL)))
+        cursor.close()
+        return connection
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._connection = self._connect()
+                self.connects += 1
+                self.state = "listening"
+                self.last_error = None
+                if self.connects > 1:
+                    # A kapcsolat kiesése alatt érkezett értesítések elvesztek.
+                    self.callback([BookChange("R")])
+                self._listen(self._connection)
+            except (psycopg2.Error, OSError) as e:
+                print(f"Hiba a változásfigyelés során: {e}")
+                self.state = "disconnected"
+                self.last_error = str(e)
+            finally:
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+
+            self._stop.wait(self.reconnect_interval)
+
+    def _listen(self, connection):
+        while not self._stop.is_set():
+            if not select.select([connection], [], [], POLL_INTERVAL)[0]:
+                continue
+
+            deadline = time.monotonic() + BATCH_WINDOW
+            connection.poll()
+            while time.monotonic() < deadline:
+                if select.select([connection], [], [], max(deadline - time.monotonic(), 0))[0]:
+                    connection.poll()
+
+            changes = []
+            for notify in connection.notifies:
+                try:
+                    changes.append(BookChange.from_payload(notify.payload))
+                except ValueError as e:
+                    print(f"Hiba a változásértesítés feldolgozása során: {e}")
+            connection.notifies.clear()
+
+            if changes:
+                self.received += len(changes)
+                self.batches += 1
+                self.callback(changes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="A books2 tábla változásainak folyamatos kiírása.")
+    parser.parse_args(argv)
+
+    def report(changes):
+        for change in changes:
+            print(f"{change.operation} {change.isbn or ''} (könyvek: {change.book_count}, oldalak: {change.page_sum})")
+
+    feed = ChangeFeed(report)
+    feed.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        feed.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+from instrumentation import InstrumentedCursor
+
+
+DB_SETTINGS = {
+    "host": os.environ.get("RBD_DB_HOST", "localhost"),
+    "database": os.environ.get("RBD_DB_NAME", "postgres"),
+    "user": os.environ.get("RBD_DB_USER", "postgres"),
+    "password": os.environ.get("RBD_DB_PASSWORD", "postgres")
+}
+
+POOL_SETTINGS = {
+    "minconn": int(os.environ.get("RBD_POOL_MIN", 1)),
+    "maxconn": int(os.environ.get("RBD_POOL_MAX", 5)),
+    "timeout": float(os.environ.get("RBD_POOL_TIMEOUT", 10)),
+    "validate_after": float(os.environ.get("RBD_POOL_VALIDATE_AFTER", 30))
+}
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, minconn=1, maxconn=5, timeout=10.0, validate_after=30.0, **connect_kwargs):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Érvénytelen pool méret: min={minconn}, max={maxconn}")
+
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.validate_after = validate_after
+        self.connect_kwargs = connect_kwargs or dict(DB_SETTINGS)
+
+        self._condition = threading.Condition()
+        self._idle = []
+        self._in_use = set()
+        self._closed = False
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "new_connections": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "timeouts": 0
+        }
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._stats["new_connections"] += 1
+
+    def _connect(self):
+        # Minden lekérdezés a mérő kurzoron keresztül fut (instrumentation.py).
+        connect_kwargs = dict(self.connect_kwargs)
+        connect_kwargs.setdefault("cursor_factory", InstrumentedCursor)
+        return psycopg2.connect(**connect_kwargs)
+
+    def _is_usable(self, connection, idle_since):
+        if connection.closed:
+            return False
+        if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - idle_since < self.validate_after:
+            return True
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, connection):
+        self._stats["discarded"] += 1
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        wait_started = None
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("A kapcsolat-pool le van zárva.")
+
+                if self._idle:
+                    connection, idle_since = self._idle.pop()
+                    break
+
+                if len(self._in_use) < self.maxconn:
+                    connection, idle_since = None, None
+                    break
+
+                if not waited:
+                    waited = True
+                    wait_started = time.monotonic()
+                    self._stats["waits"] += 1
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"Nincs szabad adatbázis-kapcsolat {self.timeout} másodpercen belül.")
+                self._condition.wait(remaining)
+
+            if wait_started is not None:
+                self._stats["wait_time"] += time.monotonic() - wait_started
+
+            # A helyet a kapcsolódás előtt foglaljuk le, hogy párhuzamos kérések ne lépjék túl a maxconn-t.
+            placeholder = object()
+            self._in_use.add(placeholder)
+
+        try:
+            if connection is not None and not self._is_usable(connection, idle_since):
+                with self._condition:
+                    self._discard(connection)
+                    self._stats["reconnects"] += 1
+                connection = None
+
+            if connection is None:
+                connection = self._connect()
+                with self._condition:
+                    self._stats["new_connections"] += 1
+        except BaseException:
+            with self._condition:
+                self._in_use.discard(placeholder)
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._in_use.discard(placeholder)
+            self._in_use.add(connection)
+            self._stats["checkouts"] += 1
+
+        return connection
+
+    def putconn(self, connection, close=False):
+        with self._condition:
+            if connection not in self._in_use:
+                raise psycopg2.InterfaceError("A kapcsolat nem ebből a poolból származik.")
+            self._in_use.discard(connection)
+
+            if not close and not self._closed and not connection.closed:
+                try:
+                    if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                        connection.rollback()
+                except psycopg2.Error:
+                    close = True
+            else:
+                close = True
+
+            idle_count = len(self._idle)
+            if close or idle_count >= self.maxconn:
+                self._discard(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        connection = self.getconn()
+        try:
+            yield connection
+        finally:
+            self.putconn(connection, close=bool(connection.closed))
+
+    def resize(self, minconn=None, maxconn=None):
+        with self._condition:
+            minconn = self.minconn if minconn is None else minconn
+            maxconn = self.maxconn if maxconn is None else maxconn
+            if minconn < 0 or maxconn < 1 or minconn > maxconn:
+                raise ValueError(f"Érvénytelen pool méret: min={minconn}, max={maxconn}")
+
+            self.minconn = minconn
+            self.maxconn = maxconn
+
+            while len(self._idle) > maxconn:
+                connection, _ = self._idle.pop(0)
+                self._discard(connection)
+
+            self._condition.notify_all()
+
+    def closeall(self):
+        with self._condition:
+            self._closed = True
+            for connection, _ in self._idle:
+                self._discard(connection)
+            self._idle = []
+            self._condition.notify_all()
+
+    def statistics(self):
+        with self._condition:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = len(self._in_use)
+            stats["minconn"] = self.minconn
+            stats["maxconn"] = self.maxconn
+            return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(**settings):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+        pool_settings = dict(POOL_SETTINGS)
+        connect_kwargs = dict(DB_SETTINGS)
+        for key, value in settings.items():
+            if key in pool_settings:
+                pool_settings[key] = value
+            else:
+                connect_kwargs[key] = value
+        _pool = ConnectionPool(**pool_settings, **connect_kwargs)
+        return _pool
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(**POOL_SETTINGS, **DB_SETTINGS)
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+@contextmanager
+def db_connection():
+    try:
+        pool = get_pool()
+        connection = pool.getconn()
+    except psycopg2.Error as e:
+        print(f"Hiba az adatbázishoz csatlakozás során: {e}")
+        yield None
+        return
+
+    try:
+        yield connection
+    finally:
+        pool.putconn(connection, close=bool(connection.closed))
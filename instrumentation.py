@@ -0,0 +1,386 @@
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions, sql
+
+from query_registry import STATEMENT_PREFIX, query_registry
+
+
+INSTRUMENTATION_SETTINGS = {
+    "log_path": os.environ.get("RBD_DIAGNOSTICS_LOG", "rbd_diagnostics.jsonl"),
+    "log_max_bytes": int(os.environ.get("RBD_DIAGNOSTICS_LOG_MB", 5)) << 20,
+    "slow_query_ms": float(os.environ.get("RBD_SLOW_QUERY_MS", 500)),
+    "explain_slow": os.environ.get("RBD_EXPLAIN_SLOW", "1") == "1"
+}
+
+LOG_BACKUPS = 3
+RECENT_QUERIES = 200
+SLOW_QUERIES = 20
+QUERY_TEXT_LENGTH = 300
+EXECUTE_PREFIX = "EXECUTE " + STATEMENT_PREFIX
+
+# név -> (a lekérdezés eleje, a folytatás megengedett kezdetei)
+EXPLAINABLE_QUERIES = {
+    "book_search": (
+        "SELECT isbn, authors, title, page_num, price, available FROM books2", (" WHERE ", " ORDER BY ", " LIMIT ")
+    ),
+    "book_stats": ("SELECT book_count, page_sum FROM books2_stats WHERE id = 1", ()),
+    "book_count": ("SELECT COUNT(*), SUM(page_num) FROM books2", ()),
+    "price_chart": (
+        "SELECT COUNT(price), AVG(price), MAX(price), percentile_disc(%s::float8[]) "
+        "WITHIN GROUP (ORDER BY price DESC) FROM books2", ()
+    )
+}
+# Ugyanazt a lekérdezést legfeljebb ilyen gyakran elemezzük újra, hiszen az EXPLAIN ANALYZE is lefuttatja.
+EXPLAIN_INTERVAL = 300.0
+MAX_TRACKED_QUERIES = 500
+
+
+def sql_text(query, cursor):
+    if isinstance(query, sql.Composable):
+        return query.as_string(cursor)
+    if isinstance(query, bytes):
+        return query.decode("utf-8", "replace")
+    return query
+
+
+def sql_hash(text):
+    # A szóközök eltérése nem számít külön lekérdezésnek.
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()[:12]
+
+
+def params_shape(params):
+    # Csak a paraméterek típusa kerül a naplóba, az értékük (pl. jelszó) soha.
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _value_shape(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_value_shape(value) for value in params]
+    return _value_shape(params)
+
+
+def _value_shape(value):
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def row_bytes(row):
+    # A hálózaton átjövő adat mérete nem érhető el, ezért az értékek szöveges hosszából becsüljük.
+    size = 0
+    for value in row:
+        if value is None:
+            continue
+        if isinstance(value, (str, bytes)):
+            size += len(value)
+        elif isinstance(value, (list, tuple)):
+            size += row_bytes(value)
+        else:
+            size += 8
+    return size
+
+
+def explainable_query(text):
+    # Az EXPLAIN ANALYZE le is futtatja a lekérdezést, ezért csak az ismert, csak olvasó könyv- és statisztika-
+    # lekérdezések kerülhetnek elemzésre; egy tetszőleges SELECT mellékhatással járhat (pl. pg_advisory_lock, nextval).
+    text = " ".join(text.split())
+    if ";" in text:
+        return None
+    for name, (prefix, tails) in EXPLAINABLE_QUERIES.items():
+        if text.startswith(prefix) and (text == prefix or any(text[len(prefix):].startswith(tail) for tail in tails)):
+            return name
+    return None
+
+
+class Diagnostics:
+    def __init__(self, settings=INSTRUMENTATION_SETTINGS):
+        self.slow_query_ms = settings["slow_query_ms"]
+        self.explain_slow = settings["explain_slow"]
+        self.log_path = settings["log_path"]
+        self.log_max_bytes = settings["log_max_bytes"]
+
+        self._lock = threading.Lock()
+        self._logger = None
+        # sql_hash -> összesítő; a legrégebben látott lekérdezés esik ki először.
+        self._queries = OrderedDict()
+        self._recent = deque(maxlen=RECENT_QUERIES)
+        self._slow = deque(maxlen=SLOW_QUERIES)
+        self._phases = {}
+        self._explained = {}
+        self._explain_queue = queue.Queue()
+        self._explain_thread = None
+
+    def record_query(self, record, query=None, params=None):
+        slow = record["elapsed_ms"] >= self.slow_query_ms
+        record["slow"] = slow
+        with self._lock:
+            self._recent.append(record)
+            summary = self._queries.pop(record["sql_hash"], None)
+            if summary is None:
+                summary = {"sql_hash": record["sql_hash"], "sql": record["sql"], "count": 0, "errors": 0,
+                           "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "bytes": 0}
+            summary["count"] += 1
+            summary["errors"] += record["error"] is not None
+            summary["total_ms"] += record["elapsed_ms"]
+            summary["max_ms"] = max(summary["max_ms"], record["elapsed_ms"])
+            summary["rows"] += record["rows"] or 0
+            summary["bytes"] += record["bytes"] or 0
+            self._queries[record["sql_hash"]] = summary
+            if len(self._queries) > MAX_TRACKED_QUERIES:
+                self._queries.popitem(last=False)
+            if slow:
+                self._slow.append(record)
+            explain = slow and self._should_explain(record, query)
+
+        self._log("query", record)
+        if explain:
+            self._submit_explain(record, query, params)
+
+    def record_phase(self, phase, elapsed_ms, **details):
+        with self._lock:
+            summary = self._phases.setdefault(phase, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0})
+            summary["count"] += 1
+            summary["total_ms"] += elapsed_ms
+            summary["max_ms"] = max(summary["max_ms"], elapsed_ms)
+            summary["last_ms"] = elapsed_ms
+        self._log("phase", dict(details, phase=phase, elapsed_ms=round(elapsed_ms, 3)))
+
+    @contextmanager
+    def phase(self, phase, **details):
+        started = time.perf_counter()
+        try:
+            yield details
+        finally:
+            self.record_phase(phase, (time.perf_counter() - started) * 1000, **details)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "queries": sorted((dict(summary) for summary in self._queries.values()),
+                                  key=lambda summary: summary["total_ms"], reverse=True),
+                "slow": [dict(record) for record in self._slow],
+                "phases": {phase: dict(summary) for phase, summary in self._phases.items()},
+                "slow_query_ms": self.slow_query_ms,
+                "log_path": self.log_path
+            }
+
+    def clear(self):
+        with self._lock:
+            self._queries.clear()
+            self._recent.clear()
+            self._slow.clear()
+            self._phases.clear()
+
+    def _should_explain(self, record, query):
+        # Csak zárolás alatt hívható.
+        if not self.explain_slow or query is None or record["error"] is not None:
+            return False
+        if record["explain_as"] is None:
+            return False
+        now = time.monotonic()
+        if now - self._explained.get(record["sql_hash"], -EXPLAIN_INTERVAL) < EXPLAIN_INTERVAL:
+            return False
+        self._explained[record["sql_hash"]] = now
+        return True
+
+    def _submit_explain(self, record, query, params):
+        # Az elemzés külön szálon és kapcsolaton fut, így a lassú lekérdezést nem lassítja tovább.
+        with self._lock:
+            if self._explain_thread is None:
+                self._explain_thread = threading.Thread(target=self._explain_worker, daemon=True)
+                self._explain_thread.start()
+        self._explain_queue.put((record, query, params))
+
+    def _explain_worker(self):
+        from db_pool import db_connection
+
+        while True:
+            record, query, params = self._explain_queue.get()
+            try:
+                with db_connection() as connection:
+                    if connection is None:
+                        continue
+                    # Sima kurzor: az elemzés maga nem kerül a mérések közé.
+                    cursor = connection.cursor(cursor_factory=extensions.cursor)
+                    try:
+                        # Biztonsági háló: csak olvasó tranzakcióban az esetleges írást (pl. nextval) a szerver elutasítja.
+                        cursor.execute("SET TRANSACTION READ ONLY")
+                        cursor.execute(sql.SQL("EXPLAIN (ANALYZE, BUFFERS) {}").format(
+                            query if isinstance(query, sql.Composable) else sql.SQL(sql_text(query, cursor))
+                        ), params)
+                        plan = "\n".join(row[0] for row in cursor.fetchall())
+                    finally:
+                        cursor.close()
+                        connection.rollback()
+            except psycopg2.Error as e:
+                plan = f"EXPLAIN hiba: {e}"
+            with self._lock:
+                record["plan"] = plan
+            self._log("explain", {"sql_hash": record["sql_hash"], "elapsed_ms": record["elapsed_ms"], "plan": plan})
+
+    def _log(self, event, data):
+        logger = self._get_logger()
+        if logger is None:
+            return
+        entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "event": event}
+        entry.update(data)
+        logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+
+    def _get_logger(self):
+        if not self.log_path:
+            return None
+        with self._lock:
+            if self._logger is None:
+                logger = logging.getLogger("rbd.diagnostics")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                try:
+                    handler = logging.handlers.RotatingFileHandler(
+                        self.log_path, maxBytes=self.log_max_bytes, backupCount=LOG_BACKUPS, encoding="utf-8"
+                    )
+                except OSError as e:
+                    print(f"Hiba a diagnosztikai napló megnyitása során: {e}")
+                    self.log_path = None
+                    return None
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                self._logger = logger
+            return self._logger
+
+
+diagnostics = Diagnostics()
+
+
+class InstrumentedCursor(extensions.cursor):
+    # A pool minden kapcsolata ezt a kurzort adja, így minden lekérdezés mérése egy helyen történik.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._record = None
+        self._query = None
+        self._params = None
+
+    def execute(self, query, vars=None):
+        self._finish()
+        self._start(query, vars)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        except psycopg2.Error as e:
+            self._record["error"] = type(e).__name__
+            raise
+        finally:
+            self._record["elapsed_ms"] += (time.perf_counter() - started) * 1000
+            self._after_execute()
+
+    def copy_expert(self, sql_query, file, size=8192):
+        self._finish()
+        self._start(sql_query, None)
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql_query, file, size)
+        except psycopg2.Error as e:
+            self._record["error"] = type(e).__name__
+            raise
+        finally:
+            self._record["elapsed_ms"] += (time.perf_counter() - started) * 1000
+            self._record["rows"] = self.rowcount if self.rowcount >= 0 else None
+            self._finish()
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if self._record is not None and self.name is not None:
+            self._count([row] if row is not None else [])
+            if row is None:
+                self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        if self._record is not None and self.name is not None:
+            self._count(rows)
+            if len(rows) < (self.arraysize if size is None else size):
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._record is not None and self.name is not None:
+            self._count(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def _start(self, query, params):
+        text = sql_text(query, self)
+        prepared = text.startswith(EXECUTE_PREFIX)
+        if prepared:
+            # Előkészített utasítás (query_registry.py): az eredeti szöveg alapján mérünk és elemzünk, mert
+            # a paraméterek sorrendje és alakja ugyanaz.
+            text = query_registry.source(text[len("EXECUTE "):].split(None, 1)[0]) or text
+            query = text
+        self._query = query
+        self._params = params
+        self._record = {
+            "sql_hash": sql_hash(text),
+            "sql": " ".join(text.split())[:QUERY_TEXT_LENGTH],
+            "params": params_shape(params),
+            "named": self.name is not None,
+            "prepared": prepared,
+            "explain_as": explainable_query(text),
+            "elapsed_ms": 0.0,
+            "rows": 0,
+            "bytes": 0,
+            "error": None
+        }
+
+    def _after_execute(self):
+        record = self._record
+        if record["error"] is not None:
+            self._finish()
+            return
+        if self.name is not None:
+            # Nevesített kurzornál a sorok a lekéréskor jönnek, ezért a mérés a kurzor végéig tart.
+            return
+        record["rows"] = max(self.rowcount, 0)
+        if self.description is not None and record["rows"]:
+            # Kliensoldali kurzornál a teljes eredmény már megérkezett; egy sorból becsüljük a méretét.
+            first_row = super().fetchone()
+            self.scroll(0, mode="absolute")
+            record["bytes"] = row_bytes(first_row) * record["rows"]
+        self._finish()
+
+    def _timed(self, fetch, *args):
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            if self._record is not None and self.name is not None:
+                self._record["elapsed_ms"] += (time.perf_counter() - started) * 1000
+
+    def _count(self, rows):
+        self._record["rows"] += len(rows)
+        if rows:
+            self._record["bytes"] += row_bytes(rows[0]) * len(rows)
+
+    def _finish(self):
+        record = self._record
+        if record is None:
+            return
+        self._record = None
+        record["elapsed_ms"] = round(record["elapsed_ms"], 3)
+        diagnostics.record_query(record, self._query, self._params)
+        self._query = None
+        self._params = None
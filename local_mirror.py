@@ -0,0 +1,471 @@
+import argparse
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+from book_queries import (
+    BookPage, DEFAULT_SORT_COLUMN, NUMERIC_FIELDS, SEARCH_FIELDS, SORT_COLUMNS, normalize_ranges
+)
+from catalogue_index import BOOK_SELECT_ALL, DELTA_RELOAD_THRESHOLD, LOAD_BATCH_SIZE
+from db_pool import db_connection, get_pool
+from result_cache import LIKE_SPECIAL_CHARACTERS
+from schema import CHANGE_LOG_RETENTION_DAYS
+
+
+MIRROR_SETTINGS = {
+    "enabled": os.environ.get("RBD_MIRROR", "0") == "1",
+    "path": os.environ.get("RBD_MIRROR_PATH", "rbd_mirror.sqlite3"),
+    "sync_interval": float(os.environ.get("RBD_MIRROR_SYNC", 30))
+}
+
+MIRROR_FORMAT = 1
+# A szerzőlista elválasztója a tükörben; a JSON-nál jóval gyorsabban bontható.
+AUTHOR_SEPARATOR = "\x1f"
+
+MIRROR_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS mirror_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS books (
+        isbn TEXT PRIMARY KEY,
+        authors TEXT NOT NULL,
+        title TEXT,
+        page_num INTEGER,
+        price INTEGER,
+        available INTEGER,
+        isbn_search TEXT,
+        title_search TEXT,
+        authors_search TEXT
+    );
+
+    CREATE INDEX IF NOT EXISTS books_title_idx ON books (title, isbn);
+    CREATE INDEX IF NOT EXISTS books_page_num_idx ON books (page_num, isbn);
+    CREATE INDEX IF NOT EXISTS books_price_idx ON books (price, isbn);
+    CREATE INDEX IF NOT EXISTS books_available_idx ON books (available, isbn);
+"""
+
+BOOK_COLUMNS_SQL = "isbn, authors, title, page_num, price, available"
+
+
+def _mirror_row(book):
+    # A keresett szövegek kisbetűs másolattal is a tükörbe kerülnek.
+    isbn, authors, title, page_num, price, available = book
+    authors = list(authors or ())
+    return (
+        isbn, AUTHOR_SEPARATOR.join(authors), title, page_num, price, available,
+        isbn.lower(), (title or "").lower(), ', '.join(authors).lower()
+    )
+
+
+def _book(row):
+    isbn, authors, title, page_num, price, available = row
+    return isbn, authors.split(AUTHOR_SEPARATOR) if authors else [], title, page_num, price, available
+
+
+def _source_name(connect_kwargs):
+    # A tükör csak ugyanannak az adatbázisnak a másolataként használható.
+    return f"{connect_kwargs.get('host', '')}:{connect_kwargs.get('port', '')}/{connect_kwargs.get('database', '')}"
+
+
+def _conditions(search_term, search_field, ranges):
+    if search_field not in SEARCH_FIELDS:
+        raise ValueError(f"Érvénytelen keresési mező: {search_field}")
+
+    conditions = []
+    params = []
+    if search_field in NUMERIC_FIELDS:
+        if search_term.strip():
+            conditions.append(f"{search_field} = ?")
+            params.append(int(search_term))
+    elif search_term:
+        conditions.append(f"instr({search_field}_search, ?) > 0")
+        params.append(search_term.lower())
+
+    for field, low, high in normalize_ranges(ranges):
+        if low is not None:
+            conditions.append(f"{field} >= ?")
+            params.append(low)
+        if high is not None:
+            conditions.append(f"{field} <= ?")
+            params.append(high)
+    return conditions, params
+
+
+def _order_by(sort_column, descending):
+    if sort_column not in SORT_COLUMNS:
+        raise ValueError(f"Érvénytelen rendezési oszlop: {sort_column}")
+    direction = "DESC" if descending else "ASC"
+    if sort_column == "isbn":
+        return f"ORDER BY isbn {direction}"
+    # A SQLite a NULL-t a legkisebb értéknek veszi; a PostgreSQL sorrendjét (NULL a növekvő sor végén) kérjük.
+    nulls = "NULLS FIRST" if descending else "NULLS LAST"
+    return f"ORDER BY {sort_column} {direction} {nulls}, isbn {direction}"
+
+
+class LocalMirror:
+    def __init__(self, path=None, sync_interval=None):
+        self.path = path or MIRROR_SETTINGS["path"]
+        self.sync_interval = sync_interval or MIRROR_SETTINGS["sync_interval"]
+
+        self._write_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._ready = False
+        self._local_writes = 0
+        self._covered_writes = 0
+
+        self.state = "stopped"
+        self.last_error = None
+        self.synced_xmin = None
+        self.synced_at = None
+        self.rows = 0
+        self.loads = 0
+        self.syncs = 0
+        self.last_sync_time = 0.0
+
+    @contextmanager
+    def _connect(self):
+        # Minden szál saját kapcsolatot nyit; WAL módban az olvasók nem várnak a szinkronizálásra.
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(MIRROR_SCHEMA)
+            meta = dict(connection.execute("SELECT key, value FROM mirror_meta"))
+            self.rows = connection.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+        source = _source_name(get_pool().connect_kwargs)
+        if meta.get("format") == str(MIRROR_FORMAT) and meta.get("source") == source and meta.get("synced_xmin"):
+            self.synced_xmin = int(meta["synced_xmin"])
+            self.synced_at = float(meta["synced_at"])
+            self._ready = True
+        return self._ready
+
+    def start(self):
+        if self._thread is not None:
+            return
+        # A meglévő másolat már az első szinkronizálás előtt olvasható.
+        try:
+            self.open()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Hiba a helyi tükör megnyitása során: {e}")
+            self.state = "failed"
+            self.last_error = str(e)
+            return
+        self._stop.clear()
+        self.state = "syncing"
+        self._thread = threading.Thread(target=self._run, name="local-mirror", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.state = "stopped"
+
+    def refresh_now(self):
+        self._wake.set()
+
+    def note_local_write(self):
+        # Mint a catalogue_index.py-ben: saját módosítás után a tükör addig nem válaszol, amíg egy később
+        # indult szinkronizálás nem tartalmazza a változást.
+        with self._lock:
+            self._local_writes += 1
+        self._wake.set()
+
+    def is_ready(self):
+        return self._ready
+
+    def is_serving(self):
+        # Elérhető adatbázis mellett a tükör csak az első szinkronizálásig (hidegindítás) válaszol, utána az
+        # adatbázis a friss forrás; kapcsolat nélkül ("offline") ismét a tükörből olvasunk.
+        if not self._ready or (self.syncs and self.state != "offline"):
+            return False
+        with self._lock:
+            return self._covered_writes >= self._local_writes
+
+    def staleness(self):
+        # A tükör a fájlba írt időpont óta nem egyezett az adatbázissal; induláskor ez az előző futásból jön.
+        if self.synced_at is None:
+            return None
+        return max(time.time() - self.synced_at, 0.0)
+
+    def status(self):
+        return {
+            "state": self.state,
+            "rows": self.rows,
+            "staleness": self.staleness(),
+            "loads": self.loads,
+            "syncs": self.syncs,
+            "last_sync_time": self.last_sync_time,
+            "last_error": self.last_error
+        }
+
+    def can_answer(self, search_term, search_field):
+        # Az ILIKE mintakarakterek és a hibás számok kezelését az adatbázisra hagyjuk.
+        if not self.is_serving() or search_field not in SEARCH_FIELDS:
+            return False
+        if search_field in NUMERIC_FIELDS:
+            return not search_term.strip() or search_term.strip().isdigit()
+        return not any(c in search_term for c in LIKE_SPECIAL_CHARACTERS)
+
+    def search_books(self, search_term, search_field, ranges=None, sort_column=DEFAULT_SORT_COLUMN, descending=False):
+        conditions, params = _conditions(search_term, search_field, ranges)
+        query = f"SELECT {BOOK_COLUMNS_SQL} FROM books"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " " + _order_by(sort_column, descending)
+        with self._connect() as connection:
+            return [_book(row) for row in connection.execute(query, params)]
+
+    def list_books_page(self, search_term, search_field, page_size, sort_column=DEFAULT_SORT_COLUMN, after=None,
+                        before=None, ranges=None, descending=False):
+        # Ugyanaz a keyset lapozás, mint a book_queries.list_books_page-ben, a helyi táblán.
+        if page_size < 1:
+            raise ValueError(f"Érvénytelen oldalméret: {page_size}")
+        conditions, params = _conditions(search_term, search_field, ranges)
+
+        key = after if after is not None else before
+        backwards = (before is not None) != descending
+        if key is not None:
+            operator = "<" if backwards else ">"
+            if sort_column == "isbn":
+                conditions.append(f"isbn {operator} ?")
+                params.extend(key)
+            elif key[0] is None:
+                # Mint a book_queries.build_page_query-ben: a NULL kulcsú sorok a nem NULL értékek után (visszafelé előttük).
+                extra = f" OR {sort_column} IS NOT NULL" if backwards else ""
+                conditions.append(f"(({sort_column} IS NULL AND isbn {operator} ?){extra})")
+                params.append(key[1])
+            else:
+                extra = "" if backwards else f" OR {sort_column} IS NULL"
+                conditions.append(f"(({sort_column}, isbn) {operator} (?, ?){extra})")
+                params.extend(key)
+
+        query = f"SELECT {BOOK_COLUMNS_SQL} FROM books"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" {_order_by(sort_column, backwards)} LIMIT ?"
+        params.append(page_size + 1)
+
+        with self._connect() as connection:
+            books = [_book(row) for row in connection.execute(query, params)]
+
+        has_more = len(books) > page_size
+        books = books[:page_size]
+        if before is not None:
+            books.reverse()
+            return BookPage(books, has_next=True, has_previous=has_more, sort_column=sort_column)
+        return BookPage(books, has_next=has_more, has_previous=after is not None, sort_column=sort_column)
+
+    def dashboard_data(self, bars):
+        # Ugyanaz az eredmény, mint a main.load_dashboard_data-é: darabszám, oldalszám és árkvantilisek.
+        # Az egyes árakat nem olvassuk be, csak áranként a darabszámot (a price index alapján).
+        with self._connect() as connection:
+            book_count, page_count, count, avg_price, max_price = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(page_num), 0), COUNT(price), AVG(price), MAX(price) FROM books"
+            ).fetchone()
+            if not count:
+                return book_count, page_count, [], 0, 0
+            groups = connection.execute(
+                "SELECT price, COUNT(*) FROM books WHERE price IS NOT NULL GROUP BY price ORDER BY price DESC"
+            ).fetchall()
+
+        # percentile_disc: az első olyan érték, amelynél a kumulált arány eléri a kért hányadot.
+        positions = [max(math.ceil(i / (bars - 1) * count), 1) for i in range(bars)]
+        quantiles = []
+        groups = iter(groups)
+        price, seen = None, 0
+        for position in positions:
+            while seen < position:
+                price, group_count = next(groups)
+                seen += group_count
+            quantiles.append(price)
+
+        if count < bars:
+            quantiles = [quantiles[round(i * (bars - 1) / max(count - 1, 1))] for i in range(count)]
+        return book_count, page_count, quantiles, avg_price, max_price
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.state = "syncing"
+            try:
+                self.sync()
+                self.state = "ready"
+                self.last_error = None
+            except (psycopg2.Error, sqlite3.Error, OSError, ValueError) as e:
+                print(f"Hiba a helyi tükör szinkronizálása során: {e}")
+                self.last_error = str(e)
+                # Kapcsolat nélkül a meglévő másolatból olvasunk tovább.
+                self.state = "offline" if self._ready else "failed"
+
+            self._wake.wait(self.sync_interval)
+            self._wake.clear()
+
+    def _needs_reload(self):
+        if not self._ready or self.synced_xmin is None:
+            return True
+        # A változásnapló régebbi bejegyzéseit a schema.prune_change_log törli.
+        return time.time() - self.synced_at > (CHANGE_LOG_RETENTION_DAYS - 1) * 86400
+
+    def sync(self, full=False):
+        with self._write_lock:
+            started = time.perf_counter()
+            with self._lock:
+                writes = self._local_writes
+            if full or self._needs_reload():
+                self._reload()
+                self.loads += 1
+            elif not self._apply_changes():
+                self._reload()
+                self.loads += 1
+            with self._lock:
+                self._covered_writes = max(self._covered_writes, writes)
+            self.syncs += 1
+            self.last_sync_time = time.perf_counter() - started
+
+    def _snapshot_xmin(self, cursor):
+        cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+        return cursor.fetchone()[0]
+
+    def _save_meta(self, connection, xmin):
+        self.rows = connection.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        synced_at = time.time()
+        connection.executemany("INSERT OR REPLACE INTO mirror_meta (key, value) VALUES (?, ?)", [
+            ("format", str(MIRROR_FORMAT)),
+            ("source", _source_name(get_pool().connect_kwargs)),
+            ("synced_xmin", str(xmin)),
+            ("synced_at", repr(synced_at))
+        ])
+        return synced_at
+
+    def _reload(self):
+        with db_connection() as connection:
+            if connection is None:
+                raise psycopg2.OperationalError("Nem sikerült csatlakozni az adatbázishoz.")
+            # Egyetlen pillanatkép: a betöltött sorok és a naplópozíció ugyanarra az állapotra vonatkozik.
+            connection.set_isolation_level(extensions.ISOLATION_LEVEL_REPEATABLE_READ)
+            try:
+                cursor = connection.cursor()
+                xmin = self._snapshot_xmin(cursor)
+                cursor.close()
+
+                stream = connection.cursor(name="local_mirror_load")
+                stream.itersize = LOAD_BATCH_SIZE
+                stream.execute(BOOK_SELECT_ALL)
+
+                # Egy SQLite tranzakció: az olvasók a csere végéig a korábbi teljes másolatot látják.
+                with self._connect() as mirror:
+                    with mirror:
+                        mirror.execute("DELETE FROM books")
+                        while not self._stop.is_set():
+                            rows = stream.fetchmany(LOAD_BATCH_SIZE)
+                            if not rows:
+                                break
+                            mirror.executemany(
+                                "INSERT OR REPLACE INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                [_mirror_row(book) for book in rows]
+                            )
+                        if self._stop.is_set():
+                            raise ValueError("A tükör betöltése megszakítva.")
+                        synced_at = self._save_meta(mirror, xmin)
+                stream.close()
+                connection.commit()
+            finally:
+                connection.set_isolation_level(extensions.ISOLATION_LEVEL_DEFAULT)
+
+        self.synced_xmin = xmin
+        self.synced_at = synced_at
+        self._ready = True
+
+    def _apply_changes(self):
+        # False: a változások túl nagyok (vagy TRUNCATE történt), teljes újratöltés kell.
+        with db_connection() as connection:
+            if connection is None:
+                raise psycopg2.OperationalError("Nem sikerült csatlakozni az adatbázishoz.")
+            connection.set_isolation_level(extensions.ISOLATION_LEVEL_REPEATABLE_READ)
+            try:
+                cursor = connection.cursor()
+                xmin = self._snapshot_xmin(cursor)
+                # Mint a catalogue_index.py-ben: a pillanatkép xmin értékétől visszafelé is olvasunk.
+                cursor.execute(
+                    "SELECT DISTINCT isbn, operation = 'T' FROM books2_changes WHERE txid >= %s",
+                    (self.synced_xmin,)
+                )
+                changes = cursor.fetchall()
+                if any(truncate for _, truncate in changes) or len(changes) > DELTA_RELOAD_THRESHOLD:
+                    cursor.close()
+                    connection.commit()
+                    return False
+
+                isbns = list({isbn for isbn, _ in changes})
+                books = []
+                if isbns:
+                    cursor.execute(BOOK_SELECT_ALL + " WHERE isbn = ANY(%s)", (isbns,))
+                    books = cursor.fetchall()
+                cursor.close()
+                connection.commit()
+            finally:
+                connection.set_isolation_level(extensions.ISOLATION_LEVEL_DEFAULT)
+
+        found = {book[0] for book in books}
+        with self._connect() as mirror:
+            with mirror:
+                mirror.executemany(
+                    "INSERT OR REPLACE INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [_mirror_row(book) for book in books]
+                )
+                mirror.executemany(
+                    "DELETE FROM books WHERE isbn = ?", [(isbn,) for isbn in isbns if isbn not in found]
+                )
+                synced_at = self._save_meta(mirror, xmin)
+
+        self.synced_xmin = xmin
+        self.synced_at = synced_at
+        return True
+
+
+local_mirror = LocalMirror()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="A helyi SQLite tükör szinkronizálása.")
+    parser.add_argument("--path", default=MIRROR_SETTINGS["path"], help="a tükör fájl helye")
+    parser.add_argument("--full", action="store_true", help="teljes újratöltés a változásnapló helyett")
+    args = parser.parse_args(argv)
+
+    mirror = LocalMirror(args.path)
+    try:
+        mirror.open()
+        mirror.sync(full=args.full)
+    except (psycopg2.Error, sqlite3.Error, OSError, ValueError) as e:
+        print(f"Hiba a helyi tükör szinkronizálása során: {e}", file=sys.stderr)
+        return 1
+
+    status = mirror.status()
+    print(f"Szinkronizálva: {status['rows']} könyv -> {mirror.path} ({status['last_sync_time']:.2f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
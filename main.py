@@ -1,63 +1,66 @@
 import sys
-import json
+import os
+import threading
+import time
+
+# Az indítási idők mérése a modulok betöltésével kezdődik.
+STARTUP_STARTED = time.perf_counter()
+
 import psycopg2
 from PySide6.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, QTableWidget, QPushButton,
-    QLabel, QStackedWidget, QFormLayout, QSpinBox, QComboBox, QTableWidgetItem, QRadioButton, QButtonGroup, QSpacerItem,
-    QSizePolicy, QMessageBox, QDialog
+    QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, QTableView, QPushButton,
+    QLabel, QStackedWidget, QFormLayout, QSpinBox, QComboBox, QHeaderView, QRadioButton, QButtonGroup, QSpacerItem,
+    QSizePolicy, QMessageBox, QDialog, QProgressBar, QAbstractItemView, QFileDialog, QPlainTextEdit, QCheckBox
 )
 from PySide6.QtGui import QFontDatabase, QFont, QPixmap, QImageReader, QPainter, QColor
-from PySide6.QtCore import QSize, Qt
-from PySide6.QtCharts import QChart, QChartView, QBarSet, QBarSeries, QBarCategoryAxis, QValueAxis, QLineSeries
+from PySide6.QtCore import QSize, Qt, Signal, QTimer
 from psycopg2 import sql
+from db_pool import db_connection, close_pool
+from query_executor import QueryExecutor
+from book_model import BookTableModel, BOOK_COLUMNS
+from schema import ensure_schema
+from book_stats import statistics_cache, price_chart_cache
+from book_queries import (
+    BookStream, BookPage, list_books_page, PAGE_SIZE, DEFAULT_SORT_COLUMN, COLUMN_LIMITS,
+    BOOK_LIMITS, NUMERIC_FIELDS, page_from_books, normalize_ranges, sort_books, SORT_COLUMNS, BOOK_COLUMN_INDEX,
+    books_in_ranges, sort_key
+)
+from result_cache import result_cache, filter_books, RESULT_CACHE_MAX_ROWS, LIKE_SPECIAL_CHARACTERS
+from catalogue_index import catalogue_index, CatalogueResult, KIOSK_SETTINGS
+from local_mirror import local_mirror, MIRROR_SETTINGS
+from book_import import import_books
+from book_export import export_books
+from book_bulk import delete_books, update_books, PermissionDenied, BULK_UPDATE_FIELDS
+from translation_catalogue import TranslationCatalogue, DEFAULT_LANGUAGE
+from instrumentation import diagnostics
+from book_service import check_login, add_book, update_book, load_dashboard_data, PRICE_CHART_BARS
+from change_feed import ChangeFeed, CHANGE_FEED_SETTINGS
 
 
-def connect_db():
-    try:
-        connection = psycopg2.connect(
-            host="localhost",
-            database="postgres",
-            user="postgres",
-            password="postgres"
-        )
-        return connection
-    except psycopg2.Error as e:
-        print(f"Hiba az adatbázishoz csatlakozás során: {e}")
-        return None
+STARTUP_REPORT = os.environ.get("RBD_STARTUP_REPORT", "0") == "1"
 
 
-def load_translations():
-    with open('translations.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
+class StartupTimer:
+    def __init__(self, started):
+        self.started = started
+        self.last = started
+        self.phases = []
 
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        diagnostics.record_phase(f"startup_{phase}", (now - self.last) * 1000)
+        self.last = now
 
-def delete_book(cursor, connection, username, isbn, translations, current_language):
-    try:
-        permission_query = sql.SQL("""
-            SELECT delete_permission FROM user_credentials
-            WHERE user_name = %s
-        """)
-        cursor.execute(permission_query, (username,))
-        permission = cursor.fetchone()
-
-        if not permission or not permission[0]:
-            error_title = translations.get(current_language, {}).get("permission_error_title")
-            error_message = translations.get(current_language, {}).get("permission_error_message")
-            QMessageBox.warning(None, error_title, error_message)
-            return False
-
-        query = sql.SQL("""
-            DELETE FROM books2
-            WHERE isbn = %s
-        """)
-        cursor.execute(query, (isbn,))
-        connection.commit()
+    def report(self):
+        lines = ["Indítási idők:"]
+        lines += [f"  {phase:<12}{elapsed * 1000:9.1f} ms" for phase, elapsed in self.phases]
+        lines.append(f"  {'összesen':<12}{(self.last - self.started) * 1000:9.1f} ms")
+        return "\n".join(lines)
 
-        return cursor.rowcount > 0
 
-    except (psycopg2.Error, ValueError) as e:
-        print("Hiba a könyv törlése során:", e)
-        return False
+startup_timer = StartupTimer(STARTUP_STARTED)
+startup_timer.mark("imports")
 
 
 class LoginDialog(QDialog):
@@ -92,21 +95,16 @@ class LoginDialog(QDialog):
         self.login_successful = False
 
     def handle_login(self):
-        connection = connect_db()
-        if connection:
+        with db_connection() as connection:
+            if not connection:
+                return
+
             cursor = connection.cursor()
 
             username = self.username_input.text()
             password = self.password_input.text()
 
-            query = sql.SQL("""
-                SELECT * FROM user_credentials
-                WHERE user_name = %s AND password = %s
-            """)
-            cursor.execute(query, (username, password))
-            user_data = cursor.fetchone()
-
-            if user_data:
+            if check_login(cursor, username, password):
                 QMessageBox.information(self, "Sikeres bejelentkezés", "Sikeresen bejelentkeztél!")
                 self.username = username
                 self.login_successful = True
@@ -115,7 +113,6 @@ class LoginDialog(QDialog):
                 QMessageBox.warning(self, "Hibás bejelentkezés", "Hibás felhasználónév vagy jelszó!")
 
             cursor.close()
-            connection.close()
 
     def open_register_dialog(self):
         register_dialog = RegisterDialog(self)
@@ -165,8 +162,10 @@ class RegisterDialog(QDialog):
         self.register_button.clicked.connect(self.handle_registration)
 
     def handle_registration(self):
-        connection = connect_db()
-        if connection:
+        with db_connection() as connection:
+            if not connection:
+                return
+
             cursor = connection.cursor()
 
             user_name = self.username_input.text()
@@ -201,120 +200,251 @@ class RegisterDialog(QDialog):
 
             QMessageBox.information(self, "Sikeres regisztráció", "Sikeresen regisztráltál!")
             cursor.close()
-            connection.close()
-
-            self.accept()
-
-
-def get_books_statistics(cursor):
-    try:
-        query = "SELECT COUNT(*), SUM(page_num) FROM books2"
-        cursor.execute(query)
-        result = cursor.fetchone()
-        if result:
-            return result[0], result[1]
-        return 0, 0
-    except psycopg2.Error as e:
-        print(f"Hiba a statisztikák lekérdezése során: {e}")
-        return 0, 0
-
-
-def list_books_by_search(cursor, search_term, search_field):
-    try:
-        valid_fields = {
-            "isbn": "isbn",
-            "authors": "authors",
-            "title": "title",
-            "page_num": "page_num",
-            "price": "price",
-            "available": "available"
-        }
 
-        if search_field not in valid_fields:
-            raise ValueError(f"Érvénytelen keresési mező: {search_field}")
+        self.accept()
 
-        if search_field in ["page_num", "price", "available"]:
-            if search_term.strip() == "":
-                query = sql.SQL(f"SELECT isbn, authors, title, page_num, price, available FROM books2")
-                cursor.execute(query)
-            else:
-                query = sql.SQL(
-                    f"SELECT isbn, authors, title, page_num, price, available FROM books2 WHERE {valid_fields[search_field]} = %s")
-                cursor.execute(query, (search_term,))
 
-        elif search_field == "authors":
-            query = sql.SQL(
-                f"SELECT isbn, authors, title, page_num, price, available FROM books2 WHERE array_to_string(authors, ', ') ILIKE %s")
-            cursor.execute(query, (f"%{search_term}%",))
+class ImportDialog(QDialog):
+    progress_changed = Signal(int, int, int, int)
 
-        else:
-            query = sql.SQL(
-                f"SELECT isbn, authors, title, page_num, price, available FROM books2 WHERE {valid_fields[search_field]} ILIKE %s")
-            cursor.execute(query, (f"%{search_term}%",))
+    def __init__(self, parent):
+        super().__init__(parent)
+
+        self.main_window = parent
+        self.setWindowTitle(parent.get_translation("import_books"))
+        self.setMinimumWidth(450)
 
-        books = cursor.fetchall()
-        return books
+        layout = QVBoxLayout()
 
-    except psycopg2.Error as e:
-        print(f"Hiba a könyvek lekérdezése során: {e}")
-        return []
+        file_layout = QHBoxLayout()
+        self.path_input = QLineEdit(self)
+        self.path_input.setPlaceholderText("CSV / JSONL")
+        self.browse_button = QPushButton(parent.get_translation("import_choose_file"))
+        file_layout.addWidget(self.path_input)
+        file_layout.addWidget(self.browse_button)
+
+        self.start_button = QPushButton(parent.get_translation("import_start"))
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(0)
+        self.status_label = QLabel("")
+        self.status_label.setWordWrap(True)
 
+        layout.addLayout(file_layout)
+        layout.addWidget(self.start_button)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status_label)
 
-def confirm_delete_book(self):
-    selected_row = self.book_table.currentRow()
+        self.setLayout(layout)
 
-    if selected_row == -1:
-        QMessageBox.warning(
-            self,
-            self.get_translation("error"),
-            self.get_translation("delete_warning")
+        self.browse_button.clicked.connect(self.choose_file)
+        self.start_button.clicked.connect(self.start_import)
+        # A háttérszálból érkező jelzést a Qt a felület szálába sorolja.
+        self.progress_changed.connect(self.update_progress)
+        parent.query_executor.finished.connect(self.on_import_finished)
+        parent.query_executor.failed.connect(self.on_import_failed)
+
+    def choose_file(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, self.main_window.get_translation("import_choose_file"), "",
+            "CSV / JSONL (*.csv *.jsonl *.ndjson *.json);;* (*)"
         )
-        return
+        if path:
+            self.path_input.setText(path)
 
-    isbn = self.book_table.item(selected_row, 0).text()
+    def start_import(self):
+        path = self.path_input.text().strip()
+        if not path:
+            return
 
-    msg_box = QMessageBox()
-    msg_box.setIcon(QMessageBox.Warning)
-    msg_box.setText(self.get_translation("delete_confirmation").format(isbn=isbn))
-    msg_box.setWindowTitle(self.get_translation("delete_title"))
-    msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+        self.start_button.setEnabled(False)
+        self.browse_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.status_label.setText(self.main_window.get_translation("loading"))
+        self.main_window.query_executor.submit_call("import", import_books, path, None, None, self.progress_changed.emit)
+
+    def update_progress(self, rows, rejected, position, total):
+        if total:
+            self.progress_bar.setValue(int(1000 * position / total))
+        self.status_label.setText(self.main_window.get_translation("import_progress").format(
+            rows=rows, rejected=rejected
+        ))
+
+    def on_import_finished(self, channel, request_id, result):
+        if channel != "import":
+            return
 
-    yes_button = msg_box.button(QMessageBox.Yes)
-    no_button = msg_box.button(QMessageBox.No)
-    yes_button.setText(self.get_translation("yes"))
-    no_button.setText(self.get_translation("no"))
+        self.start_button.setEnabled(True)
+        self.browse_button.setEnabled(True)
+        self.progress_bar.setValue(1000)
+        self.main_window.books_changed()
 
-    response = msg_box.exec()
+        message = self.main_window.get_translation("import_done").format(
+            rows=result.rows_read, inserted=result.inserted, updated=result.updated,
+            rejected=result.rejected, rate=int(result.rows_per_second())
+        )
+        if result.rejected_path:
+            message += "\n" + self.main_window.get_translation("import_rejected_file").format(path=result.rejected_path)
+        self.status_label.setText(message)
 
-    if response == QMessageBox.Yes:
-        connection = connect_db()
-        if connection:
-            cursor = connection.cursor()
+    def on_import_failed(self, channel, request_id, error):
+        if channel != "import":
+            return
 
-            username = self.logged_in_username
-            if self.delete_book(cursor, connection, username, isbn, self.translations, self.current_language):
-                success_message = self.translations.get(self.current_language, {}).get("delete_success")
-                QMessageBox.information(self, self.get_translation("success_title"), success_message)
-                self.refresh_books()
-            else:
-                error_message = self.translations.get(self.current_language, {}).get("delete_failure")
-                QMessageBox.warning(self, self.get_translation("error_title"), error_message)
+        self.start_button.setEnabled(True)
+        self.browse_button.setEnabled(True)
+        self.status_label.setText(f"{self.main_window.get_translation('import_error')}: {error}")
+
+    def done(self, result):
+        self.main_window.query_executor.finished.disconnect(self.on_import_finished)
+        self.main_window.query_executor.failed.disconnect(self.on_import_failed)
+        super().done(result)
 
-            cursor.close()
-            connection.close()
+
+class BulkUpdateDialog(QDialog):
+    def __init__(self, parent, count):
+        super().__init__(parent)
+
+        self.setWindowTitle(parent.get_translation("bulk_update"))
+        self.setMinimumWidth(350)
+
+        layout = QFormLayout()
+        layout.addRow(QLabel(parent.get_translation("bulk_update_selected").format(count=count)))
+
+        # Csak a bejelölt mezők változnak, a többi könyvenként megtartja az értékét.
+        self.field_inputs = {}
+        for field, translation_key in NUMERIC_FIELD_LABELS:
+            if field not in BULK_UPDATE_FIELDS:
+                continue
+            check_box = QCheckBox(parent.get_translation(translation_key))
+            spin_box = QSpinBox()
+            spin_box.setRange(*BOOK_LIMITS[field])
+            spin_box.setEnabled(False)
+            check_box.toggled.connect(spin_box.setEnabled)
+            check_box.toggled.connect(self.update_apply_button)
+            layout.addRow(check_box, spin_box)
+            self.field_inputs[field] = (check_box, spin_box)
+
+        button_layout = QHBoxLayout()
+        self.apply_button = QPushButton(parent.get_translation("save_changes"))
+        self.apply_button.setEnabled(False)
+        self.cancel_button = QPushButton(parent.get_translation("discard_changes"))
+        button_layout.addWidget(self.apply_button)
+        button_layout.addWidget(self.cancel_button)
+        layout.addRow(button_layout)
+
+        self.setLayout(layout)
+
+        self.apply_button.clicked.connect(self.accept)
+        self.cancel_button.clicked.connect(self.reject)
+
+    def update_apply_button(self):
+        self.apply_button.setEnabled(bool(self.changes()))
+
+    def changes(self):
+        return {
+            field: spin_box.value()
+            for field, (check_box, spin_box) in self.field_inputs.items() if check_box.isChecked()
+        }
+
+
+def book_matches_search(book, search_term, search_field, ranges=None):
+    # None: helyben nem dönthető el (pl. ILIKE minta), ilyenkor az adatbázis dönt a következő keresésnél.
+    if search_field in NUMERIC_FIELDS:
+        term = search_term.strip()
+        if term and not term.isdigit():
+            return None
+        matches = not term or book[BOOK_COLUMN_INDEX[search_field]] == int(term)
+    elif any(c in search_term for c in LIKE_SPECIAL_CHARACTERS):
+        return None
+    else:
+        matches = bool(filter_books([book], search_field, search_term))
+    return matches and bool(books_in_ranges([book], ranges))
+
+
+NUMERIC_FIELD_LABELS = (("page_num", "page_count"), ("price", "price"), ("available", "available"))
+DIAGNOSTICS_TOP_QUERIES = 20
+SEARCH_DEBOUNCE_MS = 300
+SEARCH_CONCURRENCY = 2
 
 
 class MainWindow(QMainWindow):
+    export_progress_changed = Signal(int, int)
+    remote_changes_received = Signal(object)
+
     def __init__(self):
         super().__init__()
-        self.translations = load_translations()
-        self.current_language = 'hu'
+        self._translations = None
+        self.current_language = DEFAULT_LANGUAGE
+        self.first_paint_done = False
 
         self.logged_in_username = None
+        self.book_stream = None
+        self.page_query = None
+        self.current_page = None
+        self.page_number = 1
+        self.pending_page_number = 1
+        self.last_search = None
+        self.local_books = None
+        self.mirror_search = False
+        self.search_generation = 0
+        self.sort_column = DEFAULT_SORT_COLUMN
+        self.sort_descending = False
+        self.change_feed = None
+
+        self.query_executor = QueryExecutor(self)
+        # Egy keresés fut, egy pedig még a megszakítását fejezheti be; a többi gépelés közben elavul.
+        self.query_executor.set_channel_limit("search", SEARCH_CONCURRENCY)
+        self.query_executor.finished.connect(self.on_query_finished)
+        self.query_executor.failed.connect(self.on_query_failed)
+        self.query_executor.busy_changed.connect(self.on_query_busy_changed)
+
+        # A keresésekhez szükséges függvényt a bejelentkezés alatt, a lassú indexépítést utána,
+        # a háttérben hozzuk létre.
+        schema_thread = threading.Thread(target=ensure_schema, kwargs={"required_only": True}, daemon=True)
+        schema_thread.start()
 
         self.show_login_dialog()
+        startup_timer.mark("login")
+
+        schema_thread.join()
+        # A lassú indexépítés percekig tarthat, ezért nem a lekérdezések szálkészletét foglalja.
+        threading.Thread(target=ensure_schema, daemon=True).start()
+        startup_timer.mark("schema")
+
+        if KIOSK_SETTINGS["enabled"]:
+            catalogue_index.start()
+        if MIRROR_SETTINGS["enabled"]:
+            local_mirror.start()
 
         self.init_ui()
+        startup_timer.mark("ui")
+
+        if CHANGE_FEED_SETTINGS["enabled"]:
+            # A figyelő szálról érkező változások a jelzésen keresztül a fő szálon kerülnek a felületre.
+            self.remote_changes_received.connect(self.apply_remote_changes)
+            self.change_feed = ChangeFeed(self.remote_changes_received.emit)
+            self.change_feed.start()
+
+    @property
+    def translations(self):
+        if self._translations is None:
+            self._translations = TranslationCatalogue(self.current_language)
+        return self._translations
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            startup_timer.mark("first_paint")
+            # A betűtípus betöltése nem késlelteti az ablak első megjelenését.
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        self.load_fonts()
+        startup_timer.mark("fonts")
+        if STARTUP_REPORT:
+            print(startup_timer.report())
 
     def show_login_dialog(self):
         login_dialog = LoginDialog()
@@ -332,15 +462,6 @@ class MainWindow(QMainWindow):
         label.setAlignment(Qt.AlignCenter)
         self.setCentralWidget(label)
 
-        font_id = QFontDatabase.addApplicationFont("TitilliumWeb-Regular.ttf")
-        font_family = QFontDatabase.applicationFontFamilies(font_id)[0]
-
-        font = QFont(font_family, 11)
-        font.setHintingPreference(QFont.PreferNoHinting)
-        font.setStyleStrategy(QFont.PreferAntialias)
-
-        app.setFont(font)
-
         self.setWindowTitle("Könyvkezelő")
         self.setGeometry(100, 100, 1080, 640)
 
@@ -377,23 +498,28 @@ class MainWindow(QMainWindow):
 
         self.show_query_page()
 
-    def create_price_chart(self, cursor):
-        cursor.execute("SELECT title, price FROM books2")
-        books = cursor.fetchall()
+    def load_fonts(self):
+        font_id = QFontDatabase.addApplicationFont("TitilliumWeb-Regular.ttf")
+        font_families = QFontDatabase.applicationFontFamilies(font_id)
+        if not font_families:
+            print("Hiba a betűtípus betöltése során: TitilliumWeb-Regular.ttf")
+            return
+
+        font = QFont(font_families[0], 11)
+        font.setHintingPreference(QFont.PreferNoHinting)
+        font.setStyleStrategy(QFont.PreferAntialias)
 
-        books_sorted = sorted(books, key=lambda x: x[1], reverse=True)
+        QApplication.setFont(font)
+
+    def create_price_chart(self, prices, avg_price, max_price):
+        # A QtCharts betöltése lassú, ezért csak az első diagram elkészítésekor importáljuk.
+        from PySide6.QtCharts import QChart, QChartView, QBarSet, QBarSeries, QBarCategoryAxis, QValueAxis, QLineSeries
 
         bar_set = QBarSet(self.get_translation("price"))
         bar_set.setColor(QColor("#73bfb2"))
+        bar_set.append(prices)
 
-        categories = []
-        prices = []
-
-        for book in books_sorted:
-            title, price = book
-            categories.append(title)
-            bar_set.append(price)
-            prices.append(price)
+        categories = [str(i) for i in range(len(prices))]
 
         series = QBarSeries()
         series.append(bar_set)
@@ -409,7 +535,7 @@ class MainWindow(QMainWindow):
         chart.addAxis(axis_x, Qt.AlignBottom)
         series.attachAxis(axis_x)
 
-        max_price = max(prices)
+        max_price = max_price or 1
         axis_y = QValueAxis()
         axis_y.setRange(0, max_price)
         chart.addAxis(axis_y, Qt.AlignLeft)
@@ -417,11 +543,9 @@ class MainWindow(QMainWindow):
 
         chart.legend().hide()
 
-        avg_price = sum(prices) / len(prices) if prices else 0
-
         avg_line_series = QLineSeries()
         avg_line_series.append(0, avg_price)
-        avg_line_series.append(len(categories) - 1, avg_price)
+        avg_line_series.append(max(len(categories) - 1, 0), avg_price)
         chart.addSeries(avg_line_series)
 
         avg_line_series.attachAxis(axis_x)
@@ -568,6 +692,45 @@ class MainWindow(QMainWindow):
             self.show_settings_page()
 
     def create_pages(self):
+        # Az oldalak csak az első megjelenítésükkor épülnek fel.
+        self.pages = {}
+        # Melyik nyelven készült el utoljára az oldal szövege; a rejtett oldalakat csak megjelenítéskor fordítjuk.
+        self.page_languages = {}
+        self.visible_page = None
+        self.page_factories = {
+            "dashboard": (self.create_dashboard_page, None),
+            "query": (self.create_query_page, self.retranslate_query_page),
+            "modify": (self.create_modify_page, self.retranslate_modify_page),
+            "add": (self.create_add_page, self.retranslate_add_page),
+            "settings": (self.create_settings_page, self.retranslate_settings_page)
+        }
+
+    def page(self, name):
+        widget = self.pages.get(name)
+        if widget is None:
+            create_page, _ = self.page_factories[name]
+            with diagnostics.phase("page_build", page=name):
+                widget = create_page()
+            self.pages[name] = widget
+            self.page_languages[name] = self.current_language
+            self.right_panel.addWidget(widget)
+        return widget
+
+    def show_page(self, name):
+        widget = self.page(name)
+        self.retranslate_page(name)
+        self.visible_page = name
+        self.right_panel.setCurrentWidget(widget)
+
+    def retranslate_page(self, name):
+        if self.page_languages.get(name, self.current_language) == self.current_language:
+            return
+        _, retranslate_page = self.page_factories[name]
+        if retranslate_page is not None:
+            retranslate_page()
+        self.page_languages[name] = self.current_language
+
+    def create_dashboard_page(self):
         dashboard_layout = QVBoxLayout()
 
         self.book_count_label = QLabel("Könyvek száma: Betöltés...")
@@ -599,20 +762,7 @@ class MainWindow(QMainWindow):
 
         dashboard_widget = QWidget()
         dashboard_widget.setLayout(dashboard_layout)
-        self.right_panel.addWidget(dashboard_widget)
-
-        self.dashboard_page = dashboard_widget
-
-        self.query_page = self.create_query_page()
-        self.modify_page = self.create_modify_page()
-        self.right_panel.addWidget(self.query_page)
-        self.right_panel.addWidget(self.modify_page)
-
-        self.add_page = self.create_add_page()
-        self.right_panel.addWidget(self.add_page)
-
-        self.settings_page = self.create_settings_page()
-        self.right_panel.addWidget(self.settings_page)
+        return dashboard_widget
 
     def create_modify_page(self):
         modify_layout = QFormLayout()
@@ -621,18 +771,18 @@ class MainWindow(QMainWindow):
         self.modify_title_input = QLineEdit()
         self.modify_authors_input = QLineEdit()
         self.modify_page_num_input = QSpinBox()
-        self.modify_page_num_input.setRange(1, 10000)
+        self.modify_page_num_input.setRange(*BOOK_LIMITS["page_num"])
         self.modify_price_input = QSpinBox()
-        self.modify_price_input.setRange(1, 1000000)
+        self.modify_price_input.setRange(*BOOK_LIMITS["price"])
         self.modify_available_input = QSpinBox()
-        self.modify_available_input.setRange(0, 1000)
+        self.modify_available_input.setRange(*BOOK_LIMITS["available"])
 
-        self.modify_isbn_label = QLabel(self.get_translation("isbn"))
-        self.modify_title_label = QLabel(self.get_translation("title"))
-        self.modify_authors_label = QLabel(self.get_translation("authors"))
-        self.modify_page_num_label = QLabel(self.get_translation("page_count"))
-        self.modify_price_label = QLabel(self.get_translation("price"))
-        self.modify_available_label = QLabel(self.get_translation("available"))
+        self.modify_isbn_label = QLabel(self.get_translation("isbn") + ":")
+        self.modify_title_label = QLabel(self.get_translation("title") + ":")
+        self.modify_authors_label = QLabel(self.get_translation("authors") + ":")
+        self.modify_page_num_label = QLabel(self.get_translation("page_count") + ":")
+        self.modify_price_label = QLabel(self.get_translation("price") + ":")
+        self.modify_available_label = QLabel(self.get_translation("available") + ":")
 
         modify_layout.addRow(self.modify_isbn_label, self.modify_isbn_input)
         modify_layout.addRow(self.modify_title_label, self.modify_title_input)
@@ -673,32 +823,34 @@ class MainWindow(QMainWindow):
         return modify_widget
 
     def save_book_changes(self):
-        connection = connect_db()
-        if connection:
-            cursor = connection.cursor()
-
-            isbn = self.modify_isbn_input.text()
-            title = self.modify_title_input.text()
-            authors = self.modify_authors_input.text()
-            page_num = self.modify_page_num_input.value()
-            price = self.modify_price_input.value()
-            available = self.modify_available_input.value()
+        with db_connection() as connection:
+            if not connection:
+                return
 
-            query = sql.SQL("""
-                UPDATE books2
-                SET title = %s, authors = %s, page_num = %s, price = %s, available = %s
-                WHERE isbn = %s
-            """)
+            cursor = connection.cursor()
 
-            cursor.execute(query, (title, authors.split(', '), page_num, price, available, isbn))
-            connection.commit()
+            try:
+                update_book(
+                    cursor,
+                    self.modify_isbn_input.text(),
+                    self.modify_title_input.text(),
+                    self.modify_authors_input.text(),
+                    self.modify_number(self.modify_page_num_input),
+                    self.modify_number(self.modify_price_input),
+                    self.modify_number(self.modify_available_input)
+                )
+            except (psycopg2.Error, ValueError) as e:
+                print(f"Hiba a könyv módosítása során: {e}")
+                self.status_label.setText(self.get_translation("modify_error"))
+                return
+            finally:
+                cursor.close()
 
-            cursor.close()
-            connection.close()
+        self.books_changed()
 
-            self.clear_modify_inputs()
+        self.clear_modify_inputs()
 
-            self.status_label.setText(self.get_translation("success_message"))
+        self.status_label.setText(self.get_translation("success_message"))
 
     def discard_book_changes(self):
         self.clear_modify_inputs()
@@ -709,65 +861,222 @@ class MainWindow(QMainWindow):
         self.modify_isbn_input.clear()
         self.modify_title_input.clear()
         self.modify_authors_input.clear()
-        self.modify_page_num_input.setValue(1)
-        self.modify_price_input.setValue(1)
-        self.modify_available_input.setValue(0)
+        for spin_box, field in ((self.modify_page_num_input, "page_num"), (self.modify_price_input, "price"),
+                                (self.modify_available_input, "available")):
+            spin_box.setSpecialValueText("")
+            spin_box.setRange(*BOOK_LIMITS[field])
+            spin_box.setValue(spin_box.minimum())
+
+    def modify_number(self, spin_box):
+        # A NULL értékű mezőt a legkisebb érték és a helyette kiírt jel mutatja; érintetlenül NULL marad.
+        if spin_box.specialValueText() and spin_box.value() == spin_box.minimum():
+            return None
+        return spin_box.value()
 
     def open_modify_book_page(self):
-        selected_row = self.book_table.currentRow()
+        selected_row = self.book_table.currentIndex().row()
         if selected_row == -1:
             error_message = self.get_translation("select_book_error")
             QMessageBox.warning(self, self.get_translation("error"), error_message)
             return
 
-        isbn = self.book_table.item(selected_row, 0).text()
-        authors = self.book_table.item(selected_row, 1).text()
-        title = self.book_table.item(selected_row, 2).text()
-        page_num = int(self.book_table.item(selected_row, 3).text())
-        price = int(self.book_table.item(selected_row, 4).text())
-        available = int(self.book_table.item(selected_row, 5).text())
+        isbn, authors, title, page_num, price, available = self.book_model.book_at(selected_row)
 
+        self.page("modify")
         self.modify_isbn_input.setText(isbn)
         self.modify_title_input.setText(title)
         self.modify_authors_input.setText(authors)
-        self.modify_page_num_input.setValue(page_num)
-        self.modify_price_input.setValue(price)
-        self.modify_available_input.setValue(available)
-
-        self.right_panel.setCurrentWidget(self.modify_page)
+        # A tárolt érték a felvételkor érvényes tartományon kívül is lehet; a mező ne vágja le csendben.
+        for spin_box, field, value in ((self.modify_page_num_input, "page_num", page_num),
+                                       (self.modify_price_input, "price", price),
+                                       (self.modify_available_input, "available", available)):
+            if value is None:
+                # Az oszlop teljes tartománya alatti egy jelöli a NULL-t.
+                low, high = COLUMN_LIMITS[field]
+                spin_box.setRange(low - 1, high)
+                spin_box.setSpecialValueText("-")
+                spin_box.setValue(low - 1)
+                continue
+            low, high = BOOK_LIMITS[field]
+            spin_box.setSpecialValueText("")
+            spin_box.setRange(min(low, value), max(high, value))
+            spin_box.setValue(value)
+
+        self.show_page("modify")
 
     def show_dashboard(self):
-        connection = connect_db()
-        if connection:
-            cursor = connection.cursor()
-            book_count, page_count = get_books_statistics(cursor)
+        self.page("dashboard")
+        self.book_count_label.setText(f"{self.get_translation('book_count_label')} {self.get_translation('loading')}")
+        self.page_count_label.setText(f"{self.get_translation('page_count_label')} {self.get_translation('loading')}")
+
+        self.submit_dashboard_query()
 
-            self.book_count_label.setText(f"{self.get_translation('book_count_label')} {book_count}")
-            self.page_count_label.setText(f"{self.get_translation('page_count_label')} {page_count}")
+        self.show_page("dashboard")
+
+    def submit_dashboard_query(self):
+        # Elérhető adatbázis mellett a statisztika a books2_stats táblából és a gyorsítótárakból jön.
+        if local_mirror.is_serving():
+            self.query_executor.submit_call("dashboard", local_mirror.dashboard_data, PRICE_CHART_BARS)
+        else:
+            self.query_executor.submit("dashboard", load_dashboard_data)
 
-            if self.chart_layout.count() > 0:
-                old_chart = self.chart_layout.itemAt(0).widget()
-                if old_chart:
-                    self.chart_layout.removeWidget(old_chart)
-                    old_chart.deleteLater()
+    def update_dashboard(self, dashboard_data):
+        book_count, page_count, prices, avg_price, max_price = dashboard_data
 
-            chart_view = self.create_price_chart(cursor)
+        self.show_book_counts(book_count, page_count)
+
+        if self.chart_layout.count() > 0:
+            old_chart = self.chart_layout.itemAt(0).widget()
+            if old_chart:
+                self.chart_layout.removeWidget(old_chart)
+                old_chart.deleteLater()
+
+        with diagnostics.phase("chart_build", bars=len(prices)):
+            chart_view = self.create_price_chart(prices, avg_price, max_price)
             self.chart_layout.addWidget(chart_view)
 
-            cursor.close()
-            connection.close()
+    def show_book_counts(self, book_count, page_count):
+        self.book_count_label.setText(f"{self.get_translation('book_count_label')} {book_count}")
+        self.page_count_label.setText(f"{self.get_translation('page_count_label')} {page_count}")
+
+    def books_changed(self):
+        statistics_cache.invalidate()
+        price_chart_cache.invalidate()
+        result_cache.clear()
+        if KIOSK_SETTINGS["enabled"]:
+            catalogue_index.note_local_write()
+        if MIRROR_SETTINGS["enabled"]:
+            local_mirror.note_local_write()
+
+    def apply_remote_changes(self, changes):
+        # A változásértesítések (change_feed.py) alapján a látható adatokat helyben frissítjük, újralekérdezés nélkül.
+        result_cache.clear()
+        price_chart_cache.invalidate()
+        if KIOSK_SETTINGS["enabled"]:
+            catalogue_index.refresh_now()
+        if MIRROR_SETTINGS["enabled"]:
+            local_mirror.refresh_now()
+
+        reload = any(change.is_reload() for change in changes)
+        latest = changes[-1]
+        if latest.book_count is not None:
+            statistics_cache.set((latest.book_count, latest.page_sum))
+            if "dashboard" in self.pages:
+                self.show_book_counts(latest.book_count, latest.page_sum)
+        else:
+            statistics_cache.invalidate()
+        if reload and self.visible_page == "dashboard":
+            self.submit_dashboard_query()
 
-        self.right_panel.setCurrentWidget(self.dashboard_page)
-        self.update_translations()
+        if "query" not in self.pages or self.last_search is None:
+            return
+        # A helyi találati lista elavult; a további lapozás már az adatbázisból történik.
+        self.local_books = None
+        if reload:
+            self.refresh_books(use_cache=False)
+            return
+        with diagnostics.phase("remote_changes", changes=len(changes)):
+            self.apply_book_changes(changes)
+
+    def apply_book_changes(self, changes):
+        # Könyvenként csak a csomag utolsó állapota számít. Az isbn -> sor index így csomagonként legfeljebb egyszer
+        # épül fel: előbb a helyben frissíthető sorok, majd a törlések hátulról előre (a korábbi sorszámok érvényesek
+        # maradnak), végül a beszúrások a rendezés szerinti helyre.
+        search_term, search_field, _, ranges, sort_column, descending = self.last_search
+        latest = {change.isbn: change.book for change in changes}
+        removed_rows = []
+        inserted_books = []
+
+        for isbn, book in latest.items():
+            row = self.book_model.find_row(isbn)
+            if row is not None:
+                # A látható sor addig marad, amíg biztosan ki nem esik a keresésből.
+                matches = book is not None and book_matches_search(book, search_term, search_field, ranges) is not False
+                if matches and sort_key(self.book_model.book_values(row), sort_column) == sort_key(book, sort_column):
+                    self.book_model.replace_book(row, book)
+                    continue
+                removed_rows.append(row)
+                if matches:
+                    inserted_books.append(book)
+            elif book is not None and book_matches_search(book, search_term, search_field, ranges):
+                inserted_books.append(book)
+
+        for row in sorted(removed_rows, reverse=True):
+            self.book_model.remove_book(row)
+        for book in inserted_books:
+            position = self.book_insert_position(book, sort_column, descending)
+            if position is not None:
+                self.book_model.insert_book(position, book)
+
+    def book_insert_position(self, book, sort_column, descending):
+        row_count = self.book_model.rowCount()
+        key = sort_key(book, sort_column)
+        low, high = 0, row_count
+        try:
+            while low < high:
+                middle = (low + high) // 2
+                other = sort_key(self.book_model.book_values(middle), sort_column)
+                if (other > key) if descending else (other < key):
+                    low = middle + 1
+                else:
+                    high = middle
+        except TypeError:
+            return None
+
+        # A betöltött sorok szélén nem dönthető el, hogy a könyv ide vagy a szomszédos oldalra tartozik.
+        page = self.current_page if self.page_query is not None else None
+        if low == row_count and (self.book_model.has_more() or (page is not None and page.has_next)):
+            return None
+        if low == 0 and page is not None and page.has_previous:
+            return None
+        return low
+
+    def stop_change_feed(self):
+        if self.change_feed is not None:
+            self.change_feed.stop()
+
+    def on_query_finished(self, channel, request_id, result):
+        if channel == "search":
+            if isinstance(result, CatalogueResult):
+                self.run_search(use_cache=True, local_books=result.books)
+            elif isinstance(result, BookPage):
+                self.cache_book_page(result)
+                self.show_book_page(result)
+            else:
+                self.fill_book_table(result)
+        elif channel == "fetch_more":
+            self.append_book_table(result)
+        elif channel == "dashboard":
+            self.update_dashboard(result)
+        elif channel == "export":
+            self.export_finished(result)
+
+    def on_query_failed(self, channel, request_id, error):
+        print(f"Hiba történt a lekérdezés során ({channel}): {error}")
+        if channel == "export":
+            self.export_button.setEnabled(True)
+            self.export_status_label.setText(f"{self.get_translation('export_error')}: {error}")
+        elif channel == "fetch_more":
+            # A modell különben betöltés alatt maradna; a következő görgetés újra próbálkozik.
+            has_more = self.book_stream is not None and self.book_stream.has_more()
+            self.book_model.append_books([], has_more=has_more)
+            self.fetch_error_label.setText(f"{self.get_translation('fetch_error')}: {error}")
+            self.fetch_error_label.show()
+
+    def on_query_busy_changed(self, channel, busy):
+        if channel == "search":
+            self.loading_label.setVisible(busy)
+            self.loading_bar.setVisible(busy)
 
     def show_query_page(self):
-        self.right_panel.setCurrentWidget(self.query_page)
+        self.show_page("query")
 
     def show_add_page(self):
-        self.right_panel.setCurrentWidget(self.add_page)
+        self.show_page("add")
 
     def show_settings_page(self):
-        self.right_panel.setCurrentWidget(self.settings_page)
+        self.show_page("settings")
+        self.update_diagnostics()
 
     def create_query_page(self):
         query_layout = QVBoxLayout()
@@ -777,6 +1086,13 @@ class MainWindow(QMainWindow):
         self.search_input.setPlaceholderText(self.get_translation("title"))
         self.search_input.returnPressed.connect(self.refresh_books)
 
+        # Gépelés közben csak a szünet után indul keresés, így egy gyors begépelés egy lekérdezés.
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.live_search)
+        self.search_input.textChanged.connect(self.schedule_live_search)
+
         self.refresh_button = QPushButton(self.get_translation("query_books"))
 
         self.refresh_button.pressed.connect(self.on_refresh_button_pressed)
@@ -823,12 +1139,74 @@ class MainWindow(QMainWindow):
         self.radio_group.addWidget(self.price_radio)
         self.radio_group.addWidget(self.available_radio)
 
+        self.radio_buttons.buttonClicked.connect(self.schedule_live_search)
+
         radio_layout.addLayout(self.radio_group)
         query_layout.addLayout(radio_layout)
 
-        self.book_table = QTableWidget()
-        self.book_table.setColumnCount(6)
-        self.book_table.setHorizontalHeaderLabels([
+        # Tartományszűrők: a legkisebb érték (a határ alatti egy) jelenti, hogy az adott oldal nincs korlátozva.
+        filter_layout = QHBoxLayout()
+        self.filter_label = QLabel(self.get_translation("filters"))
+        filter_layout.addWidget(self.filter_label)
+
+        self.range_inputs = {}
+        self.range_labels = {}
+        for field, translation_key in NUMERIC_FIELD_LABELS:
+            low, high = BOOK_LIMITS[field]
+            label = QLabel(self.get_translation(translation_key) + ":")
+            inputs = []
+            for _ in range(2):
+                spin_box = QSpinBox()
+                spin_box.setRange(low - 1, high)
+                spin_box.setValue(low - 1)
+                spin_box.setSpecialValueText(self.get_translation("range_any"))
+                spin_box.valueChanged.connect(self.schedule_live_search)
+                inputs.append(spin_box)
+            self.range_labels[field] = (label, translation_key)
+            self.range_inputs[field] = inputs
+
+            filter_layout.addWidget(label)
+            filter_layout.addWidget(inputs[0])
+            filter_layout.addWidget(QLabel("–"))
+            filter_layout.addWidget(inputs[1])
+
+        filter_layout.addStretch()
+        query_layout.addLayout(filter_layout)
+
+        loading_layout = QHBoxLayout()
+
+        self.loading_label = QLabel(self.get_translation("loading"))
+        self.loading_label.setStyleSheet("color: #116186;")
+        self.loading_label.hide()
+
+        self.loading_bar = QProgressBar()
+        self.loading_bar.setRange(0, 0)
+        self.loading_bar.setTextVisible(False)
+        self.loading_bar.setFixedHeight(6)
+        self.loading_bar.hide()
+
+        loading_layout.addWidget(self.loading_label)
+        loading_layout.addWidget(self.loading_bar)
+        query_layout.addLayout(loading_layout)
+
+        self.fetch_error_label = QLabel("")
+        self.fetch_error_label.setStyleSheet("color: #b00020;")
+        self.fetch_error_label.setWordWrap(True)
+        self.fetch_error_label.hide()
+        query_layout.addWidget(self.fetch_error_label)
+
+        self.kiosk_label = QLabel("")
+        self.kiosk_label.setStyleSheet("color: #116186;")
+        self.kiosk_label.setVisible(KIOSK_SETTINGS["enabled"] or MIRROR_SETTINGS["enabled"])
+        query_layout.addWidget(self.kiosk_label)
+        if KIOSK_SETTINGS["enabled"] or MIRROR_SETTINGS["enabled"]:
+            self.kiosk_timer = QTimer(self)
+            self.kiosk_timer.timeout.connect(self.update_kiosk_status)
+            self.kiosk_timer.start(1000)
+
+        self.book_model = BookTableModel(self)
+        self.book_model.more_requested.connect(self.fetch_more_books)
+        self.book_model.set_headers([
             self.get_translation("isbn"),
             self.get_translation("authors"),
             self.get_translation("title"),
@@ -836,12 +1214,56 @@ class MainWindow(QMainWindow):
             self.get_translation("price"),
             self.get_translation("available")
         ])
+
+        self.book_table = QTableView()
+        self.book_table.setModel(self.book_model)
         self.book_table.horizontalHeader().setDefaultSectionSize(120)
+        self.book_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.book_table.setStyleSheet("border: 1px solid black;")
-        self.book_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.book_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.book_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.book_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        # A rendezést a lekérdezés ORDER BY-a végzi; a nézet saját (kliensoldali) rendezése kikapcsolva marad.
+        header = self.book_table.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(BOOK_COLUMNS.index(self.sort_column), Qt.AscendingOrder)
+        header.sectionClicked.connect(self.sort_by_column)
         query_layout.addWidget(self.book_table)
 
+        page_layout = QHBoxLayout()
+
+        self.previous_page_button = QPushButton(self.get_translation("previous_page"))
+        self.next_page_button = QPushButton(self.get_translation("next_page"))
+        for button in [self.previous_page_button, self.next_page_button]:
+            button.setStyleSheet("""
+                background-color: #73bfb2;
+                color: white;
+                padding: 5px;
+            """)
+            button.setEnabled(False)
+
+        self.previous_page_button.clicked.connect(self.show_previous_page)
+        self.next_page_button.clicked.connect(self.show_next_page)
+
+        self.page_label = QLabel("")
+        self.page_label.setAlignment(Qt.AlignCenter)
+
+        self.page_size_label = QLabel(self.get_translation("page_size"))
+        self.page_size_input = QSpinBox()
+        self.page_size_input.setRange(0, 1000)
+        self.page_size_input.setSingleStep(50)
+        self.page_size_input.setSpecialValueText(self.get_translation("page_size_all"))
+        self.page_size_input.setValue(PAGE_SIZE)
+
+        page_layout.addWidget(self.previous_page_button)
+        page_layout.addWidget(self.page_label)
+        page_layout.addWidget(self.next_page_button)
+        page_layout.addStretch()
+        page_layout.addWidget(self.page_size_label)
+        page_layout.addWidget(self.page_size_input)
+
+        query_layout.addLayout(page_layout)
+
         self.delete_button = QPushButton(self.get_translation("delete_book"))
         self.delete_button.setStyleSheet("""
             background-color: #e9577e;
@@ -862,16 +1284,73 @@ class MainWindow(QMainWindow):
 
         self.modify_button.clicked.connect(self.open_modify_book_page)
 
+        self.bulk_update_button = QPushButton(self.get_translation("bulk_update"))
+        self.bulk_update_button.setStyleSheet("""
+            background-color: #73bfb2;
+            color: white;
+            padding: 10px;
+        """)
+        self.bulk_update_button.clicked.connect(self.open_bulk_update_dialog)
+
+        self.export_button = QPushButton(self.get_translation("export_books"))
+        self.export_button.setStyleSheet("""
+            background-color: #116186;
+            color: white;
+            padding: 10px;
+        """)
+        self.export_button.clicked.connect(self.export_search_results)
+
         button_layout = QHBoxLayout()
         button_layout.addWidget(self.modify_button)
+        button_layout.addWidget(self.bulk_update_button)
         button_layout.addWidget(self.delete_button)
+        button_layout.addWidget(self.export_button)
 
         query_layout.addLayout(button_layout)
 
+        self.export_status_label = QLabel("")
+        self.export_status_label.setStyleSheet("color: #116186;")
+        query_layout.addWidget(self.export_status_label)
+        self.export_progress_changed.connect(self.update_export_progress)
+
         query_widget = QWidget()
         query_widget.setLayout(query_layout)
         return query_widget
 
+    def export_search_results(self):
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, self.get_translation("export_books"), "books.csv",
+            "CSV (*.csv);;JSON Lines (*.jsonl);;Parquet (*.parquet)"
+        )
+        if not path:
+            return
+
+        # A táblázatban látható keresés feltételeivel exportálunk (kifejezés, mező, szűrők, rendezés), akkor is,
+        # ha a beviteli mezőket azóta átírták; az exportáló szerveroldali kurzorból vagy COPY-ból ír a fájlba.
+        if self.last_search is not None:
+            search_term, search_field, _, ranges, sort_column, descending = self.last_search
+        else:
+            search_term, search_field = self.search_input.text(), self.selected_search_field()
+            ranges, sort_column, descending = self.selected_ranges(), self.sort_column, self.sort_descending
+
+        self.export_button.setEnabled(False)
+        self.export_status_label.setText(self.get_translation("loading"))
+        self.query_executor.submit(
+            "export", export_books, path, search_term, search_field, None, sort_column,
+            self.export_progress_changed.emit, ranges, descending
+        )
+
+    def update_export_progress(self, rows, bytes_written):
+        self.export_status_label.setText(self.get_translation("export_progress").format(
+            rows=rows, size=f"{bytes_written / (1 << 20):.1f}"
+        ))
+
+    def export_finished(self, result):
+        self.export_button.setEnabled(True)
+        self.export_status_label.setText(self.get_translation("export_done").format(
+            rows=result.rows, path=result.path
+        ))
+
     def on_modify_button_pressed(self):
         self.modify_button.setStyleSheet("""
             background-color: #50a38f;
@@ -900,12 +1379,19 @@ class MainWindow(QMainWindow):
             padding: 10px;
         """)
 
-        self.refresh_books()
+        # A frissítés gomb mindig az adatbázisból olvas, és a helyi tükröt is szinkronizálja.
+        if MIRROR_SETTINGS["enabled"]:
+            local_mirror.refresh_now()
+        self.refresh_books(use_cache=False)
+
+    def selected_isbns(self):
+        rows = sorted(index.row() for index in self.book_table.selectionModel().selectedRows())
+        return [self.book_model.book_at(row)[0] for row in rows]
 
     def confirm_delete_book(self):
-        selected_row = self.book_table.currentRow()
+        isbns = self.selected_isbns()
 
-        if selected_row == -1:
+        if not isbns:
             QMessageBox.warning(
                 self,
                 self.get_translation("error"),
@@ -913,11 +1399,12 @@ class MainWindow(QMainWindow):
             )
             return
 
-        isbn = self.book_table.item(selected_row, 0).text()
-
         msg_box = QMessageBox()
         msg_box.setIcon(QMessageBox.Warning)
-        msg_box.setText(self.get_translation("delete_confirmation").format(isbn=isbn))
+        if len(isbns) == 1:
+            msg_box.setText(self.get_translation("delete_confirmation").format(isbn=isbns[0]))
+        else:
+            msg_box.setText(self.get_translation("bulk_delete_confirmation").format(count=len(isbns)))
         msg_box.setWindowTitle(self.get_translation("delete_title"))
         msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
 
@@ -929,18 +1416,50 @@ class MainWindow(QMainWindow):
         response = msg_box.exec()
 
         if response == QMessageBox.Yes:
-            connection = connect_db()
-            if connection:
-                cursor = connection.cursor()
+            count = self.run_bulk_change(delete_books, "permission_error_message", isbns)
+            if count is not None:
+                message = self.get_translation("bulk_delete_success").format(count=count)
+                QMessageBox.information(self, self.get_translation("success_title"), message)
+
+    def open_bulk_update_dialog(self):
+        isbns = self.selected_isbns()
+        if not isbns:
+            QMessageBox.warning(self, self.get_translation("error"), self.get_translation("select_book_error"))
+            return
 
-                username = self.logged_in_username
-                if delete_book(cursor, connection, username, isbn, self.translations, self.current_language):
-                    QMessageBox.information(self, "Siker", "A könyv sikeresen törölve.")
-                    self.refresh_books()
-                else:
-                    QMessageBox.warning(self, "Hiba", "Nem sikerült törölni a könyvet.")
+        dialog = BulkUpdateDialog(self, len(isbns))
+        if dialog.exec() != QDialog.Accepted:
+            return
+
+        count = self.run_bulk_change(update_books, "edit_permission_error_message", isbns, dialog.changes())
+        if count is not None:
+            message = self.get_translation("bulk_update_success").format(count=count)
+            QMessageBox.information(self, self.get_translation("success_title"), message)
+
+    def run_bulk_change(self, change, permission_message, *args):
+        # A kijelölt könyvek egy tranzakcióban, egyetlen utasítással módosulnak (book_bulk.py).
+        with db_connection() as connection:
+            if not connection:
+                return None
+
+            cursor = connection.cursor()
+            try:
+                count = change(cursor, self.logged_in_username, *args)
+            except PermissionDenied:
+                QMessageBox.warning(
+                    self, self.get_translation("permission_error_title"), self.get_translation(permission_message)
+                )
+                return None
+            except (psycopg2.Error, ValueError) as e:
+                print(f"Hiba a könyvek módosítása során: {e}")
+                QMessageBox.warning(self, self.get_translation("error_title"), self.get_translation("bulk_failure"))
+                return None
+            finally:
                 cursor.close()
-                connection.close()
+
+        self.books_changed()
+        self.refresh_books()
+        return count
 
     def create_add_page(self):
         add_layout = QFormLayout()
@@ -949,11 +1468,11 @@ class MainWindow(QMainWindow):
         self.title_input = QLineEdit()
         self.authors_input = QLineEdit()
         self.page_num_input = QSpinBox()
-        self.page_num_input.setRange(1, 10000)
+        self.page_num_input.setRange(*BOOK_LIMITS["page_num"])
         self.price_input = QSpinBox()
-        self.price_input.setRange(1, 1000000)
+        self.price_input.setRange(*BOOK_LIMITS["price"])
         self.available_input = QSpinBox()
-        self.available_input.setRange(0, 1000)
+        self.available_input.setRange(*BOOK_LIMITS["available"])
 
         self.isbn_label = QLabel(self.get_translation("isbn") + ":")
         self.title_label = QLabel(self.get_translation("title") + ":")
@@ -982,6 +1501,10 @@ class MainWindow(QMainWindow):
 
         add_layout.addWidget(self.submit_button)
 
+        self.import_button = QPushButton(self.get_translation("import_books"))
+        self.import_button.clicked.connect(self.open_import_dialog)
+        add_layout.addWidget(self.import_button)
+
         self.add_message = QLabel("")
         add_layout.addWidget(self.add_message)
 
@@ -1004,6 +1527,10 @@ class MainWindow(QMainWindow):
         """)
         self.add_new_book()
 
+    def open_import_dialog(self):
+        import_dialog = ImportDialog(self)
+        import_dialog.exec()
+
     def create_settings_page(self):
         settings_layout = QVBoxLayout()
 
@@ -1026,6 +1553,31 @@ class MainWindow(QMainWindow):
         language_layout.addWidget(self.language_label)
         language_layout.addWidget(self.language_combo)
 
+        diagnostics_layout = QHBoxLayout()
+        diagnostics_layout.setContentsMargins(0, 0, 0, 0)
+        diagnostics_layout.setSpacing(5)
+
+        self.diagnostics_label = QLabel(self.get_translation("diagnostics"))
+        self.slow_query_label = QLabel(self.get_translation("slow_query_threshold"))
+        self.slow_query_input = QSpinBox()
+        self.slow_query_input.setRange(1, 600000)
+        self.slow_query_input.setSuffix(" ms")
+        self.slow_query_input.setValue(int(diagnostics.slow_query_ms))
+        self.slow_query_input.valueChanged.connect(self.set_slow_query_threshold)
+        self.diagnostics_refresh_button = QPushButton(self.get_translation("diagnostics_refresh"))
+        self.diagnostics_refresh_button.clicked.connect(self.update_diagnostics)
+
+        diagnostics_layout.addWidget(self.diagnostics_label)
+        diagnostics_layout.addStretch()
+        diagnostics_layout.addWidget(self.slow_query_label)
+        diagnostics_layout.addWidget(self.slow_query_input)
+        diagnostics_layout.addWidget(self.diagnostics_refresh_button)
+
+        self.diagnostics_view = QPlainTextEdit()
+        self.diagnostics_view.setReadOnly(True)
+        self.diagnostics_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.diagnostics_view.setFont(QFont("Monospace", 9))
+
         divider = QWidget()
         divider.setFixedHeight(1)
         divider.setStyleSheet("background-color: #c0c0c0;")
@@ -1035,6 +1587,8 @@ class MainWindow(QMainWindow):
         copyright_label.setStyleSheet("color: #888;")
 
         settings_layout.addLayout(language_layout)
+        settings_layout.addLayout(diagnostics_layout)
+        settings_layout.addWidget(self.diagnostics_view)
         settings_layout.addWidget(divider)
         settings_layout.addWidget(copyright_label)
 
@@ -1043,10 +1597,11 @@ class MainWindow(QMainWindow):
         return settings_widget
 
     def get_translation(self, key):
-        return self.translations.get(self.current_language, {}).get(key, key)
+        return self.translations.get(key)
 
     def change_language(self):
         self.current_language = self.language_combo.currentData()
+        self.translations.set_language(self.current_language)
         self.update_translations()
 
     def update_translations(self):
@@ -1054,7 +1609,12 @@ class MainWindow(QMainWindow):
         self.query_button.setText(self.get_translation("query_books"))
         self.add_button.setText(self.get_translation("add_book"))
         self.settings_button.setText(self.get_translation("settings"))
+        self.header_label.setText(self.get_translation("header_label"))
+
+        if self.visible_page is not None:
+            self.retranslate_page(self.visible_page)
 
+    def retranslate_query_page(self):
         self.isbn_radio.setText(self.get_translation("isbn"))
         self.author_radio.setText(self.get_translation("authors"))
         self.title_radio.setText(self.get_translation("title"))
@@ -1063,7 +1623,7 @@ class MainWindow(QMainWindow):
         self.available_radio.setText(self.get_translation("available"))
 
         self.search_input.setPlaceholderText(self.get_translation("title"))
-        self.book_table.setHorizontalHeaderLabels([
+        self.book_model.set_headers([
             self.get_translation("isbn"),
             self.get_translation("authors"),
             self.get_translation("title"),
@@ -1073,6 +1633,27 @@ class MainWindow(QMainWindow):
         ])
         self.refresh_button.setText(self.get_translation("query_books"))
 
+        self.search_label.setText(self.get_translation("search_condition"))
+        self.filter_label.setText(self.get_translation("filters"))
+        for field, (label, translation_key) in self.range_labels.items():
+            label.setText(self.get_translation(translation_key) + ":")
+            for spin_box in self.range_inputs[field]:
+                spin_box.setSpecialValueText(self.get_translation("range_any"))
+
+        self.delete_button.setText(self.get_translation("delete_book"))
+        self.modify_button.setText(self.get_translation("modify_book"))
+        self.bulk_update_button.setText(self.get_translation("bulk_update"))
+        self.export_button.setText(self.get_translation("export_books"))
+
+        self.loading_label.setText(self.get_translation("loading"))
+
+        self.previous_page_button.setText(self.get_translation("previous_page"))
+        self.next_page_button.setText(self.get_translation("next_page"))
+        self.page_size_label.setText(self.get_translation("page_size"))
+        self.page_size_input.setSpecialValueText(self.get_translation("page_size_all"))
+        self.update_page_controls()
+
+    def retranslate_add_page(self):
         self.isbn_label.setText(self.get_translation("isbn") + ":")
         self.title_label.setText(self.get_translation("title") + ":")
         self.authors_label.setText(self.get_translation("authors") + ":")
@@ -1080,13 +1661,9 @@ class MainWindow(QMainWindow):
         self.price_label.setText(self.get_translation("price") + ":")
         self.available_label.setText(self.get_translation("available") + ":")
         self.submit_button.setText(self.get_translation("add_book"))
+        self.import_button.setText(self.get_translation("import_books"))
 
-        self.search_label.setText(self.get_translation("search_condition"))
-
-        self.delete_button.setText(self.get_translation("delete_book"))
-
-        self.header_label.setText(self.get_translation("header_label"))
-
+    def retranslate_modify_page(self):
         self.modify_isbn_label.setText(self.get_translation("isbn") + ":")
         self.modify_title_label.setText(self.get_translation("title") + ":")
         self.modify_authors_label.setText(self.get_translation("authors") + ":")
@@ -1097,84 +1674,325 @@ class MainWindow(QMainWindow):
         self.save_changes_button.setText(self.get_translation("save_changes"))
         self.discard_changes_button.setText(self.get_translation("discard_changes"))
 
-        self.modify_button.setText(self.get_translation("modify_book"))
-
+    def retranslate_settings_page(self):
         self.language_label.setText(self.get_translation("language"))
+        self.diagnostics_label.setText(self.get_translation("diagnostics"))
+        self.slow_query_label.setText(self.get_translation("slow_query_threshold"))
+        self.diagnostics_refresh_button.setText(self.get_translation("diagnostics_refresh"))
+        self.update_diagnostics()
+
+    def set_slow_query_threshold(self, value):
+        diagnostics.slow_query_ms = value
+
+    def update_diagnostics(self):
+        snapshot = diagnostics.snapshot()
+        # Az oszlopnevek a diagnosztikai napló mezőneveivel egyeznek.
+        lines = [self.get_translation("diagnostics_queries")]
+        lines.append(f"{'sql_hash':<14}{'count':>6}{'total_ms':>11}{'max_ms':>10}{'rows':>10}{'bytes':>12}  sql")
+        for query in snapshot["queries"][:DIAGNOSTICS_TOP_QUERIES]:
+            lines.append(
+                f"{query['sql_hash']:<14}{query['count']:>6}{query['total_ms']:>11.1f}{query['max_ms']:>10.1f}"
+                f"{query['rows']:>10}{query['bytes']:>12}  {query['sql'][:80]}"
+            )
 
-    def refresh_books(self):
+        lines += ["", self.get_translation("diagnostics_phases")]
+        lines.append(f"{'phase':<24}{'count':>6}{'avg_ms':>10}{'max_ms':>10}{'last_ms':>10}")
+        for phase, summary in sorted(snapshot["phases"].items()):
+            lines.append(
+                f"{phase:<24}{summary['count']:>6}{summary['total_ms'] / summary['count']:>10.1f}"
+                f"{summary['max_ms']:>10.1f}{summary['last_ms']:>10.1f}"
+            )
+
+        lines += ["", self.get_translation("diagnostics_slow").format(threshold=snapshot["slow_query_ms"])]
+        for record in reversed(snapshot["slow"]):
+            lines.append(f"{record['sql_hash']}  {record['elapsed_ms']:.1f} ms  {record['rows']}  {record['sql']}")
+            if record.get("plan"):
+                lines += [f"    {line}" for line in record["plan"].splitlines()]
+
+        if snapshot["log_path"]:
+            lines += ["", f"{self.get_translation('diagnostics_log')}: {os.path.abspath(snapshot['log_path'])}"]
+        self.diagnostics_view.setPlainText("\n".join(lines))
+
+    def selected_search_field(self):
+        if self.isbn_radio.isChecked():
+            return "isbn"
+        elif self.author_radio.isChecked():
+            return "authors"
+        elif self.page_num_radio.isChecked():
+            return "page_num"
+        elif self.price_radio.isChecked():
+            return "price"
+        elif self.available_radio.isChecked():
+            return "available"
+        return "title"
+
+    def selected_ranges(self):
+        ranges = {}
+        for field, (min_input, max_input) in self.range_inputs.items():
+            low = min_input.value() if min_input.value() != min_input.minimum() else None
+            high = max_input.value() if max_input.value() != max_input.minimum() else None
+            if low is not None or high is not None:
+                ranges[field] = (low, high)
+        return ranges
+
+    def sort_by_column(self, section):
+        column = BOOK_COLUMNS[section]
+        if column not in SORT_COLUMNS:
+            # A szerzőlista nem rendezhető; a jelzőt visszaállítjuk az aktuális oszlopra.
+            self.update_sort_indicator()
+            return
+
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = False
+        self.update_sort_indicator()
+        self.refresh_books()
+
+    def update_sort_indicator(self):
+        order = Qt.DescendingOrder if self.sort_descending else Qt.AscendingOrder
+        self.book_table.horizontalHeader().setSortIndicator(BOOK_COLUMNS.index(self.sort_column), order)
+
+    def schedule_live_search(self, *args):
+        # A jelzések argumentumát (szöveg, gomb, érték) nem adjuk tovább: a QTimer.start(int) intervallumnak venné.
+        self.search_timer.start()
+
+    def live_search(self):
+        search_term = self.search_input.text()
+        search_field = self.selected_search_field()
+
+        # Félig begépelt, nem szám érték numerikus mezőn csak hibát adna a szervertől.
+        if search_field in NUMERIC_FIELDS and search_term.strip() and not search_term.strip().isdigit():
+            return
         try:
-            connection = connect_db()
-            if connection is None:
-                return
+            ranges = normalize_ranges(self.selected_ranges())
+        except ValueError:
+            return
+        if (search_term, search_field, self.page_size_input.value(), ranges,
+                self.sort_column, self.sort_descending) == self.last_search:
+            return
+        self.refresh_books()
 
-            cursor = connection.cursor()
+    def refresh_books(self, use_cache=True):
+        search_term = self.search_input.text()
+        search_field = self.selected_search_field()
 
-            search_term = self.search_input.text()
-
-            if self.isbn_radio.isChecked():
-                search_field = "isbn"
-            elif self.author_radio.isChecked():
-                search_field = "authors"
-            elif self.page_num_radio.isChecked():
-                search_field = "page_num"
-            elif self.price_radio.isChecked():
-                search_field = "price"
-            elif self.available_radio.isChecked():
-                search_field = "available"
-            else:
-                search_field = "title"
-
-            books = list_books_by_search(cursor, search_term, search_field)
-
-            self.book_table.setRowCount(0)
-            for row_num, book in enumerate(books):
-                isbn, authors, title, page_num, price, available = book
-                authors_str = ', '.join(authors) if isinstance(authors, list) else authors
-                self.book_table.insertRow(row_num)
-                self.book_table.setItem(row_num, 0, QTableWidgetItem(isbn))
-                self.book_table.setItem(row_num, 1, QTableWidgetItem(authors_str))
-                self.book_table.setItem(row_num, 2, QTableWidgetItem(title))
-                self.book_table.setItem(row_num, 3, QTableWidgetItem(str(page_num)))
-                self.book_table.setItem(row_num, 4, QTableWidgetItem(str(price)))
-                self.book_table.setItem(row_num, 5, QTableWidgetItem(str(available)))
+        self.search_timer.stop()
+        self.close_book_stream()
 
-            cursor.close()
-            connection.close()
+        try:
+            ranges = normalize_ranges(self.selected_ranges())
+        except ValueError as e:
+            print(f"Hiba a szűrők feldolgozása során: {e}")
+            self.book_model.clear()
+            return
+        sort_column, descending = self.sort_column, self.sort_descending
+        self.last_search = (search_term, search_field, self.page_size_input.value(), ranges, sort_column, descending)
+        self.search_generation = result_cache.generation
+        self.local_books = None
+
+        if use_cache and catalogue_index.is_ready():
+            # Kioszk módban a helyi katalógus az elsődleges forrás. A keresés nagy katalógusnál és újratöltés
+            # közben is eltarthat, ezért ez is háttérszálon fut; az eredmény a run_search-be érkezik.
+            self.page_query = None
+            self.current_page = None
+            self.update_page_controls()
+            self.query_executor.submit_call(
+                "search", catalogue_index.search_sorted, search_term, search_field, ranges, sort_column, descending
+            )
+            return
+        self.run_search(use_cache)
+
+    def run_search(self, use_cache, local_books=None):
+        search_term, search_field, page_size, ranges, sort_column, descending = self.last_search
+
+        # Egy korábbi, tágabb keresés teljes találati listájából helyben, adatbázis nélkül is válaszolhatunk.
+        self.local_books = local_books
+        if use_cache and self.local_books is None:
+            self.local_books = result_cache.get(search_field, search_term, ranges)
+            if self.local_books is not None:
+                self.query_executor.cancel("search")
+                self.local_books = sort_books(self.local_books, sort_column, descending)
+        # Ha sem a memóriában, sem a gyorsítótárban nincs meg, a helyi tükör válaszol a hálózat helyett.
+        self.mirror_search = (
+            use_cache and self.local_books is None and local_mirror.can_answer(search_term, search_field)
+        )
+
+        if page_size > 0:
+            self.page_query = (search_term, search_field, page_size, ranges, sort_column, descending)
+            self.load_book_page(1)
+            return
+
+        self.page_query = None
+        self.current_page = None
+        self.update_page_controls()
+
+        if self.local_books is not None:
+            self.book_model.set_books(self.local_books)
+            self.book_table.scrollToTop()
+            return
+
+        if self.mirror_search:
+            self.query_executor.submit_call(
+                "search", local_mirror.search_books, search_term, search_field, ranges, sort_column, descending
+            )
+            return
+
+        self.book_stream = BookStream(
+            search_term, search_field, collect_limit=RESULT_CACHE_MAX_ROWS, ranges=ranges,
+            sort_column=sort_column, descending=descending
+        )
+        self.query_executor.submit_call("search", self.book_stream.open)
+
+    def update_kiosk_status(self):
+        if not KIOSK_SETTINGS["enabled"]:
+            self.update_mirror_status()
+            return
+        status = catalogue_index.status()
+        if status["state"] == "loading":
+            self.kiosk_label.setText(self.get_translation("kiosk_loading"))
+        elif status["state"] in ("ready", "stale") and status["staleness"] is not None:
+            self.kiosk_label.setText(self.get_translation("kiosk_status").format(
+                rows=status["rows"], age=int(status["staleness"])
+            ))
+        else:
+            self.kiosk_label.setText(self.get_translation("kiosk_unavailable"))
+
+    def update_mirror_status(self):
+        status = local_mirror.status()
+        if status["staleness"] is None:
+            self.kiosk_label.setText(self.get_translation("mirror_loading"))
+        elif status["state"] in ("offline", "failed"):
+            self.kiosk_label.setText(self.get_translation("mirror_offline").format(
+                rows=status["rows"], age=int(status["staleness"])
+            ))
+        else:
+            self.kiosk_label.setText(self.get_translation("mirror_status").format(
+                rows=status["rows"], age=int(status["staleness"])
+            ))
+
+    def cache_book_page(self, page):
+        # Csak a teljes találati lista kerülhet a gyorsítótárba: egyetlen, nem folytatódó első oldal.
+        if self.page_query is None or self.local_books is not None or page.has_next or page.has_previous:
+            return
+        search_term, search_field, _, ranges, _, _ = self.page_query
+        result_cache.put(search_field, search_term, page.books, self.search_generation, ranges)
+
+    def cache_book_stream(self):
+        stream = self.book_stream
+        if stream is None or not stream.exhausted or stream.collected is None:
+            return
+        result_cache.put(
+            stream.search_field, stream.search_term, stream.collected, self.search_generation, stream.ranges
+        )
+
+    def load_book_page(self, page_number, after=None, before=None):
+        search_term, search_field, page_size, ranges, sort_column, descending = self.page_query
+        self.pending_page_number = page_number
+        if self.local_books is not None:
+            self.show_book_page(page_from_books(self.local_books, page_size, sort_column, after, before))
+            return
+        if self.mirror_search:
+            self.query_executor.submit_call(
+                "search", local_mirror.list_books_page, search_term, search_field, page_size, sort_column, after,
+                before, ranges, descending
+            )
+            return
+        self.query_executor.submit(
+            "search", list_books_page, search_term, search_field, page_size, sort_column, after, before, ranges,
+            descending
+        )
+
+    def show_next_page(self):
+        if self.page_query is None or self.current_page is None or not self.current_page.has_next:
+            return
+        self.load_book_page(self.page_number + 1, after=self.current_page.last_key())
+
+    def show_previous_page(self):
+        if self.page_query is None or self.current_page is None or not self.current_page.has_previous:
+            return
+        self.load_book_page(self.page_number - 1, before=self.current_page.first_key())
+
+    def show_book_page(self, page):
+        self.current_page = page
+        self.page_number = self.pending_page_number if page.has_previous else 1
+        with diagnostics.phase("table_fill", rows=len(page.books)):
+            self.book_model.set_books(page.books)
+        self.book_table.scrollToTop()
+        self.update_page_controls()
+
+    def update_page_controls(self):
+        paged = self.page_query is not None and self.current_page is not None
+        self.previous_page_button.setEnabled(paged and self.current_page.has_previous)
+        self.next_page_button.setEnabled(paged and self.current_page.has_next)
+        if paged:
+            self.page_label.setText(self.get_translation("page_number").format(page=self.page_number))
+        else:
+            self.page_label.setText("")
+
+    def fetch_more_books(self):
+        if self.book_stream is None or not self.book_stream.has_more():
+            self.book_model.append_books([], has_more=False)
+            return
+        self.query_executor.submit_call("fetch_more", self.book_stream.fetch_batch)
+
+    def close_book_stream(self):
+        if self.book_stream is None:
+            return
+        self.book_stream.cancel()
+        self.query_executor.cancel("fetch_more")
+        self.query_executor.submit_call(None, self.book_stream.close)
+        self.book_stream = None
+        # A megszakított adag nem jelez vissza, ezért a modell betöltési állapotát itt zárjuk le.
+        self.book_model.append_books([], has_more=False)
+        self.fetch_error_label.hide()
+
+    def fill_book_table(self, books):
+        try:
+            has_more = self.book_stream is not None and self.book_stream.has_more()
+            with diagnostics.phase("table_fill", rows=len(books)):
+                self.book_model.set_books(books, has_more=has_more)
+            self.cache_book_stream()
         except Exception as e:
             print(f"Hiba történt a könyvek lekérdezésekor: {e}")
 
-    def add_new_book(self):
+    def append_book_table(self, books):
+        self.fetch_error_label.hide()
         try:
-            connection = connect_db()
-            if connection is None:
-                print("Nem sikerült csatlakozni az adatbázishoz.")
-                return
-
-            cursor = connection.cursor()
-
-            isbn = self.isbn_input.text()
-            title = self.title_input.text()
-            authors = self.authors_input.text()
-            page_num = self.page_num_input.value()
-            price = self.price_input.value()
-            available = self.available_input.value()
+            has_more = self.book_stream is not None and self.book_stream.has_more()
+            with diagnostics.phase("table_append", rows=len(books)):
+                self.book_model.append_books(books, has_more=has_more)
+            self.cache_book_stream()
+        except Exception as e:
+            print(f"Hiba történt a könyvek lekérdezésekor: {e}")
 
-            if not isbn or not title or not authors or page_num <= 0 or price <= 0 or available < 0:
-                self.add_message.setText(self.get_translation("add_error"))
-                return
+    def add_new_book(self):
+        try:
+            with db_connection() as connection:
+                if connection is None:
+                    print("Nem sikerült csatlakozni az adatbázishoz.")
+                    return
 
-            authors_list = authors.split(', ')
-            query = sql.SQL("""
-                INSERT INTO books2 (isbn, title, authors, page_num, price, available)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """)
-            insert_data = (isbn, title, authors_list, page_num, price, available)
-            cursor.execute(query, insert_data)
-            connection.commit()
+                cursor = connection.cursor()
 
-            self.add_message.setText(self.get_translation("add_success"))
-            cursor.close()
-            connection.close()
+                try:
+                    add_book(
+                        cursor,
+                        self.isbn_input.text(),
+                        self.title_input.text(),
+                        self.authors_input.text(),
+                        self.page_num_input.value(),
+                        self.price_input.value(),
+                        self.available_input.value()
+                    )
+                except ValueError:
+                    self.add_message.setText(self.get_translation("add_error"))
+                    return
+
+                self.books_changed()
+                self.add_message.setText(self.get_translation("add_success"))
+                cursor.close()
 
         except Exception as e:
             print(f"Hiba a könyv hozzáadása során: {e}")
@@ -1184,5 +2002,11 @@ class MainWindow(QMainWindow):
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
+    app.aboutToQuit.connect(window.close_book_stream)
+    app.aboutToQuit.connect(window.query_executor.shutdown)
+    app.aboutToQuit.connect(catalogue_index.stop)
+    app.aboutToQuit.connect(local_mirror.stop)
+    app.aboutToQuit.connect(window.stop_change_feed)
+    app.aboutToQuit.connect(close_pool)
     window.show()
     sys.exit(app.exec())
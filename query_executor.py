@@ -0,0 +1,202 @@
+import itertools
+import threading
+
+import psycopg2
+from psycopg2 import errors
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from db_pool import db_connection
+
+
+class QueryTask(QRunnable):
+    def __init__(self, executor, channel, request_id, func, args, with_cursor=True):
+        super().__init__()
+        self.executor = executor
+        self.channel = channel
+        self.request_id = request_id
+        self.func = func
+        self.args = args
+        self.with_cursor = with_cursor
+
+    def run(self):
+        self.executor._run_task(self)
+
+
+class QueryExecutor(QObject):
+    finished = Signal(str, int, object)
+    failed = Signal(str, int, str)
+    busy_changed = Signal(str, bool)
+
+    def __init__(self, parent=None, max_threads=4):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max_threads)
+
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        self._latest = {}
+        self._pending = {}
+        # csatorna -> {kérés azonosító: kapcsolat}; egy csatornán a korlátig több lekérdezés is futhat.
+        self._connections = {}
+        self._limits = {}
+        self._running = {}
+        self._deferred = {}
+
+    def set_channel_limit(self, channel, limit):
+        # Egy csatornán legfeljebb limit feladat fut egyszerre; a többi közül csak a legújabb vár,
+        # a régebbiek úgyis elavultak.
+        with self._lock:
+            self._limits[channel] = limit
+
+    def submit(self, channel, func, *args):
+        return self._start(channel, func, args, with_cursor=True)
+
+    def submit_call(self, channel, func, *args):
+        # A függvény saját kapcsolatot kezel (pl. szerveroldali kurzor), ezért nem kap kurzort.
+        # None csatorna esetén a feladatot semmi nem írja felül, és az eredménye nem kerül kiküldésre.
+        return self._start(channel, func, args, with_cursor=False)
+
+    def _start(self, channel, func, args, with_cursor):
+        with self._lock:
+            request_id = next(self._request_ids)
+            task = QueryTask(self, channel, request_id, func, args, with_cursor)
+            became_busy = False
+            start_now = True
+            if channel is not None:
+                self._latest[channel] = request_id
+                self._pending[channel] = self._pending.get(channel, 0) + 1
+                became_busy = self._pending[channel] == 1
+
+                # Az ugyanazon a csatornán még futó, elavult lekérdezést a szerveren is megszakítjuk.
+                self._cancel_running(channel)
+                start_now = self._reserve_slot(task)
+
+        if became_busy:
+            self.busy_changed.emit(channel, True)
+
+        if start_now:
+            self.thread_pool.start(task)
+        return request_id
+
+    def _reserve_slot(self, task):
+        # Csak zárolás alatt hívható.
+        limit = self._limits.get(task.channel)
+        if limit is None:
+            return True
+        if self._running.get(task.channel, 0) < limit:
+            self._running[task.channel] = self._running.get(task.channel, 0) + 1
+            return True
+
+        if task.channel in self._deferred:
+            # A felülírt várakozó feladat el sem indul, ezért itt vesszük le a számlálóból.
+            self._pending[task.channel] -= 1
+        self._deferred[task.channel] = task
+        return False
+
+    def _release_slot(self, channel):
+        # Csak zárolás alatt hívható; a helyére lépő várakozó feladatot adja vissza.
+        if channel not in self._limits:
+            return None
+        self._running[channel] -= 1
+        task = self._deferred.pop(channel, None)
+        if task is not None:
+            self._running[channel] += 1
+        return task
+
+    def cancel(self, channel):
+        with self._lock:
+            self._latest[channel] = None
+            self._cancel_running(channel)
+
+    def is_busy(self, channel):
+        with self._lock:
+            return self._pending.get(channel, 0) > 0
+
+    def shutdown(self):
+        with self._lock:
+            channels = list(self._latest)
+        for channel in channels:
+            self.cancel(channel)
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone()
+
+    def _is_current(self, task):
+        if task.channel is None:
+            return True
+        with self._lock:
+            return self._latest.get(task.channel) == task.request_id
+
+    def _cancel_running(self, channel):
+        # Csak zárolás alatt hívható, így a kapcsolat nem kerülhet vissza közben a poolba.
+        # A csatorna minden elavult (nem a legutóbbi kérésből származó) lekérdezését megszakítjuk.
+        latest = self._latest.get(channel)
+        for request_id, connection in self._connections.get(channel, {}).items():
+            if request_id == latest:
+                continue
+            try:
+                connection.cancel()
+            except psycopg2.Error as e:
+                print(f"Hiba a lekérdezés megszakítása során: {e}")
+
+    def _run_task(self, task):
+        result = None
+        error = None
+        canceled = False
+
+        try:
+            if not self._is_current(task):
+                return
+
+            if not task.with_cursor:
+                result = task.func(*task.args)
+                return
+
+            with db_connection() as connection:
+                if connection is None:
+                    raise psycopg2.OperationalError("Nem sikerült csatlakozni az adatbázishoz.")
+
+                with self._lock:
+                    self._connections.setdefault(task.channel, {})[task.request_id] = connection
+
+                try:
+                    if not self._is_current(task):
+                        return
+                    cursor = connection.cursor()
+                    try:
+                        result = task.func(cursor, *task.args)
+                    finally:
+                        cursor.close()
+                finally:
+                    with self._lock:
+                        running = self._connections[task.channel]
+                        del running[task.request_id]
+                        if not running:
+                            del self._connections[task.channel]
+
+        except errors.QueryCanceled:
+            canceled = True
+        except Exception as e:
+            error = str(e)
+
+        finally:
+            if task.channel is None:
+                if error is not None:
+                    print(f"Hiba a háttérfeladat során: {error}")
+                return
+
+            with self._lock:
+                self._pending[task.channel] -= 1
+                became_idle = self._pending[task.channel] == 0
+                next_task = self._release_slot(task.channel)
+
+            if next_task is not None:
+                self.thread_pool.start(next_task)
+
+            if not canceled and self._is_current(task):
+                if error is not None:
+                    self.failed.emit(task.channel, task.request_id, error)
+                else:
+                    self.finished.emit(task.channel, task.request_id, result)
+
+            if became_idle:
+                self.busy_changed.emit(task.channel, False)
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import re
+import threading
+import weakref
+from collections import OrderedDict
+
+from psycopg2 import extensions, sql
+from psycopg2.errors import FeatureNotSupported
+
+
+QUERY_REGISTRY_SETTINGS = {
+    "enabled": os.environ.get("RBD_PREPARED", "1") == "1",
+    "max_statements": int(os.environ.get("RBD_PREPARED_MAX", 200))
+}
+
+STATEMENT_PREFIX = "rbd_"
+PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+class PreparedStatement:
+    def __init__(self, text):
+        self.text = text
+        self.name = STATEMENT_PREFIX + hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+        # A psycopg2 %s / %(név)s helyőrzőiből PostgreSQL $n paraméterek; az EXECUTE ugyanazokat az értékeket kapja.
+        arguments = []
+        names = {}
+
+        def replace(match):
+            if match.group(0) == "%%":
+                return "%"
+            name = match.group(1)
+            if name is None:
+                arguments.append("%s")
+                return f"${len(arguments)}"
+            if name not in names:
+                arguments.append(f"%({name})s")
+                names[name] = len(arguments)
+            return f"${names[name]}"
+
+        self.prepare_sql = f"PREPARE {self.name} AS {PLACEHOLDER.sub(replace, text)}"
+        self.execute_sql = f"EXECUTE {self.name}" + (f" ({', '.join(arguments)})" if arguments else "")
+
+
+class QueryRegistry:
+    # Az alkalmazás állandó lekérdezéseit kapcsolatonként egyszer készítjük elő (PREPARE), utána név szerint futtatjuk,
+    # így a szerver nem elemzi és tervezi újra minden hívásnál. Az utasításokat a teljes SQL szövegük azonosítja:
+    # a keresés minden változata (mező, szűrők, rendezés) külön utasítás, az értékek (a LIMIT is) paraméterek.
+    # Kapcsolatonként legfeljebb max_statements utasítás marad előkészítve; a legrégebben használtat DEALLOCATE-tel
+    # szabadítjuk fel.
+    def __init__(self, settings=QUERY_REGISTRY_SETTINGS):
+        self.enabled = settings["enabled"]
+        self.max_statements = settings["max_statements"]
+        self._lock = threading.Lock()
+        self._statements = OrderedDict()
+        self._by_name = {}
+        # kapcsolat -> {név: érvényes-e} a használat sorrendjében; lezárt kapcsolattal együtt eltűnik.
+        self._prepared = weakref.WeakKeyDictionary()
+        self.prepares = 0
+        self.executions = 0
+        self.deallocations = 0
+        self.replans = 0
+
+    def statement(self, text):
+        with self._lock:
+            statement = self._statements.get(text)
+            if statement is None:
+                statement = self._statements[text] = PreparedStatement(text)
+                self._by_name[statement.name] = statement
+                if len(self._statements) > self.max_statements:
+                    _, evicted = self._statements.popitem(last=False)
+                    del self._by_name[evicted.name]
+            else:
+                self._statements.move_to_end(text)
+            return statement
+
+    def source(self, name):
+        # A mérések (instrumentation.py) az eredeti lekérdezést rögzítik az EXECUTE helyett.
+        with self._lock:
+            statement = self._by_name.get(name)
+            return statement.text if statement is not None else None
+
+    def execute(self, cursor, query, params=None):
+        # Nevesített (szerveroldali) kurzor nem futtathat EXECUTE-ot; ilyenkor és kikapcsolt állapotban a szokásos út.
+        if not self.enabled or cursor.name is not None:
+            return cursor.execute(query, params)
+
+        text = query.as_string(cursor) if isinstance(query, sql.Composable) else query
+        statement = self.statement(text)
+        connection = cursor.connection
+        idle = connection.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+        try:
+            return self._execute(cursor, statement, params)
+        except FeatureNotSupported:
+            # "cached plan must not change result type": a tábla szerkezete az előkészítés óta megváltozott.
+            # Az utasítást újra kell készíteni; ha a hívó tranzakciójában még nem futott más, rögtön megismételjük.
+            with self._lock:
+                prepared = self._prepared.get(connection)
+                if prepared is not None and statement.name in prepared:
+                    prepared[statement.name] = False
+            if not idle:
+                raise
+            connection.rollback()
+            with self._lock:
+                self.replans += 1
+            return self._execute(cursor, statement, params)
+
+    def _execute(self, cursor, statement, params):
+        connection = cursor.connection
+        with self._lock:
+            prepared = self._prepared.setdefault(connection, OrderedDict())
+            valid = prepared.get(statement.name)
+            if valid:
+                prepared.move_to_end(statement.name)
+            evicted = [] if valid is not None else list(prepared)[:max(len(prepared) - self.max_statements + 1, 0)]
+
+        if not valid:
+            # A DEALLOCATE és a PREPARE nem tranzakciós: visszagörgetés után is érvényes a munkamenet végéig.
+            for name in evicted + ([statement.name] if valid is False else []):
+                cursor.execute(f"DEALLOCATE {name}")
+                with self._lock:
+                    prepared.pop(name, None)
+                    self.deallocations += 1
+            cursor.execute(statement.prepare_sql)
+            with self._lock:
+                prepared[statement.name] = True
+                self.prepares += 1
+
+        with self._lock:
+            self.executions += 1
+        return cursor.execute(statement.execute_sql, params)
+
+    def status(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "statements": len(self._statements),
+                "connections": len(self._prepared),
+                "prepares": self.prepares,
+                "executions": self.executions,
+                "deallocations": self.deallocations,
+                "replans": self.replans
+            }
+
+
+query_registry = QueryRegistry()
@@ -0,0 +1,205 @@
+import argparse
+import getpass
+import importlib
+import json
+import os
+import sys
+
+
+# Grafikus felület nélküli parancssori belépési pont az éjszakai és egyéb szkriptelt feladatokhoz.
+# A PySide6 nem töltődik be, és minden modul csak a hozzá tartozó parancsnál töltődik be.
+
+# Ezek a parancsok a meglévő modulok saját parancssorát hívják, változatlan paraméterekkel.
+DELEGATED_COMMANDS = {
+    "import": ("book_import", "könyvek tömeges importálása CSV vagy JSONL fájlból (lásd: rbd import --help)."),
+    "export": ("book_export", "könyvek exportálása CSV, JSONL vagy Parquet fájlba (lásd: rbd export --help)."),
+    "api": ("book_api", "HTTP/JSON felület indítása vagy terheléses tesztje (lásd: rbd api --help).")
+}
+
+SEARCH_FORMATS = ("tsv", "jsonl")
+
+
+def _connect():
+    from db_pool import db_connection
+    return db_connection()
+
+
+def _book_fields(book):
+    from book_queries import SEARCH_FIELDS
+    return dict(zip(SEARCH_FIELDS, book))
+
+
+def _write_books(books, output_format, header):
+    from book_queries import SEARCH_FIELDS
+
+    if output_format == "jsonl":
+        for book in books:
+            sys.stdout.write(json.dumps(_book_fields(book), ensure_ascii=False) + "\n")
+        return
+
+    if header:
+        sys.stdout.write("\t".join(SEARCH_FIELDS) + "\n")
+    for book in books:
+        values = (', '.join(value) if isinstance(value, list) else "" if value is None else str(value) for value in book)
+        sys.stdout.write("\t".join(value.replace("\t", " ") for value in values) + "\n")
+
+
+def run_search(args):
+    from book_queries import BookStream
+
+    # Keyset lapokban olvasunk: a teljes találat sem kerül egyszerre a memóriába.
+    stream = BookStream(
+        args.search, args.field, ranges=dict(args.ranges), sort_column=args.sort, descending=args.desc
+    )
+    written = 0
+    try:
+        books = stream.open()
+        header = True
+        if not books:
+            _write_books(books, args.format, header)
+        while books:
+            if args.limit:
+                books = books[:args.limit - written]
+            _write_books(books, args.format, header)
+            header = False
+            written += len(books)
+            if args.limit and written >= args.limit:
+                break
+            books = stream.fetch_batch()
+    finally:
+        stream.close()
+    print(f"{written} találat", file=sys.stderr)
+    return 0
+
+
+def run_stats(args):
+    from book_service import get_books_statistics, get_price_summary
+
+    with _connect() as connection:
+        if connection is None:
+            return 1
+        cursor = connection.cursor()
+        try:
+            book_count, page_count = get_books_statistics(cursor)
+            avg_price, max_price = get_price_summary(cursor)
+        finally:
+            cursor.close()
+
+    stats = {"book_count": book_count, "page_count": page_count, "avg_price": avg_price, "max_price": max_price}
+    if args.json:
+        print(json.dumps(stats))
+    else:
+        for key, value in stats.items():
+            print(f"{key}\t{value:.2f}" if isinstance(value, float) else f"{key}\t{value}")
+    return 0
+
+
+def _read_isbns(args):
+    isbns = list(args.isbns)
+    if args.isbn_file:
+        source = sys.stdin if args.isbn_file == "-" else open(args.isbn_file, encoding="utf-8")
+        try:
+            isbns.extend(line.strip() for line in source if line.strip())
+        finally:
+            if source is not sys.stdin:
+                source.close()
+    return isbns
+
+
+def _parse_assignment(text):
+    try:
+        field, value = text.split("=", 1)
+        return field.strip(), value.strip()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Érvénytelen módosítás: {text!r} (mező=érték)")
+
+
+def run_bulk_update(args):
+    from book_bulk import update_books, PermissionDenied
+    from book_service import check_login
+
+    isbns = _read_isbns(args)
+    password = os.environ.get("RBD_USER_PASSWORD")
+    if password is None:
+        password = getpass.getpass(f"{args.user} jelszava: ")
+
+    with _connect() as connection:
+        if connection is None:
+            return 1
+        cursor = connection.cursor()
+        try:
+            if not check_login(cursor, args.user, password):
+                print("Hibás felhasználónév vagy jelszó!", file=sys.stderr)
+                return 1
+            count = update_books(cursor, args.user, isbns, dict(args.changes))
+        except PermissionDenied as e:
+            print(f"Hiba: {e}", file=sys.stderr)
+            return 1
+        finally:
+            cursor.close()
+
+    print(f"Módosítva: {count} könyv ({len(isbns)} kiválasztva)")
+    return 0
+
+
+def build_parser():
+    from book_queries import DEFAULT_SORT_COLUMN, SEARCH_FIELDS, SORT_COLUMNS, parse_range
+    from book_bulk import BULK_UPDATE_FIELDS
+
+    parser = argparse.ArgumentParser(prog="rbd", description="Rosenberg's Book Database parancssori felülete.")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="parancs")
+
+    search = commands.add_parser("search", help="könyvek keresése, az eredmény a szabványos kimenetre kerül")
+    search.add_argument("search", nargs="?", default="", help="keresett kifejezés (üres: minden könyv)")
+    search.add_argument("--field", choices=SEARCH_FIELDS, default="title", help="keresési mező")
+    search.add_argument("--range", action="append", default=[], type=parse_range, dest="ranges",
+                        help="számszűrő mező:min:max alakban, többször is megadható (pl. price::3000)")
+    search.add_argument("--sort", choices=SORT_COLUMNS, default=DEFAULT_SORT_COLUMN, help="rendezési oszlop")
+    search.add_argument("--desc", action="store_true", help="csökkenő sorrend")
+    search.add_argument("--limit", type=int, default=0, help="legfeljebb ennyi sor (0: mind)")
+    search.add_argument("--format", choices=SEARCH_FORMATS, default="tsv", help="kimeneti formátum")
+    search.set_defaults(run=run_search)
+
+    stats = commands.add_parser("stats", help="a katalógus összesített adatai")
+    stats.add_argument("--json", action="store_true", help="JSON kimenet")
+    stats.set_defaults(run=run_stats)
+
+    for name, (_, help_text) in DELEGATED_COMMANDS.items():
+        commands.add_parser(name, help=help_text, add_help=False)
+
+    bulk_update = commands.add_parser(
+        "bulk-update", help="több könyv számmezőinek módosítása egy tranzakcióban (jogosultság-ellenőrzéssel)"
+    )
+    bulk_update.add_argument("isbns", nargs="*", help="a módosítandó könyvek ISBN-je")
+    bulk_update.add_argument("--isbn-file", help="ISBN-ek soronként egy fájlból ('-': szabványos bemenet)")
+    bulk_update.add_argument("--user", required=True,
+                             help="felhasználónév; a jelszó az RBD_USER_PASSWORD változóból vagy bekérve")
+    bulk_update.add_argument("--set", action="append", required=True, type=_parse_assignment, dest="changes",
+                             help=f"mező=érték, többször is megadható ({', '.join(BULK_UPDATE_FIELDS)})")
+    bulk_update.set_defaults(run=run_bulk_update)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in DELEGATED_COMMANDS:
+        module_name, _ = DELEGATED_COMMANDS[argv[0]]
+        return importlib.import_module(module_name).main(argv[1:])
+
+    args = build_parser().parse_args(argv)
+
+    import psycopg2
+
+    try:
+        return args.run(args)
+    except BrokenPipeError:
+        # Pl. rbd search | head: a kimenet olvasója korábban kilépett; a kilépéskori ürítés se jelezzen hibát.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (OSError, ValueError, psycopg2.Error) as e:
+        print(f"Hiba: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
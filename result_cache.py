@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import OrderedDict
+
+from book_queries import BOOK_COLUMN_INDEX, NUMERIC_FIELDS, normalize_ranges, books_in_ranges
+
+
+RESULT_CACHE_MAX_ROWS = 10000
+RESULT_CACHE_MAX_BYTES = 32 << 20
+RESULT_CACHE_TTL = 60.0
+
+# Ezeket a karaktereket az ILIKE mintaként értelmezi, így az ilyen kifejezés nem szűrhető helyben.
+LIKE_SPECIAL_CHARACTERS = ("%", "_", "\\")
+
+
+def _row_size(book):
+    # Durva becslés a Python objektumok méretére: tuple + sztringek + szerzőlista + három int.
+    isbn, authors, title = book[0], book[1], book[2]
+    size = 100 + 3 * 28 + 2 * 49 + len(isbn) + len(title)
+    if isinstance(authors, list):
+        size += 56 + 8 * len(authors) + sum(49 + len(author) for author in authors)
+    return size
+
+
+def _is_refinable(search_field, search_term):
+    return search_field not in NUMERIC_FIELDS and not any(c in search_term for c in LIKE_SPECIAL_CHARACTERS)
+
+
+def _field_text(book, search_field):
+    value = book[BOOK_COLUMN_INDEX[search_field]]
+    if isinstance(value, list):
+        return ', '.join(value)
+    return value or ""
+
+
+def filter_books(books, search_field, search_term):
+    needle = search_term.lower()
+    return [book for book in books if needle in _field_text(book, search_field).lower()]
+
+
+def _ranges_cover(outer, inner):
+    # Igaz, ha az inner szűrők minden sora az outer szűrőknek is megfelel.
+    inner = {field: (low, high) for field, low, high in inner}
+    for field, low, high in outer:
+        if field not in inner:
+            return False
+        inner_low, inner_high = inner[field]
+        if low is not None and (inner_low is None or inner_low < low):
+            return False
+        if high is not None and (inner_high is None or inner_high > high):
+            return False
+    return True
+
+
+def _term_covers(search_field, term, search_term):
+    if term == search_term:
+        return True
+    return (_is_refinable(search_field, term) and _is_refinable(search_field, search_term)
+            and term.lower() in search_term.lower())
+
+
+class ResultCache:
+    def __init__(self, max_rows=RESULT_CACHE_MAX_ROWS, max_bytes=RESULT_CACHE_MAX_BYTES, ttl=RESULT_CACHE_TTL):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (search_field, search_term, szűrők) -> (books, size, loaded_at); a sorrend az LRU sorrend.
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.generation = 0
+        self.hits = 0
+        self.refinements = 0
+        self.misses = 0
+
+    def get(self, search_field, search_term, ranges=None):
+        ranges = normalize_ranges(ranges)
+        key = (search_field, search_term, ranges)
+        with self._lock:
+            self._expire()
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            base = self._find_base(search_field, search_term, ranges)
+            if base is None:
+                self.misses += 1
+                return None
+            self.refinements += 1
+            generation = self.generation
+
+        # A szűkebb kifejezés és szűrők találatai a tágabb keresés teljes találati halmazának részhalmazai.
+        base_term, books = base
+        if base_term != search_term:
+            books = filter_books(books, search_field, search_term)
+        books = books_in_ranges(books, ranges)
+        self.put(search_field, search_term, books, generation, ranges)
+        return books
+
+    def put(self, search_field, search_term, books, generation=None, ranges=None):
+        if len(books) > self.max_rows:
+            return
+        size = sum(_row_size(book) for book in books)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # Betöltés közben módosult az adatbázis: a régi eredményt nem tároljuk el.
+            if generation is not None and generation != self.generation:
+                return
+
+            key = (search_field, search_term, normalize_ranges(ranges))
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+            self._entries[key] = (list(books), size, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.generation += 1
+
+    def statistics(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "refinements": self.refinements,
+                "misses": self.misses
+            }
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [key for key, (_, _, loaded_at) in self._entries.items() if now - loaded_at >= self.ttl]:
+            self._bytes -= self._entries.pop(key)[1]
+
+    def _find_base(self, search_field, search_term, ranges):
+        base = None
+        for key, (books, _, _) in self._entries.items():
+            field, term, entry_ranges = key
+            if field != search_field or not _term_covers(field, term, search_term):
+                continue
+            if not _ranges_cover(entry_ranges, ranges):
+                continue
+            # A legkisebb tágabb halmazból szűrünk.
+            if base is None or len(books) < len(base[1]):
+                base = (key, books)
+
+        if base is None:
+            return None
+        self._entries.move_to_end(base[0])
+        return base[0][1], base[1]
+
+
+result_cache = ResultCache()
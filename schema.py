@@ -0,0 +1,468 @@
+import re
+import sys
+
+import psycopg2
+from psycopg2 import sql
+
+from db_pool import db_connection
+
+
+SCHEMA_LOCK_ID = 7262001
+
+# (verzió, név, kötelező-e, utasítások). A nem kötelező migráció hibája (pl. hiányzó bővítmény)
+# nem állítja meg a többit, és a következő indításkor újra megpróbáljuk.
+MIGRATIONS = [
+    (1, "authors_text_function", True, [
+        """
+        CREATE OR REPLACE FUNCTION books_authors_text(authors text[])
+        RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS $$ SELECT array_to_string(authors, ', ') $$
+        """
+    ]),
+    (2, "trigram_search_indexes", False, [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS books2_title_trgm_idx ON books2 USING gin (title gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS books2_isbn_trgm_idx ON books2 USING gin (isbn gin_trgm_ops)",
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS books2_authors_trgm_idx
+        ON books2 USING gin (books_authors_text(authors) gin_trgm_ops)
+        """
+    ]),
+    (3, "books_statistics_table", True, [
+        # Egyetlen implicit tranzakció: a kezdeti számlálás és a triggerek között nem veszhet el írás.
+        """
+        CREATE TABLE IF NOT EXISTS books2_stats (
+            id integer PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            book_count bigint NOT NULL DEFAULT 0,
+            page_sum bigint NOT NULL DEFAULT 0
+        );
+
+        LOCK TABLE books2 IN SHARE ROW EXCLUSIVE MODE;
+
+        INSERT INTO books2_stats (id, book_count, page_sum)
+        SELECT 1, COUNT(*), COALESCE(SUM(page_num), 0) FROM books2
+        ON CONFLICT (id) DO UPDATE
+        SET book_count = EXCLUDED.book_count, page_sum = EXCLUDED.page_sum;
+
+        CREATE OR REPLACE FUNCTION books2_stats_insert() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE books2_stats
+            SET book_count = books2_stats.book_count + delta.row_count,
+                page_sum = books2_stats.page_sum + delta.page_total
+            FROM (SELECT COUNT(*) AS row_count, COALESCE(SUM(page_num), 0) AS page_total FROM new_rows) AS delta
+            WHERE id = 1;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_stats_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE books2_stats
+            SET book_count = books2_stats.book_count - delta.row_count,
+                page_sum = books2_stats.page_sum - delta.page_total
+            FROM (SELECT COUNT(*) AS row_count, COALESCE(SUM(page_num), 0) AS page_total FROM old_rows) AS delta
+            WHERE id = 1;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_stats_update() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE books2_stats
+            SET page_sum = page_sum
+                + (SELECT COALESCE(SUM(page_num), 0) FROM new_rows)
+                - (SELECT COALESCE(SUM(page_num), 0) FROM old_rows)
+            WHERE id = 1;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_stats_truncate() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE books2_stats SET book_count = 0, page_sum = 0 WHERE id = 1;
+            RETURN NULL;
+        END $$;
+
+        DROP TRIGGER IF EXISTS books2_stats_insert_trigger ON books2;
+        CREATE TRIGGER books2_stats_insert_trigger AFTER INSERT ON books2
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_stats_insert();
+
+        DROP TRIGGER IF EXISTS books2_stats_delete_trigger ON books2;
+        CREATE TRIGGER books2_stats_delete_trigger AFTER DELETE ON books2
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_stats_delete();
+
+        DROP TRIGGER IF EXISTS books2_stats_update_trigger ON books2;
+        CREATE TRIGGER books2_stats_update_trigger AFTER UPDATE ON books2
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_stats_update();
+
+        DROP TRIGGER IF EXISTS books2_stats_truncate_trigger ON books2;
+        CREATE TRIGGER books2_stats_truncate_trigger AFTER TRUNCATE ON books2
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_stats_truncate();
+        """
+    ]),
+    (4, "books_change_log", True, [
+        # A helyi másolatok (pl. a kioszk katalógus) ebből a naplóból frissülnek teljes újratöltés helyett.
+        # A txid alapján a még le nem zárt tranzakciók változásai sem vesznek el (lásd catalogue_index.py).
+        """
+        CREATE TABLE IF NOT EXISTS books2_changes (
+            change_id bigserial PRIMARY KEY,
+            txid bigint NOT NULL DEFAULT txid_current(),
+            isbn text,
+            operation char(1) NOT NULL,
+            changed_at timestamptz NOT NULL DEFAULT now()
+        );
+
+        CREATE INDEX IF NOT EXISTS books2_changes_txid_idx ON books2_changes (txid);
+        CREATE INDEX IF NOT EXISTS books2_changes_changed_at_idx ON books2_changes (changed_at);
+
+        CREATE OR REPLACE FUNCTION books2_log_insert() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO books2_changes (isbn, operation) SELECT isbn, 'I' FROM new_rows;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_log_update() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            -- Az ISBN is módosulhat, ezért a régi és az új kulcsot is naplózzuk.
+            INSERT INTO books2_changes (isbn, operation)
+            SELECT isbn, 'U' FROM new_rows
+            UNION
+            SELECT isbn, 'U' FROM old_rows;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_log_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO books2_changes (isbn, operation) SELECT isbn, 'D' FROM old_rows;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_log_truncate() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO books2_changes (isbn, operation) VALUES (NULL, 'T');
+            RETURN NULL;
+        END $$;
+
+        DROP TRIGGER IF EXISTS books2_log_insert_trigger ON books2;
+        CREATE TRIGGER books2_log_insert_trigger AFTER INSERT ON books2
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_log_insert();
+
+        DROP TRIGGER IF EXISTS books2_log_update_trigger ON books2;
+        CREATE TRIGGER books2_log_update_trigger AFTER UPDATE ON books2
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_log_update();
+
+        DROP TRIGGER IF EXISTS books2_log_delete_trigger ON books2;
+        CREATE TRIGGER books2_log_delete_trigger AFTER DELETE ON books2
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_log_delete();
+
+        DROP TRIGGER IF EXISTS books2_log_truncate_trigger ON books2;
+        CREATE TRIGGER books2_log_truncate_trigger AFTER TRUNCATE ON books2
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_log_truncate();
+        """
+    ]),
+    (5, "numeric_range_indexes", False, [
+        # (érték, isbn) indexek: a tartományszűrést és a keyset lapozás ORDER BY érték, isbn rendezését is kiszolgálják.
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS books2_page_num_isbn_idx ON books2 (page_num, isbn)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS books2_price_isbn_idx ON books2 (price, isbn)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS books2_available_isbn_idx ON books2 (available, isbn)",
+        # Gyakori kombinált kérdés: raktáron lévő könyvek árszűréssel ("3000 alatt, készleten").
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS books2_in_stock_price_idx ON books2 (price, isbn) WHERE available > 0"
+    ]),
+    (6, "title_sort_index", False, [
+        # A cím szerinti rendezett lapozáshoz; a számoszlopokat az 5. migráció indexei szolgálják ki.
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS books2_title_isbn_idx ON books2 (title, isbn)"
+    ]),
+    (7, "books_change_notify", True, [
+        # Soronkénti NOTIFY a books2_changes csatornán (change_feed.py). Minden üzenet a statisztika
+        # végső értékét is tartalmazza: a books2_stats sort a tranzakció a véglegesítésig zárolja,
+        # így az olvasott érték pontos, az üzenetek pedig véglegesítési sorrendben érkeznek.
+        # Túl sok sor vagy túl hosszú üzenet esetén egyetlen 'R' (újratöltés) értesítés megy ki.
+        """
+        CREATE OR REPLACE FUNCTION books2_notify(operations text[], isbns text[], books json[])
+        RETURNS void
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            counts record;
+            payload text;
+            i integer;
+        BEGIN
+            SELECT book_count, page_sum INTO counts FROM books2_stats WHERE id = 1;
+
+            IF COALESCE(array_length(isbns, 1), 0) > 200 THEN
+                operations := ARRAY['R'];
+                isbns := ARRAY[NULL];
+                books := ARRAY[NULL];
+            END IF;
+
+            FOR i IN 1 .. COALESCE(array_length(operations, 1), 0) LOOP
+                payload := json_build_object(
+                    'op', operations[i], 'isbn', isbns[i], 'book', books[i],
+                    'count', counts.book_count, 'pages', counts.page_sum
+                )::text;
+                -- A NOTIFY üzenet legfeljebb 8000 bájt lehet.
+                IF octet_length(payload) > 7900 THEN
+                    payload := json_build_object(
+                        'op', 'R', 'count', counts.book_count, 'pages', counts.page_sum
+                    )::text;
+                END IF;
+                PERFORM pg_notify('books2_changes', payload);
+            END LOOP;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_notify_insert() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM books2_notify(
+                array_agg('I'::text),
+                array_agg(isbn),
+                array_agg(json_build_array(isbn, authors, title, page_num, price, available))
+            ) FROM new_rows;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_notify_update() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            -- Az ISBN is módosulhat: a párosítatlan régi kulcs törlés, a párosítatlan új kulcs beszúrás.
+            PERFORM books2_notify(
+                array_agg(CASE WHEN o.isbn IS NULL THEN 'I' WHEN n.isbn IS NULL THEN 'D' ELSE 'U' END),
+                array_agg(COALESCE(n.isbn, o.isbn)),
+                array_agg(CASE WHEN n.isbn IS NOT NULL THEN
+                    json_build_array(n.isbn, n.authors, n.title, n.page_num, n.price, n.available)
+                END)
+            ) FROM new_rows AS n FULL JOIN old_rows AS o ON o.isbn = n.isbn;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_notify_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM books2_notify(array_agg('D'::text), array_agg(isbn), array_agg(NULL::json)) FROM old_rows;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_notify_truncate() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM books2_notify(ARRAY['R'], ARRAY[NULL], ARRAY[NULL::json]);
+            RETURN NULL;
+        END $$;
+
+        -- Az azonos eseményű triggerek név szerinti sorrendben futnak; a books2_zz_ előtag miatt
+        -- az értesítés a books2_stats frissítése után készül.
+        DROP TRIGGER IF EXISTS books2_zz_notify_insert_trigger ON books2;
+        CREATE TRIGGER books2_zz_notify_insert_trigger AFTER INSERT ON books2
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_notify_insert();
+
+        DROP TRIGGER IF EXISTS books2_zz_notify_update_trigger ON books2;
+        CREATE TRIGGER books2_zz_notify_update_trigger AFTER UPDATE ON books2
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_notify_update();
+
+        DROP TRIGGER IF EXISTS books2_zz_notify_delete_trigger ON books2;
+        CREATE TRIGGER books2_zz_notify_delete_trigger AFTER DELETE ON books2
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_notify_delete();
+
+        DROP TRIGGER IF EXISTS books2_zz_notify_truncate_trigger ON books2;
+        CREATE TRIGGER books2_zz_notify_truncate_trigger AFTER TRUNCATE ON books2
+        FOR EACH STATEMENT EXECUTE FUNCTION books2_notify_truncate();
+        """
+    ]),
+    (8, "books_change_notify_cutoff", True, [
+        # A 7. migráció triggerei a teljes átmeneti táblából építették a JSON tömböket, mielőtt a books2_notify
+        # 200 sor fölött egyetlen 'R' értesítésre váltott; egy nagy COPY import így feleslegesen soronként
+        # JSON-t készített. Most előbb (legfeljebb 201 sorig) számolunk, és a tömbök csak kis utasításnál készülnek.
+        """
+        CREATE OR REPLACE FUNCTION books2_notify_reload() RETURNS void
+        LANGUAGE sql AS $$ SELECT books2_notify(ARRAY['R'], ARRAY[NULL], ARRAY[NULL::json]) $$;
+
+        CREATE OR REPLACE FUNCTION books2_notify_insert() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF (SELECT count(*) FROM (SELECT 1 FROM new_rows LIMIT 201) AS limited) > 200 THEN
+                PERFORM books2_notify_reload();
+                RETURN NULL;
+            END IF;
+            PERFORM books2_notify(
+                array_agg('I'::text),
+                array_agg(isbn),
+                array_agg(json_build_array(isbn, authors, title, page_num, price, available))
+            ) FROM new_rows;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_notify_update() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF (SELECT count(*) FROM (SELECT 1 FROM new_rows LIMIT 201) AS limited) > 200
+                    OR (SELECT count(*) FROM (SELECT 1 FROM old_rows LIMIT 201) AS limited) > 200 THEN
+                PERFORM books2_notify_reload();
+                RETURN NULL;
+            END IF;
+            -- Az ISBN is módosulhat: a párosítatlan régi kulcs törlés, a párosítatlan új kulcs beszúrás.
+            PERFORM books2_notify(
+                array_agg(CASE WHEN o.isbn IS NULL THEN 'I' WHEN n.isbn IS NULL THEN 'D' ELSE 'U' END),
+                array_agg(COALESCE(n.isbn, o.isbn)),
+                array_agg(CASE WHEN n.isbn IS NOT NULL THEN
+                    json_build_array(n.isbn, n.authors, n.title, n.page_num, n.price, n.available)
+                END)
+            ) FROM new_rows AS n FULL JOIN old_rows AS o ON o.isbn = n.isbn;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books2_notify_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF (SELECT count(*) FROM (SELECT 1 FROM old_rows LIMIT 201) AS limited) > 200 THEN
+                PERFORM books2_notify_reload();
+                RETURN NULL;
+            END IF;
+            PERFORM books2_notify(array_agg('D'::text), array_agg(isbn), array_agg(NULL::json)) FROM old_rows;
+            RETURN NULL;
+        END $$;
+        """
+    ])
+]
+
+CHANGE_LOG_RETENTION_DAYS = 7
+
+INDEX_NAME = re.compile(r"CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+)")
+
+
+def _applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version integer PRIMARY KEY,
+            name text NOT NULL,
+            applied_at timestamptz NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _index_name(statement):
+    match = INDEX_NAME.search(statement)
+    return match.group(1) if match else None
+
+
+def _invalid_indexes(cursor):
+    # A megszakított CREATE INDEX CONCURRENTLY INVALID indexet hagy hátra, amelyet az IF NOT EXISTS átugrik,
+    # a tervező pedig nem használ; az ilyeneket újraépítjük.
+    names = [name for _, _, _, statements in MIGRATIONS for name in map(_index_name, statements) if name]
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_index AS i JOIN pg_class AS c ON c.oid = i.indexrelid
+        WHERE NOT i.indisvalid AND c.relname = ANY(%s)
+    """, (names,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migrations(connection, verbose=False, required_only=False, wait=True):
+    previous_autocommit = connection.autocommit
+    # CREATE INDEX CONCURRENTLY nem futhat tranzakcióban, ezért utasításonként véglegesítünk.
+    connection.autocommit = True
+    cursor = connection.cursor()
+    applied_now = []
+
+    try:
+        if wait:
+            cursor.execute("SELECT pg_advisory_lock(%s)", (SCHEMA_LOCK_ID,))
+        else:
+            # Egy másik példány akár hosszú indexépítés közben is tarthatja a zárat; a felület nem várhat rá,
+            # a migrációkat a következő indításkor újra megpróbáljuk.
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (SCHEMA_LOCK_ID,))
+            if not cursor.fetchone()[0]:
+                if verbose:
+                    print("A sémát egy másik példány frissíti, a migrációk kimaradnak.")
+                return False, applied_now
+        try:
+            applied = _applied_versions(cursor)
+            invalid = _invalid_indexes(cursor)
+
+            # A kötelező migrációk előre kerülnek, így a lassú indexépítések alatt már elérhetők.
+            for version, name, required, statements in sorted(MIGRATIONS, key=lambda migration: not migration[2]):
+                if required_only and not required:
+                    continue
+                if version in applied:
+                    statements = [statement for statement in statements if _index_name(statement) in invalid]
+                    if not statements:
+                        continue
+
+                try:
+                    for statement in statements:
+                        index_name = _index_name(statement)
+                        if index_name in invalid:
+                            cursor.execute(
+                                sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(index_name))
+                            )
+                        cursor.execute(statement)
+                    if version in applied:
+                        if verbose:
+                            print(f"Érvénytelen index újraépítve: {version} {name}")
+                        continue
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (version, name)
+                    )
+                    applied_now.append(name)
+                    if verbose:
+                        print(f"Migráció alkalmazva: {version} {name}")
+                except psycopg2.Error as e:
+                    print(f"Hiba a(z) {name} migráció során: {e}")
+                    if required:
+                        return False, applied_now
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (SCHEMA_LOCK_ID,))
+
+        return True, applied_now
+
+    finally:
+        cursor.close()
+        connection.autocommit = previous_autocommit
+
+
+def prune_change_log(connection, retention_days=CHANGE_LOG_RETENTION_DAYS):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "DELETE FROM books2_changes WHERE changed_at < now() - make_interval(days => %s)",
+            (retention_days,)
+        )
+        connection.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def ensure_schema(verbose=False, required_only=False, wait=False):
+    with db_connection() as connection:
+        if connection is None:
+            return False
+        try:
+            ok, _ = apply_migrations(connection, verbose, required_only, wait)
+            # Indításkor a háttérben a régi változásnapló-bejegyzéseket is töröljük.
+            if ok and not required_only:
+                prune_change_log(connection)
+            return ok
+        except psycopg2.Error as e:
+            print(f"Hiba az adatbázis-séma frissítése során: {e}")
+            return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if ensure_schema(verbose=True, wait=True) else 1)
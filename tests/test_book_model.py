@@ -0,0 +1,55 @@
+import os
+import sys
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from book_model import BookTableModel, _extend_column
+
+
+def book(isbn, page_num, price, available):
+    return (isbn, ["Author"], f"Title {isbn}", page_num, price, available)
+
+
+def test_extend_column_keeps_array_when_values_fit():
+    column = array("q", [1, 2, 3])
+    result = _extend_column(column, (4, 5))
+    assert isinstance(result, array)
+    assert list(result) == [1, 2, 3, 4, 5]
+
+
+def test_extend_column_falls_back_without_duplicates():
+    column = array("q", [1, 2, 3])
+    # A hibás érték előtti elemeket a régi változat kétszer vette fel.
+    result = _extend_column(column, (4, None, 6))
+    assert result == [1, 2, 3, 4, None, 6]
+    assert list(column) == [1, 2, 3]
+
+    result = _extend_column(array("q", [1, 2, 3]), (4, 2 ** 70, 6))
+    assert result == [1, 2, 3, 4, 2 ** 70, 6]
+
+
+def test_later_page_with_null_and_out_of_range_values_stays_aligned():
+    model = BookTableModel()
+    model.set_books([book("1", 100, 1000, 1), book("2", 200, 2000, 2)], has_more=True)
+    model.append_books([book("3", 300, None, 3), book("4", 2 ** 70, 4000, None), book("5", 500, 5000, 5)])
+
+    assert model.rowCount() == 5
+    assert [model.book_values(row)[0] for row in range(5)] == ["1", "2", "3", "4", "5"]
+    assert [model.book_values(row)[3] for row in range(5)] == [100, 200, 300, 2 ** 70, 500]
+    assert [model.book_values(row)[4] for row in range(5)] == [1000, 2000, None, 4000, 5000]
+    assert [model.book_values(row)[5] for row in range(5)] == [1, 2, 3, None, 5]
+    assert model.find_row("5") == 4
+
+
+def test_find_row_index_follows_appends_and_shifts():
+    model = BookTableModel()
+    model.set_books([book("1", 100, 1000, 1), book("2", 200, 2000, 2)], has_more=True)
+    assert model.find_row("2") == 1
+
+    model.append_books([book("3", 300, 3000, 3)])
+    assert model.find_row("3") == 2
+
+    model.remove_book(0)
+    model.insert_book(2, book("4", 400, 4000, 4))
+    assert [model.find_row(isbn) for isbn in ("1", "2", "3", "4")] == [None, 0, 1, 2]
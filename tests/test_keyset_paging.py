@@ -0,0 +1,99 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from book_queries import list_books_page, sort_books
+from db_pool import db_connection
+from local_mirror import MIRROR_SCHEMA, LocalMirror, _mirror_row
+
+
+# (isbn, ár): a NULL árú könyvek a növekvő sorrend végén, a csökkenő elején állnak.
+PRICES = [("nulltest-1", 10), ("nulltest-2", None), ("nulltest-3", 20), ("nulltest-4", None), ("nulltest-5", None)]
+
+
+# Ritka oldalszám: a tartományszűrő indexen szűkít, így az isbn-keresés nem olvassa végig a táblát.
+PAGE_NUM = 9973
+RANGES = {"page_num": (PAGE_NUM, PAGE_NUM)}
+
+
+def book(isbn, price):
+    return (isbn, ["Author"], f"Title {isbn}", PAGE_NUM, price, 1)
+
+
+def walk_forward(fetch):
+    page = fetch()
+    books = list(page.books)
+    while page.has_next:
+        page = fetch(after=page.last_key())
+        books.extend(page.books)
+    return books, page
+
+
+def walk_backward(fetch, last_page):
+    page = last_page
+    books = list(page.books)
+    while page.has_previous:
+        page = fetch(before=page.first_key())
+        books[:0] = page.books
+    return books
+
+
+def check_paging(fetch, expected):
+    books, last_page = walk_forward(fetch)
+    assert [book[0] for book in books] == expected
+    assert [book[0] for book in walk_backward(fetch, last_page)] == expected
+
+
+@pytest.fixture
+def cursor():
+    with db_connection() as connection:
+        if connection is None:
+            pytest.skip("Nem érhető el adatbázis.")
+        cursor = connection.cursor()
+        try:
+            cursor.executemany(
+                "INSERT INTO books2 (isbn, authors, title, page_num, price, available) VALUES (%s, %s, %s, %s, %s, %s)",
+                [book(isbn, price) for isbn, price in PRICES]
+            )
+            yield cursor
+        finally:
+            cursor.close()
+            connection.rollback()
+
+
+ASCENDING = ["nulltest-1", "nulltest-3", "nulltest-2", "nulltest-4", "nulltest-5"]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("page_size", [1, 2, 3])
+def test_pages_cross_null_boundary(cursor, descending, page_size):
+    def fetch(after=None, before=None):
+        return list_books_page(cursor, "nulltest-", "isbn", page_size, "price", after=after, before=before,
+                               ranges=RANGES, descending=descending)
+
+    expected = ASCENDING[::-1] if descending else ASCENDING
+    assert [book[0] for book in sort_books([book(*item) for item in PRICES], "price", descending)] == expected
+    check_paging(fetch, expected)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("page_size", [1, 2, 3])
+def test_mirror_pages_cross_null_boundary_in_server_order(tmp_path, descending, page_size):
+    mirror = LocalMirror(str(tmp_path / "mirror.sqlite3"))
+    with mirror._connect() as connection:
+        connection.executescript(MIRROR_SCHEMA)
+        with connection:
+            connection.executemany(
+                "INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [_mirror_row(book(isbn, price)) for isbn, price in PRICES]
+            )
+
+    def fetch(after=None, before=None):
+        return mirror.list_books_page("nulltest-", "isbn", page_size, "price", after=after, before=before,
+                                      descending=descending)
+
+    check_paging(fetch, ASCENDING[::-1] if descending else ASCENDING)
+    assert [book[0] for book in mirror.search_books("nulltest-", "isbn", sort_column="price")] == ASCENDING
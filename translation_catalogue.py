@@ -0,0 +1,85 @@
+import json
+import os
+import pickle
+import sys
+
+
+TRANSLATIONS_PATH = "translations.json"
+DEFAULT_LANGUAGE = "hu"
+CACHE_FORMAT = 1
+
+
+def _cache_path(source_path, language):
+    # A lefordított nyelvi fájlok a Python bájtkódja mellé, a __pycache__ könyvtárba kerülnek.
+    directory = os.path.join(os.path.dirname(os.path.abspath(source_path)), "__pycache__")
+    return os.path.join(directory, f"{os.path.basename(source_path)}.{language}.pickle")
+
+
+def _source_stamp(source_path):
+    stat = os.stat(source_path)
+    return CACHE_FORMAT, stat.st_mtime_ns, stat.st_size
+
+
+def compile_catalogue(source_path=TRANSLATIONS_PATH):
+    # A JSON-t egyszer dolgozzuk fel, és minden nyelvet külön fájlba mentünk,
+    # így a következő indításkor csak az aktív nyelv töltődik be.
+    stamp = _source_stamp(source_path)
+    with open(source_path, "r", encoding="utf-8") as f:
+        catalogue = json.load(f)
+
+    for language, strings in catalogue.items():
+        path = _cache_path(source_path, language)
+        partial_path = f"{path}.{os.getpid()}.part"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(partial_path, "wb") as f:
+                pickle.dump((stamp, strings), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(partial_path, path)
+        except OSError as e:
+            print(f"Hiba a fordítási gyorsítótár írása során: {e}")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+    return catalogue
+
+
+def _load_cached(source_path, language):
+    try:
+        with open(_cache_path(source_path, language), "rb") as f:
+            stamp, strings = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        return None
+    # A forrásfájl módosítása után a gyorsítótár elavult.
+    if stamp != _source_stamp(source_path):
+        return None
+    return strings
+
+
+def load_language(language, source_path=TRANSLATIONS_PATH):
+    strings = _load_cached(source_path, language)
+    if strings is None:
+        strings = compile_catalogue(source_path).get(language, {})
+    # Az internált kulcsokkal a keresés a kódban szereplő literálokra azonosság alapján talál.
+    return {sys.intern(key): value for key, value in strings.items()}
+
+
+class TranslationCatalogue:
+    def __init__(self, language=DEFAULT_LANGUAGE, source_path=TRANSLATIONS_PATH):
+        self.source_path = source_path
+        self.language = None
+        self.strings = {}
+        self.set_language(language)
+
+    def set_language(self, language):
+        if language == self.language:
+            return False
+        self.strings = load_language(language, self.source_path)
+        self.language = language
+        return True
+
+    def get(self, key):
+        return self.strings.get(key, key)
+
+
+if __name__ == "__main__":
+    compiled = compile_catalogue()
+    print(f"Lefordított nyelvek: {', '.join(compiled)}")